@@ -1,4 +1,5 @@
 import sys, ply.lex, datetime
+import tables
 
 STUDENTNAME = "Joonas Pelttari"
 STUDENTID = "H274830"
@@ -109,7 +110,7 @@ def t_error(t):
     raise Exception("Illegal character '{}' at line {}".format( 
         t.value[0], t.lexer.lineno ) )
 
-lexer = ply.lex.lex()
+lexer = tables.load_lexer(sys.modules[__name__])
 
 
 def handleArguments(args):
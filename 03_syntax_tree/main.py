@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
+import sys
 import ply.yacc
 import ply.lex
 import lexer
+import tables
 import tree_print
 import semantics_check
 
@@ -33,14 +35,21 @@ def p_empty(p):
     '''empty : '''
     p[0] = None
 
-def p_statement_list1(p):
-    '''statement_list : statement'''
+# The statements of a list are collected in source order with a
+# left-recursive rule, but this phase has always listed them last first,
+# so the list is reversed once when it is complete
+def p_statement_list(p):
+    '''statement_list : statements'''
+    p[0] = p[1][::-1]
+
+def p_statements1(p):
+    '''statements : statement'''
     p[0] = [p[1]]
 
-def p_statement_list2(p):
-    '''statement_list : statement COMMA statement_list'''
-    p[0] = p[3]
-    p[0].append(p[1])
+def p_statements2(p):
+    '''statements : statements COMMA statement'''
+    p[0] = p[1]
+    p[0].append(p[3])
 
 def p_definitions1(p):
     '''definitions : function_definition'''
@@ -392,7 +401,7 @@ def p_error(p):
         print("Unexpected end of input")
     raise SystemExit
 
-parser = ply.yacc.yacc()
+parser = tables.load_parser(sys.modules[__name__], [lexer])
 
 if __name__ == '__main__':
     import argparse, codecs
@@ -401,10 +410,14 @@ if __name__ == '__main__':
     group = arg_parser.add_mutually_exclusive_group()
     group.add_argument('--who', action='store_true', help='who wrote this' )
     group.add_argument('-f', '--file', help='filename to process')
+    arg_parser.add_argument('--startup-stats', action='store_true',
+                            help='print lexer and parser loading times')
     ns = arg_parser.parse_args()
     outformat="unicode"
     if ns.treetype:
         outformat = ns.treetype
+    if ns.startup_stats:
+        tables.print_startup_stats(lexer, sys.modules[__name__], title="Startup:")
     if ns.who == True:
         print('H274830 Joonas Pelttari')
     elif ns.file is None:
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+#
+# Runs a stage of the interpreter for many .ph files in a pool of worker
+# processes and compares the output with the .output file next to each
+# .ph file (same name). The workers import the lexer and parser once and
+# then take files one at a time, so there is no interpreter start or table
+# loading per file.
+#
+#   python batch_runner.py [-s STAGE] [-e ENGINE] [-j JOBS] PATH...
+#
+# PATH is a .ph file, a directory (searched recursively) or a glob pattern.
+# The checks directory has small programs with their .output files for
+# cases that are easy to get wrong (python batch_runner.py checks).
+# Stages and their output:
+#
+#   tokens     the tokens, like lexer.py
+#   syntax     "syntax OK"
+#   tree       the syntax tree, like tree_generation.py
+#   semantics  the tree and symbol table, like symtbl_semantics_check.py
+#   run        the tree and the program's output, like main.py
+#
+# Errors in the program are part of the output (all errors, see
+# diagnostics.py). With --update the outputs are written as the new
+# .output files instead of being compared. A file that runs longer than
+# --timeout seconds is stopped (where the platform has SIGALRM) so that one
+# program that never ends doesn't hold up a worker.
+
+import argparse
+import concurrent.futures
+import contextlib
+import glob
+import io
+import os
+import signal
+import sys
+import time
+import lexer
+import tree_generation
+import tree_print
+import symtbl_semantics_check
+import source_input
+import main
+import optimizer
+from semantics_common import SemData
+from diagnostics import Diagnostics, PhError
+
+STAGES = ("tokens", "syntax", "tree", "semantics", "run")
+DEFAULT_TIMEOUT = 10.0
+
+
+class Timeout(Exception):
+    pass
+
+
+def on_alarm(signum, frame):
+    raise Timeout
+
+
+def find_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names
+                             if name.endswith(".ph"))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            files.extend(glob.glob(path, recursive=True))
+    return sorted(set(files))
+
+
+def golden_path(path):
+    return os.path.splitext(path)[0] + ".output"
+
+
+def init_worker(lexer_name, parser_name):
+    lexer.select_lexer(lexer_name)
+    tree_generation.select_parser(parser_name)
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, on_alarm)
+
+
+def run_stage(data, stage, engine, optimize):
+    '''Prints what the stage outputs for the program in data'''
+    diagnostics = Diagnostics()
+    lex = lexer.lexer
+    lex.lineno = 1
+    try:
+        with main.collect_errors(diagnostics):
+            if stage == "tokens":
+                lex.input(data)
+                for token in iter(lex.token, None):
+                    print(token)
+            else:
+                tree = tree_generation.parser.parse(data, lexer=lex, debug=False)
+        diagnostics.check()
+        if stage == "tokens":
+            return
+        if stage == "syntax":
+            print("syntax OK")
+            return
+        if stage == "tree":
+            tree_print.treeprint(tree)
+            return
+        semdata = SemData(diagnostics)
+        symtbl_semantics_check.semantic_checks(tree, semdata)
+        diagnostics.check()
+        tree_print.treeprint(tree)
+        if stage == "semantics":
+            symtbl_semantics_check.print_symbol_table(semdata, title="Symbol table:")
+            print("Semantics ok:")
+            return
+        if optimize:
+            optimizer.optimize(tree, semdata)
+        main.run_program(tree, semdata, engine)
+    except PhError as error:
+        print(error)
+
+
+def run_file(path, stage, engine, optimize, timeout):
+    '''Runs in a worker. Returns (output, seconds, timed out).'''
+    start = time.perf_counter()
+    out = io.StringIO()
+    timed_out = False
+    alarm = timeout and hasattr(signal, "SIGALRM")
+    with contextlib.redirect_stdout(out):
+        try:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            run_stage(source_input.read_source(path), stage, engine, optimize)
+        except Timeout:
+            timed_out = True
+        except Exception as e:
+            # Bugs in the interpreter itself, reported as the file's output
+            print(f"Internal error: {type(e).__name__}: {e}")
+        finally:
+            if alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    return out.getvalue(), time.perf_counter() - start, timed_out
+
+
+def first_difference(expected, output):
+    '''Line number and the differing lines, or None if equal. Line endings
+    and a missing final newline don't count as differences.'''
+    expected_lines = expected.replace("\r\n", "\n").rstrip("\n").split("\n")
+    output_lines = output.rstrip("\n").split("\n")
+    for number, (wanted, got) in enumerate(zip(expected_lines, output_lines), 1):
+        if wanted != got:
+            return number, wanted, got
+    if len(expected_lines) != len(output_lines):
+        number = min(len(expected_lines), len(output_lines)) + 1
+        return (number,
+                "<end>" if number > len(expected_lines) else expected_lines[number - 1],
+                "<end>" if number > len(output_lines) else output_lines[number - 1])
+    return None
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="run .ph files in parallel and compare with .output files")
+    arg_parser.add_argument('paths', nargs='+', help='.ph files, directories or globs')
+    arg_parser.add_argument('-s', '--stage', choices=STAGES, default="run",
+                            help='what to run (default: run)')
+    arg_parser.add_argument('-e', '--engine', choices=main.ENGINES, default="tree",
+                            help='execution engine for the run stage, see main.py -h (default: tree)')
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help='run the AST optimizer before execution')
+    arg_parser.add_argument('-l', '--lexer', choices=lexer.LEXERS, default="ply",
+                            help='lexer implementation (default: ply)')
+    arg_parser.add_argument('-p', '--parser', choices=tree_generation.PARSERS, default="ply",
+                            help='parser implementation (default: ply)')
+    arg_parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                            help='number of worker processes (default: number of CPUs)')
+    arg_parser.add_argument('-t', '--timeout', type=float, default=DEFAULT_TIMEOUT,
+                            help=f'seconds per file, 0 for no limit (default: {DEFAULT_TIMEOUT:g})')
+    arg_parser.add_argument('--update', action='store_true',
+                            help='write the outputs to the .output files')
+    ns = arg_parser.parse_args()
+    files = find_files(ns.paths)
+    if not files:
+        print("No .ph files found")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    passed = failed = missing = timeouts = 0
+    worker_time = 0.0
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=ns.jobs, initializer=init_worker,
+            initargs=(ns.lexer, ns.parser)) as pool:
+        futures = [pool.submit(run_file, path, ns.stage, ns.engine, ns.optimize, ns.timeout)
+                   for path in files]
+        for path, future in zip(files, futures):
+            output, seconds, timed_out = future.result()
+            worker_time += seconds
+            golden = golden_path(path)
+            difference = None
+            if timed_out:
+                status = "TIMEOUT"
+                timeouts += 1
+            elif ns.update:
+                with open(golden, "w", encoding="utf-8") as file:
+                    file.write(output)
+                status = "WROTE"
+            elif not os.path.exists(golden):
+                status = "MISSING"
+                missing += 1
+            else:
+                with open(golden, encoding="utf-8") as file:
+                    difference = first_difference(file.read(), output)
+                status = "FAIL" if difference else "ok"
+                if difference:
+                    failed += 1
+                else:
+                    passed += 1
+            print(f"{seconds:8.3f} s  {status:7} {path}")
+            if difference:
+                number, wanted, got = difference
+                print(f"           line {number}: expected: {wanted}")
+                print(f"           line {number}:      got: {got}")
+
+    print(f"{len(files)} files: {passed} ok, {failed} failed, {timeouts} timed out, "
+          f"{missing} without .output file")
+    print(f"{time.perf_counter() - start:.2f} s total, {worker_time:.2f} s in "
+          f"{min(ns.jobs, len(files))} worker processes")
+    sys.exit(1 if failed or timeouts else 0)
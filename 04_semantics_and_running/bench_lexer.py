@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the PLY lexer against the hand-written scanner (scanner.py):
+# tokenizes a multi-megabyte source with both and checks that they give
+# the same tokens.
+#
+#   python bench_lexer.py [-m MEGABYTES] [-f FILE]
+#
+# Without a file, the source is the sample program below repeated.
+
+import argparse
+import time
+import lexer
+import scanner
+
+SAMPLE = '''(% sample for the lexer benchmark %)
+var counter = 0
+var start = 2020-05-17
+var limit = 12'345
+function Square{ value[int] } return int is value * value end function
+procedure REPORT{ when[date] } return int
+  var total = 0
+is
+  total = when'day + Square(counter) - 1'000 / 2,
+  print "total" & total,
+  return total
+end procedure
+do
+  counter = counter + 1,
+  do limit = limit - REPORT(start) unless counter < 10 done
+until counter = 100
+'''
+
+
+def tokenize(lex, data):
+    lex.lineno = 1
+    lex.input(data)
+    tokens = []
+    token = lex.token
+    while True:
+        tok = token()
+        if tok is None:
+            return tokens
+        tokens.append((tok.type, tok.value, tok.lineno, tok.lexpos))
+
+
+def measure(name, lex, data):
+    start = time.perf_counter()
+    tokens = tokenize(lex, data)
+    seconds = time.perf_counter() - start
+    print(f"{name:8} {seconds:8.3f} s  {len(tokens) / seconds / 1e6:6.2f} M tokens/s")
+    return tokens, seconds
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-m', '--megabytes', type=float, default=4.0,
+                            help='size of the generated source (default: 4)')
+    arg_parser.add_argument('-f', '--file', help='tokenize this file instead')
+    ns = arg_parser.parse_args()
+    if ns.file:
+        with open(ns.file, encoding='utf-8') as file:
+            data = file.read()
+    else:
+        data = SAMPLE * int(ns.megabytes * 1e6 / len(SAMPLE) + 1)
+    print(f"{len(data) / 1e6:.1f} MB of source")
+    ply_tokens, ply_time = measure("PLY", lexer.ply_lexer.clone(), data)
+    scanner_tokens, scanner_time = measure("scanner", scanner.Scanner(lexer.reserved), data)
+    if ply_tokens != scanner_tokens:
+        print("Error, the lexers give different tokens")
+    else:
+        print(f"{len(ply_tokens)} identical tokens, scanner is "
+              f"{ply_time / scanner_time:.1f}x faster")
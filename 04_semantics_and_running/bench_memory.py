@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+#
+# Memory benchmark of the syntax tree: parses a generated program with N
+# statements and prints the bytes per node (everything the tree keeps
+# alive, tree.index included, measured with tracemalloc) for nodes with a
+# __dict__ (how all nodes were stored before the node classes), for the
+# __slots__ node classes of tree_generation, and for
+# columnar_ast.ColumnarTree.
+#
+#   python bench_memory.py [-p PARSER] [N]
+
+import argparse
+import gc
+import tracemalloc
+import lexer
+import tree_generation
+import tree_print
+import columnar_ast
+import bench_semantics
+
+
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node is not None:
+            count += 1
+            stack.extend(tree_print.get_children(node))
+    return count
+
+
+def measure(parser, data, columnar=False):
+    '''Returns (nodes, bytes) of the tree of data'''
+    lex = lexer.lexer
+    lex.lineno = 1
+    gc.collect()
+    tracemalloc.start()
+    tree = parser.parse(data, lexer=lex, debug=False)
+    nodes = count_nodes(tree)
+    if columnar:
+        tree = columnar_ast.ColumnarTree.from_tree(tree)
+    # The input was made before tracing started, so what is counted is
+    # the tree (and the few objects the parser still has)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return nodes, size
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-p', '--parser', choices=tree_generation.PARSERS, default="ply",
+                            help='parser implementation (default: ply)')
+    arg_parser.add_argument('size', nargs='?', type=int, default=100_000,
+                            help='number of statements (default: 100000)')
+    ns = arg_parser.parse_args()
+    parser = tree_generation.select_parser(ns.parser)
+    data = bench_semantics.generate(ns.size)
+
+    # Without node classes every node type gets a DictNode
+    node_classes = tree_generation.NODE_CLASSES
+    tree_generation.NODE_CLASSES = {}
+    try:
+        nodes, dict_size = measure(parser, data)
+    finally:
+        tree_generation.NODE_CLASSES = node_classes
+    nodes, slots_size = measure(parser, data)
+    nodes, columnar_size = measure(parser, data, columnar=True)
+
+    print(f"{ns.size} statements, {nodes} nodes")
+    print(f"  __dict__ nodes: {dict_size / nodes:6.1f} bytes/node")
+    print(f"  __slots__ nodes: {slots_size / nodes:5.1f} bytes/node")
+    print(f"  columnar:       {columnar_size / nodes:6.1f} bytes/node")
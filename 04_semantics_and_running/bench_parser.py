@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+#
+# Scaling benchmark of the parser: parses generated programs with N
+# comma-separated statements and prints the time per statement, which
+# should stay about the same as N grows (statement lists are built in
+# linear time).
+#
+#   python bench_parser.py [-l LEXER] [-p PARSER] [N ...]
+
+import argparse
+import time
+import lexer
+import tree_generation
+
+
+def generate(statements):
+    lines = ["var counter = 0", "var total = 0"]
+    lines.append(",\n".join(
+        "counter = counter + 1" if i % 2 else "total = total + counter"
+        for i in range(statements)))
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-l', '--lexer', choices=lexer.LEXERS, default="scanner",
+                            help='lexer implementation (default: scanner)')
+    arg_parser.add_argument('-p', '--parser', choices=tree_generation.PARSERS, default="ply",
+                            help='parser implementation (default: ply)')
+    arg_parser.add_argument('sizes', nargs='*', type=int,
+                            default=[10_000, 100_000, 1_000_000],
+                            help='numbers of statements (default: 10^4 10^5 10^6)')
+    ns = arg_parser.parse_args()
+    lex = lexer.select_lexer(ns.lexer)
+    parser = tree_generation.select_parser(ns.parser)
+    for size in ns.sizes:
+        data = generate(size)
+        lex.lineno = 1
+        start = time.perf_counter()
+        tree = parser.parse(data, lexer=lex, debug=False)
+        seconds = time.perf_counter() - start
+        assert len(tree.children_statements) == size
+        print(f"{size:>9} statements {seconds:8.2f} s  "
+              f"{seconds / size * 1e6:6.2f} us/statement")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+#
+# Benchmark of the semantic checks: runs every check in a traversal of its
+# own (like the checks were run before), then the checks fused into two
+# traversals, and then the same two traversals with the node index of the
+# parser (tree.index, see semantics_common.visit_checks), on a generated
+# program with N statements and D more functions (which all use the same
+# formal arg and local variable names, each in its own scope).
+#
+#   python bench_semantics.py [N [D]]
+
+import sys
+import time
+import lexer
+import tree_generation
+import symtbl_semantics_check
+from semantics_common import visit_checks, SemData
+
+FUNCTIONS = '''function Twice{ value[int] } return int is value * 2 end function
+function Later{ days[int] } return int is days + 1 end function
+procedure ADD{ amount[int] } return int
+  var step = 1
+is
+  total = total + Twice(amount) - step,
+  return total
+end procedure
+'''
+
+DEFINITION = '''function Step{number}{{ value[int], days[int] }} return int
+  var step = {step}
+is value + days * step end function
+'''
+
+
+def generate(statements, definitions=0):
+    lines = ["var total = 0", "var day = 2020-01-01", FUNCTIONS]
+    lines.extend(DEFINITION.format(number=number, step=number % 10)
+                 for number in range(definitions))
+    body = []
+    for i in range(statements):
+        kind = i % 4
+        if kind == 0 and definitions:
+            body.append(f"total = ADD(Step{i % definitions}(total, 1))")
+        elif kind == 0:
+            body.append("total = ADD(total)")
+        elif kind == 1:
+            body.append("print total & day'month & \"text\"")
+        elif kind == 2:
+            body.append("day.day = Later(Twice(day'day))")
+        else:
+            body.append("do total = total + 1 unless total < 10 otherwise total = 0 done")
+    lines.append(",\n".join(body))
+    return "\n".join(lines) + "\n"
+
+
+def measure(tree, passes):
+    semdata = SemData()
+    start = time.perf_counter()
+    for checks in passes:
+        visit_checks(tree, checks, semdata)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    definitions = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+    lex = lexer.select_lexer("scanner")
+    tree = tree_generation.select_parser("descent").parse(generate(size, definitions), lexer=lex)
+    checks = symtbl_semantics_check.COLLECT_CHECKS + symtbl_semantics_check.USE_CHECKS
+    separate = measure(tree, [[check] for check in checks])
+    fused = measure(tree, [symtbl_semantics_check.COLLECT_CHECKS,
+                           symtbl_semantics_check.USE_CHECKS])
+    start = time.perf_counter()
+    symtbl_semantics_check.semantic_checks(tree, SemData())
+    indexed = time.perf_counter() - start
+    print(f"{size} statements, {definitions + 3} functions and procedures")
+    print(f"  {len(checks)} traversals: {separate:.2f} s")
+    print(f"  2 traversals: {fused:.2f} s ({separate / fused:.1f}x faster)")
+    print(f"  with index: {indexed:.2f} s ({separate / indexed:.1f}x faster)")
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+#
+# Bytecode compiler and stack VM. The checked syntax tree is lowered into a
+# flat instruction stream (two parallel lists: opcodes and already resolved
+# operands, e.g. symbol data objects, constants and jump addresses) which is
+# then executed by a single dispatch loop. Loops and unless statements and
+# expressions become conditional jumps, function and procedure calls push a
+# frame (see callstack.py) and a return address instead of recursing in
+# Python, and return_stmt is a plain RETURN. Neither compiling nor running
+# uses Python recursion, so tree depth and call depth are only limited by
+# memory.
+#
+# A Code object is not modified by running it, all run time data is in the
+# RunState passed to run_code (or local to it).
+
+from memoize import MISSING
+
+# Opcodes. The numbering is also the order of the tests in the dispatch
+# loop, so the most common instructions come first.
+LOAD_VAR = 0
+LOAD_LOCAL = 1
+LOAD_CONST = 2
+STORE_VAR = 3
+STORE_LOCAL = 4
+BINARY_ADD = 5
+BINARY_SUB = 6
+BINARY_MUL = 7
+BINARY_DIV = 8
+COMPARE_EQ = 9
+COMPARE_LT = 10
+JUMP = 11
+JUMP_IF_TRUE = 12
+JUMP_IF_FALSE = 13
+CALL = 14
+RETURN = 15
+LOAD_DATE_ATTR = 16
+REPLACE_DATE_ATTR = 17
+PRINT = 18
+POP = 19
+PRINT_ERROR = 20
+COUNT_ITERATIONS = 21
+COUNTED_UNTIL_VAR = 22
+COUNTED_UNTIL_LOCAL = 23
+HALT = 24
+
+OPNAMES = [
+    "LOAD_VAR", "LOAD_LOCAL", "LOAD_CONST", "STORE_VAR", "STORE_LOCAL",
+    "BINARY_ADD", "BINARY_SUB", "BINARY_MUL", "BINARY_DIV", "COMPARE_EQ",
+    "COMPARE_LT", "JUMP", "JUMP_IF_TRUE", "JUMP_IF_FALSE", "CALL", "RETURN",
+    "LOAD_DATE_ATTR", "REPLACE_DATE_ATTR", "PRINT", "POP", "PRINT_ERROR",
+    "COUNT_ITERATIONS", "COUNTED_UNTIL_VAR", "COUNTED_UNTIL_LOCAL", "HALT",
+]
+
+BINARY_OPCODES = {
+    "+_op": BINARY_ADD,
+    "-_op": BINARY_SUB,
+    "*_op": BINARY_MUL,
+    "/_op": BINARY_DIV,
+    "=_op": COMPARE_EQ,
+    "<_op": COMPARE_LT,
+}
+
+DATE_ATTRS = ("day", "month", "year")
+
+
+# A compiled program: instruction i is (ops[i], args[i]). Global variables
+# are referred to by slot, global_init has their initial values.
+class Code:
+    def __init__(self, global_init=()):
+        self.ops = []
+        self.args = []
+        self.global_init = list(global_init)
+
+    def emit(self, op, arg=None):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def here(self):
+        return len(self.ops)
+
+    def patch(self, index, arg):
+        self.args[index] = arg
+
+
+# A forward jump whose target is patched when the compiler gets there
+class ForwardJump:
+    def __init__(self, code, op):
+        self.code = code
+        self.op = op
+        self.index = None
+
+    def emit(self):
+        self.index = self.code.emit(self.op)
+
+    def land(self):
+        self.code.patch(self.index, self.code.here())
+
+
+# Work items of the compiler: compile a node as a statement or an expression.
+# The compiler keeps its own stack of work items (and callables doing
+# emits/patches in between), so deeply nested trees don't need Python
+# recursion.
+STMT = 0
+EXPR = 1
+
+
+class Compiler:
+    def __init__(self, semdata):
+        self.semdata = semdata
+        self.memo = getattr(semdata, "memo", None)
+        self.code = Code(semdata.global_init)
+        # function_def/procedure_def node -> start address of its body
+        self.function_addrs = dict()
+        # (instruction index, definition node) of CALLs to be patched
+        self.call_fixups = []
+        self.work = []
+
+    def compile_program(self, tree):
+        code = self.code
+        self.compile_all([(STMT, i) for i in tree.children_definitions] +
+                         [(STMT, i) for i in tree.children_statements])
+        code.emit(HALT)
+        # Function and procedure bodies are placed after the main program.
+        # The frame is already pushed when the body starts, the body leaves
+        # the return value on the stack.
+        for i in tree.children_definitions:
+            if i.nodetype == "function_def":
+                self.function_addrs[i] = code.here()
+                self.compile_all([(STMT, j) for j in i.children_var_defs] +
+                                 [(EXPR, i.child_body)])
+                code.emit(RETURN)
+            elif i.nodetype == "procedure_def":
+                self.function_addrs[i] = code.here()
+                self.compile_all([(STMT, j) for j in i.children_var_defs] +
+                                 [(STMT, j) for j in i.children_stmts])
+                code.emit(LOAD_CONST, None)
+                code.emit(RETURN)
+        for index, def_node in self.call_fixups:
+            addr, nargs, framesize, pure = code.args[index]
+            code.patch(index,
+                       (self.function_addrs[def_node], nargs, framesize, pure))
+        return code
+
+    def compile_all(self, items):
+        work = self.work
+        self.schedule(items)
+        while work:
+            item = work.pop()
+            if callable(item):
+                item()
+            elif item[0] == STMT:
+                self.compile_stmt(item[1])
+            else:
+                self.compile_expr(item[1])
+
+    # Add items to be compiled next, in the given order
+    def schedule(self, items):
+        self.work.extend(reversed(items))
+
+    def emitter(self, op, arg=None):
+        code = self.code
+        return lambda: code.emit(op, arg)
+
+    def load(self, symdata):
+        if symdata.is_local:
+            return self.emitter(LOAD_LOCAL, symdata.slot)
+        return self.emitter(LOAD_VAR, symdata.slot)
+
+    def store(self, symdata):
+        if symdata.is_local:
+            return self.emitter(STORE_LOCAL, symdata.slot)
+        return self.emitter(STORE_VAR, symdata.slot)
+
+    def call(self, node):
+        def_node = node.child_name.symdata.defnode
+        # Cached pure functions are called with memo entry in the operand
+        pure = self.memo.get(def_node) if self.memo else None
+        def emit_call():
+            index = self.code.emit(
+                CALL, (None, len(node.children_args), def_node.framesize, pure))
+            self.call_fixups.append((index, def_node))
+        # Arguments are evaluated in the caller's frame
+        return [(EXPR, arg) for arg in node.children_args] + [emit_call]
+
+    def compile_stmt(self, node):
+        code = self.code
+        nodetype = node.nodetype
+        if nodetype == "variable_def":
+            self.schedule([(EXPR, node.child_init_value), self.store(node.symdata)])
+
+        elif nodetype == "assignment":
+            l_value = node.child_lvalue
+            items = [(EXPR, node.child_rvalue)]
+            if l_value.nodetype == "id_name":
+                items.append(self.store(l_value.symdata))
+            elif l_value.nodetype == "attr_assign":
+                attr = l_value.child_attr.value
+                if attr in DATE_ATTRS:
+                    symdata = l_value.child_var.symdata
+                    items += [self.load(symdata),
+                              self.emitter(REPLACE_DATE_ATTR, attr),
+                              self.store(symdata)]
+                else:
+                    items += [self.emitter(POP),
+                              self.emitter(PRINT_ERROR,
+                                           f"Error, unknown date attr type: {attr}")]
+            else:
+                items += [self.emitter(POP),
+                          self.emitter(PRINT_ERROR,
+                                       f"Error, unknown assingment type: {l_value.nodetype}")]
+            self.schedule(items)
+
+        elif nodetype == "print_statement":
+            self.schedule([(EXPR, i) for i in node.children_printitems] +
+                          [self.emitter(PRINT, len(node.children_printitems))])
+
+        elif nodetype == "loop_statement":
+            counted = getattr(node, "counted", None)
+            if counted is not None:
+                self.compile_counted_loop(node, counted)
+            else:
+                top = code.here()
+                self.schedule([(STMT, i) for i in node.children_stmts] +
+                              [(EXPR, node.child_condition),
+                               self.emitter(JUMP_IF_FALSE, top)])
+
+        elif nodetype == "unless_stmt":
+            to_otherwise = ForwardJump(code, JUMP_IF_TRUE)
+            to_end = ForwardJump(code, JUMP)
+            self.schedule([(EXPR, node.child_unless), to_otherwise.emit] +
+                          [(STMT, i) for i in node.children_stmts] +
+                          [to_end.emit, to_otherwise.land] +
+                          [(STMT, i) for i in node.children_otherwise] +
+                          [to_end.land])
+
+        elif nodetype == "procedure_call":
+            self.schedule(self.call(node) + [self.emitter(POP)])
+
+        elif nodetype == "return_stmt":
+            self.schedule([(EXPR, node.child_expr), self.emitter(RETURN)])
+
+        elif nodetype == "function_def" or nodetype == "procedure_def":
+            pass
+
+        else:
+            code.emit(PRINT_ERROR, "Error, unknown node of type " + nodetype)
+
+    # Counted loop (see loop_optimizer.py). The number of iterations is
+    # computed at loop entry into counted.count_var, -1 means that the
+    # condition has to be evaluated normally:
+    #        <counter> <limit> COUNT_ITERATIONS, store count_var
+    #   top: <body>
+    #        COUNTED_UNTIL (count_var, top, end)
+    #        <condition> JUMP_IF_FALSE top
+    #   end:
+    def compile_counted_loop(self, node, counted):
+        code = self.code
+        count_var = counted.count_var
+        top = []
+        until = []
+        def mark_top():
+            top.append(code.here())
+        def emit_until():
+            if count_var.is_local:
+                until.append(code.emit(COUNTED_UNTIL_LOCAL))
+            else:
+                until.append(code.emit(COUNTED_UNTIL_VAR))
+        def emit_jump_back():
+            code.emit(JUMP_IF_FALSE, top[0])
+            code.patch(until[0], (count_var.slot, top[0], code.here()))
+        self.schedule([self.load(counted.counter), (EXPR, counted.limit),
+                       self.emitter(COUNT_ITERATIONS, counted),
+                       self.store(count_var), mark_top] +
+                      [(STMT, i) for i in node.children_stmts] +
+                      [emit_until, (EXPR, node.child_condition), emit_jump_back])
+
+    def compile_expr(self, node):
+        code = self.code
+        nodetype = node.nodetype
+        if nodetype == "id_name":
+            self.load(node.symdata)()
+        elif nodetype in ("int_literal", "date_literal", "string_literal"):
+            code.emit(LOAD_CONST, node.value)
+
+        elif nodetype in BINARY_OPCODES:
+            self.schedule([(EXPR, node.child_left_expr),
+                           (EXPR, node.child_right_expr),
+                           self.emitter(BINARY_OPCODES[nodetype])])
+
+        elif nodetype == "attr_read":
+            attr = node.child_attr.value
+            if attr in DATE_ATTRS:
+                self.load(node.child_var.symdata)()
+                code.emit(LOAD_DATE_ATTR, attr)
+            else:
+                code.emit(PRINT_ERROR, f"Error, unknown date attr type: {attr}")
+                code.emit(LOAD_CONST, None)
+
+        elif nodetype == "unless_expr":
+            to_otherwise = ForwardJump(code, JUMP_IF_TRUE)
+            to_end = ForwardJump(code, JUMP)
+            self.schedule([(EXPR, node.child_unless), to_otherwise.emit,
+                           (EXPR, node.child_do), to_end.emit, to_otherwise.land,
+                           (EXPR, node.child_otherwise), to_end.land])
+
+        elif nodetype == "function_call" or nodetype == "procedure_call":
+            self.schedule(self.call(node))
+
+        else:
+            code.emit(PRINT_ERROR, "Error, unknown node of type " + nodetype)
+            code.emit(LOAD_CONST, None)
+
+
+def compile_program(tree, semdata):
+    return Compiler(semdata).compile_program(tree)
+
+
+# state is a RunState made with code.global_init, its output is not flushed
+def run_code(code, state):
+    ops = code.ops
+    args = code.args
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    global_values = state.globals
+    caches = state.caches
+    output = state.output
+    pool = state.callstack.pool
+    # (return address, caller's frame, PureFunction or None, cache key)
+    # for every active call
+    calls = []
+    frame = state.callstack.frame
+    slots = frame.slots
+    pc = 0
+    while True:
+        op = ops[pc]
+        arg = args[pc]
+        pc += 1
+        if op == LOAD_VAR:
+            push(global_values[arg])
+        elif op == LOAD_LOCAL:
+            push(slots[arg])
+        elif op == LOAD_CONST:
+            push(arg)
+        elif op == STORE_VAR:
+            global_values[arg] = pop()
+        elif op == STORE_LOCAL:
+            slots[arg] = pop()
+        elif op == BINARY_ADD:
+            right = pop()
+            stack[-1] = stack[-1] + right
+        elif op == BINARY_SUB:
+            right = pop()
+            stack[-1] = stack[-1] - right
+        elif op == BINARY_MUL:
+            right = pop()
+            stack[-1] = stack[-1] * right
+        elif op == BINARY_DIV:
+            right = pop()
+            stack[-1] = stack[-1] / right
+        elif op == COMPARE_EQ:
+            right = pop()
+            stack[-1] = stack[-1] == right
+        elif op == COMPARE_LT:
+            right = pop()
+            stack[-1] = stack[-1] < right
+        elif op == JUMP:
+            pc = arg
+        elif op == JUMP_IF_TRUE:
+            if pop():
+                pc = arg
+        elif op == JUMP_IF_FALSE:
+            if not pop():
+                pc = arg
+        elif op == CALL:
+            addr, nargs, framesize, pure = arg
+            key = None
+            if pure is not None:
+                key = pure.make_key(stack[len(stack) - nargs:], global_values)
+                result = caches[pure.index].get(key)
+                if result is not MISSING:
+                    if nargs:
+                        del stack[-nargs:]
+                    push(result)
+                    continue
+            calls.append((pc, frame, pure, key))
+            frame = pool.acquire(framesize)
+            slots = frame.slots
+            if nargs:
+                slots[:nargs] = stack[-nargs:]
+                del stack[-nargs:]
+            pc = addr
+        elif op == RETURN:
+            if not calls:
+                # return_stmt in the main program ends it
+                return
+            pool.release(frame)
+            pc, frame, pure, key = calls.pop()
+            slots = frame.slots
+            if pure is not None:
+                caches[pure.index].put(key, stack[-1])
+        elif op == LOAD_DATE_ATTR:
+            stack[-1] = getattr(stack[-1], arg)
+        elif op == REPLACE_DATE_ATTR:
+            date = pop()
+            stack[-1] = date.replace(**{arg: stack[-1]})
+        elif op == PRINT:
+            values = stack[-arg:]
+            del stack[-arg:]
+            output.print_values(values)
+        elif op == POP:
+            pop()
+        elif op == PRINT_ERROR:
+            state.print_error(arg)
+        elif op == COUNT_ITERATIONS:
+            limit = pop()
+            stack[-1] = arg.iterations(stack[-1], limit)
+        elif op == COUNTED_UNTIL_VAR:
+            slot, top, end = arg
+            count = global_values[slot]
+            if count >= 0:
+                count -= 1
+                global_values[slot] = count
+                pc = top if count > 0 else end
+        elif op == COUNTED_UNTIL_LOCAL:
+            slot, top, end = arg
+            count = slots[slot]
+            if count >= 0:
+                count -= 1
+                slots[slot] = count
+                pc = top if count > 0 else end
+        elif op == HALT:
+            return
+        else:
+            raise ValueError(f"Bad opcode {op} at {pc - 1}")
+
+
+# Readable listing of the instruction stream, for debugging and profiling
+def disassemble(code):
+    lines = []
+    for addr, (op, arg) in enumerate(zip(code.ops, code.args)):
+        line = f"{addr:5} {OPNAMES[op]}"
+        if arg is not None:
+            line += f" {arg!r}" if isinstance(arg, str) else f" {arg}"
+        lines.append(line)
+    return "\n".join(lines)
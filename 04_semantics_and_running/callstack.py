@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+#
+# Activation records for function and procedure calls. Every function_def
+# and procedure_def has a fixed frame layout (see resolve.py): formal args
+# first, then its local variable definitions (children_var_defs). Frames
+# are recycled through a pool so calls don't allocate new slot lists.
+# The bottom frame holds the global variables.
+#
+# Early return doesn't use exceptions: return_stmt sets frame.returning and
+# frame.retval, and statement lists stop executing when they see the flag.
+
+from semantics_common import visit_tree, STOP
+
+
+class Frame:
+    __slots__ = ("slots", "retval", "returning", "caller")
+
+    def __init__(self, size):
+        self.slots = [None] * size
+        self.retval = None
+        self.returning = False
+        self.caller = None
+
+
+class FramePool:
+    def __init__(self):
+        # frame size -> list of free frames of that size
+        self.free = dict()
+
+    def acquire(self, size):
+        free = self.free.get(size)
+        if free:
+            return free.pop()
+        return Frame(size)
+
+    def release(self, frame):
+        frame.retval = None
+        frame.returning = False
+        frame.caller = None
+        self.free.setdefault(len(frame.slots), []).append(frame)
+
+
+class CallStack:
+    '''The chain of active frames. The bottom frame belongs to the main
+    program, its slots are the global variables (initialized from
+    global_init) and a return_stmt there ends the program.'''
+
+    def __init__(self, global_init=()):
+        self.pool = FramePool()
+        self.frame = Frame(0)
+        self.frame.slots = list(global_init)
+        self.globals = self.frame.slots
+        self.depth = 0
+
+    def snapshot(self):
+        '''Copy of the global variable values'''
+        return list(self.globals)
+
+    def restore(self, values):
+        '''Set all global variables back to a snapshot'''
+        self.globals[:] = values
+
+    def push(self, size):
+        frame = self.pool.acquire(size)
+        frame.caller = self.frame
+        self.frame = frame
+        self.depth += 1
+        return frame
+
+    def pop(self):
+        '''Remove the topmost frame, returns its return value'''
+        frame = self.frame
+        retval = frame.retval
+        self.frame = frame.caller
+        self.depth -= 1
+        self.pool.release(frame)
+        return retval
+
+
+# Check if executing a statement can set the returning flag
+def contains_return(node):
+    return visit_tree(node, lambda node, semdata: STOP,
+                      nodetypes=("return_stmt",)) is not None
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+#
+# Closure compilation engine. The checked syntax tree is turned into nested
+# Python closures once, so that node types, operators, literals and date
+# attributes are resolved at compile time instead of on every visit like
+# main.eval_node does. The tree-walker in main.py stays as the reference
+# engine, this one must produce exactly the same output.
+#
+# The closures don't capture any run time state: every closure takes the
+# RunState (runstate.py) of the current run as its only argument, so one
+# compiled program can be run many times, also concurrently.
+
+import operator
+from callstack import contains_return
+from memoize import MISSING
+
+
+BINARY_OPS = {
+    "*_op": operator.mul,
+    "/_op": operator.truediv,
+    "+_op": operator.add,
+    "-_op": operator.sub,
+    "=_op": operator.eq,
+    "<_op": operator.lt,
+}
+
+
+class CompileContext:
+    def __init__(self, semdata):
+        self.semdata = semdata
+        self.memo = getattr(semdata, "memo", None)
+        # function_def/procedure_def node -> one element list holding its
+        # compiled body. Calls bind to the list, so subroutines can be called
+        # before (or from inside) their own definition is compiled.
+        self.function_bodies = dict()
+
+
+def compile_program(tree, semdata):
+    '''Compile the whole program, returns a function that runs it given
+    a RunState'''
+    ctx = CompileContext(semdata)
+    return compile_node(tree, ctx)
+
+
+def compile_node(node, ctx):
+    compiler = NODE_COMPILERS.get(node.nodetype)
+    if compiler is None:
+        if node.nodetype in BINARY_OPS:
+            return compile_binary_op(node, ctx)
+        return compile_unknown(node, ctx)
+    return compiler(node, ctx)
+
+
+# Compile a list of statements into one closure. The returning flag of the
+# current frame only needs checking after statements that contain a
+# return_stmt.
+def compile_block(nodes, ctx):
+    funcs = tuple(compile_node(i, ctx) for i in nodes)
+    if any(contains_return(i) for i in nodes):
+        checks = tuple(contains_return(i) for i in nodes)
+        steps = tuple(zip(funcs, checks))
+        def run_returning_block(st):
+            frame = st.callstack.frame
+            for func, check in steps:
+                func(st)
+                if check and frame.returning:
+                    return
+        return run_returning_block
+    if len(funcs) == 0:
+        def run_block(st):
+            pass
+    elif len(funcs) == 1:
+        run_block = funcs[0]
+    elif len(funcs) == 2:
+        first, second = funcs
+        def run_block(st):
+            first(st)
+            second(st)
+    else:
+        def run_block(st):
+            for func in funcs:
+                func(st)
+    return run_block
+
+
+def compile_program_node(node, ctx):
+    run_defs = compile_block(node.children_definitions, ctx)
+    run_stmts = compile_block(node.children_statements, ctx)
+    def run_program(st):
+        run_defs(st)
+        run_stmts(st)
+    return run_program
+
+
+# Closures reading and writing a variable, which is either a global slot
+# or a slot in the current call frame
+def compile_load(symdata, ctx):
+    slot = symdata.slot
+    if not symdata.is_local:
+        return lambda st: st.globals[slot]
+    return lambda st: st.callstack.frame.slots[slot]
+
+
+def compile_store(symdata, value_func, ctx):
+    slot = symdata.slot
+    if not symdata.is_local:
+        def run_store_global(st):
+            st.globals[slot] = value_func(st)
+        return run_store_global
+    def run_store_local(st):
+        st.callstack.frame.slots[slot] = value_func(st)
+    return run_store_local
+
+
+def compile_variable_def(node, ctx):
+    return compile_store(node.symdata, compile_node(node.child_init_value, ctx), ctx)
+
+
+def compile_literal(node, ctx):
+    value = node.value
+    return lambda st: value
+
+
+def compile_id_name(node, ctx):
+    return compile_load(node.symdata, ctx)
+
+
+def compile_binary_op(node, ctx):
+    op = BINARY_OPS[node.nodetype]
+    left = node.child_left_expr
+    right = node.child_right_expr
+    # Specialize the most common operand shapes so that they don't need an
+    # extra closure call per operand
+    if is_global(left) and right.nodetype == "int_literal":
+        left_slot = left.symdata.slot
+        right_value = right.value
+        return lambda st: op(st.globals[left_slot], right_value)
+    if is_global(left) and is_global(right):
+        left_slot = left.symdata.slot
+        right_slot = right.symdata.slot
+        def run_global_op(st):
+            global_values = st.globals
+            return op(global_values[left_slot], global_values[right_slot])
+        return run_global_op
+    left_func = compile_node(left, ctx)
+    if right.nodetype == "int_literal":
+        right_value = right.value
+        return lambda st: op(left_func(st), right_value)
+    right_func = compile_node(right, ctx)
+    return lambda st: op(left_func(st), right_func(st))
+
+
+def is_global(node):
+    return node.nodetype == "id_name" and not node.symdata.is_local
+
+
+def compile_attr_read(node, ctx):
+    date = compile_load(node.child_var.symdata, ctx)
+    attr = node.child_attr.value
+    if attr == "day":
+        return lambda st: date(st).day
+    if attr == "month":
+        return lambda st: date(st).month
+    if attr == "year":
+        return lambda st: date(st).year
+    def run_unknown_attr(st):
+        st.print_error(f"Error, unknown date attr type: {attr}")
+    return run_unknown_attr
+
+
+def compile_assignment(node, ctx):
+    l_value = node.child_lvalue
+    r_value = compile_node(node.child_rvalue, ctx)
+    nodetype = l_value.nodetype
+    if nodetype == "id_name":
+        return compile_store(l_value.symdata, r_value, ctx)
+    if nodetype == "attr_assign":
+        symdata = l_value.child_var.symdata
+        date = compile_load(symdata, ctx)
+        attr = l_value.child_attr.value
+        if attr in ("day", "month", "year"):
+            def replaced_date(st):
+                value = r_value(st)
+                return date(st).replace(**{attr: value})
+            return compile_store(symdata, replaced_date, ctx)
+        def run_unknown_attr_assignment(st):
+            r_value(st)
+            st.print_error(f"Error, unknown date attr type: {attr}")
+        return run_unknown_attr_assignment
+    def run_unknown_assignment(st):
+        r_value(st)
+        st.print_error(f"Error, unknown assingment type: {nodetype}")
+    return run_unknown_assignment
+
+
+def compile_print_statement(node, ctx):
+    items = tuple(compile_node(i, ctx) for i in node.children_printitems)
+    if len(items) == 1:
+        item = items[0]
+        def run_print(st):
+            st.output.print_values((item(st),))
+        return run_print
+    def run_print(st):
+        st.output.print_values([item(st) for item in items])
+    return run_print
+
+
+def compile_loop_statement(node, ctx):
+    body = compile_block(node.children_stmts, ctx)
+    condition = compile_node(node.child_condition, ctx)
+    counted = getattr(node, "counted", None)
+    if counted is not None:
+        return compile_counted_loop(node, counted, body, condition, ctx)
+    if contains_return(node):
+        def run_returning_loop(st):
+            frame = st.callstack.frame
+            while True:
+                body(st)
+                if frame.returning or condition(st):
+                    break
+        return run_returning_loop
+    def run_loop(st):
+        while True:
+            body(st)
+            if condition(st):
+                break
+    return run_loop
+
+
+# Loop annotated by loop_optimizer: the number of iterations is computed at
+# loop entry, the condition is only evaluated if the counter can't reach
+# the limit
+def compile_counted_loop(node, counted, body, condition, ctx):
+    counter = compile_load(counted.counter, ctx)
+    limit = compile_node(counted.limit, ctx)
+    iterations = counted.iterations
+    returning = contains_return(node)
+    def run_counted_loop(st):
+        count = iterations(counter(st), limit(st))
+        if count < 0:
+            frame = st.callstack.frame
+            while True:
+                body(st)
+                if frame.returning or condition(st):
+                    break
+        elif returning:
+            frame = st.callstack.frame
+            for i in range(count):
+                body(st)
+                if frame.returning:
+                    break
+        else:
+            for i in range(count):
+                body(st)
+    return run_counted_loop
+
+
+def compile_unless_stmt(node, ctx):
+    do_block = compile_block(node.children_stmts, ctx)
+    otherwise_block = compile_block(node.children_otherwise, ctx)
+    condition = compile_node(node.child_unless, ctx)
+    def run_unless(st):
+        if not condition(st):
+            do_block(st)
+        else:
+            otherwise_block(st)
+    return run_unless
+
+
+def compile_unless_expr(node, ctx):
+    condition = compile_node(node.child_unless, ctx)
+    do_expr = compile_node(node.child_do, ctx)
+    otherwise_expr = compile_node(node.child_otherwise, ctx)
+    def run_unless_expr(st):
+        if not condition(st):
+            return do_expr(st)
+        return otherwise_expr(st)
+    return run_unless_expr
+
+
+# The compiled body of a function or procedure runs in an already pushed
+# frame: it initializes the local variables and sets frame.retval
+def compile_function_def(node, ctx):
+    cell = ctx.function_bodies.setdefault(node, [None])
+    init_locals = compile_block(node.children_var_defs, ctx)
+    body = compile_node(node.child_body, ctx)
+    def run_function_body(st):
+        init_locals(st)
+        st.callstack.frame.retval = body(st)
+    cell[0] = run_function_body
+    def run_function_def(st):
+        pass
+    return run_function_def
+
+
+def compile_procedure_def(node, ctx):
+    cell = ctx.function_bodies.setdefault(node, [None])
+    init_locals = compile_block(node.children_var_defs, ctx)
+    stmts = compile_block(node.children_stmts, ctx)
+    def run_procedure_body(st):
+        init_locals(st)
+        stmts(st)
+    cell[0] = run_procedure_body
+    def run_procedure_def(st):
+        pass
+    return run_procedure_def
+
+
+def compile_call(node, ctx):
+    def_node = node.child_name.symdata.defnode
+    cell = ctx.function_bodies.setdefault(def_node, [None])
+    args = tuple(compile_node(arg, ctx) for arg in node.children_args)
+    nargs = len(args)
+    framesize = def_node.framesize
+    pure = ctx.memo.get(def_node) if ctx.memo else None
+    if pure is not None:
+        make_key = pure.make_key
+        index = pure.index
+        def run_memoized_call(st):
+            values = [arg(st) for arg in args]
+            key = make_key(values, st.globals)
+            cache = st.caches[index]
+            result = cache.get(key)
+            if result is MISSING:
+                callstack = st.callstack
+                frame = callstack.push(framesize)
+                frame.slots[:nargs] = values
+                cell[0](st)
+                result = callstack.pop()
+                cache.put(key, result)
+            return result
+        return run_memoized_call
+    def run_call(st):
+        # Arguments are evaluated in the caller's frame
+        values = [arg(st) for arg in args]
+        callstack = st.callstack
+        frame = callstack.push(framesize)
+        frame.slots[:nargs] = values
+        cell[0](st)
+        return callstack.pop()
+    return run_call
+
+
+def compile_return_stmt(node, ctx):
+    expr = compile_node(node.child_expr, ctx)
+    def run_return(st):
+        frame = st.callstack.frame
+        frame.retval = expr(st)
+        frame.returning = True
+    return run_return
+
+
+# Node types the reference engine doesn't know either. Report the same way
+# at run time.
+def compile_unknown(node, ctx):
+    nodetype = node.nodetype
+    def run_unknown(st):
+        st.print_error("Error, unknown node of type " + nodetype)
+    return run_unknown
+
+
+NODE_COMPILERS = {
+    "program": compile_program_node,
+    "variable_def": compile_variable_def,
+    "int_literal": compile_literal,
+    "date_literal": compile_literal,
+    "string_literal": compile_literal,
+    "id_name": compile_id_name,
+    "attr_read": compile_attr_read,
+    "assignment": compile_assignment,
+    "print_statement": compile_print_statement,
+    "loop_statement": compile_loop_statement,
+    "unless_stmt": compile_unless_stmt,
+    "unless_expr": compile_unless_expr,
+    "function_def": compile_function_def,
+    "procedure_def": compile_procedure_def,
+    "function_call": compile_call,
+    "procedure_call": compile_call,
+    "return_stmt": compile_return_stmt,
+}
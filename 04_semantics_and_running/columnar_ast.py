@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+#
+# Columnar storage of syntax trees for very large programs. Instead of one
+# Python object per node, the nodes are rows in a few arrays (struct of
+# arrays), which takes a fraction of the memory of even the __slots__
+# node classes. The tree can be kept like this between phases and turned
+# back into ASTnodes when it is needed (the semantic checks and the
+# engines work on ASTnodes).
+#
+# Nodes are numbered in preorder, the root is 0. For node i:
+#
+#   kinds[i]        index of the node type in nodetypes
+#   linenos[i]      line number, NO_LINENO if the node has none
+#   first_child[i]  index of the node's first entry in children
+#   values[i]       value of the node (NO_VALUE if the node has none)
+#
+# The entries of a node in children follow the child attributes of its
+# type (tree_generation.CHILD_FIELDS): the number of the child node (NONE
+# for None) for a child_ attribute, and the length of the list followed by
+# the numbers of the nodes for a children_ attribute. Only the attributes
+# the parsers set are stored, not the ones the later phases add.
+
+import array
+import sys
+from tree_generation import ASTnode, CHILD_FIELDS
+from tree_print import children_prefix_default
+
+NONE = -1
+NO_LINENO = -1
+NO_VALUE = object()
+
+
+class ColumnarTree:
+
+    def __init__(self):
+        self.nodetypes = list(CHILD_FIELDS)
+        self.kinds = array.array("B")
+        self.linenos = array.array("i")
+        self.first_child = array.array("i")
+        self.children = array.array("i")
+        self.values = []
+        # node type index -> (attribute name, is a child list) pairs
+        self.fields = [tuple((name, name.startswith(children_prefix_default))
+                             for name in CHILD_FIELDS[nodetype])
+                       for nodetype in self.nodetypes]
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def from_tree(cls, root):
+        '''Store the tree with the given root (node types must be ones in
+        tree_generation.CHILD_FIELDS)'''
+        tree = cls()
+        kind_of = {nodetype: kind for kind, nodetype in enumerate(tree.nodetypes)}
+        # Items are (node, index in children where its number goes). The
+        # number of a node is known when it is reached in preorder, so the
+        # entry is reserved in the parent first and filled in then.
+        stack = [(root, None)]
+        while stack:
+            node, entry = stack.pop()
+            if node is None:
+                tree.children[entry] = NONE
+                continue
+            number = len(tree.kinds)
+            if entry is not None:
+                tree.children[entry] = number
+            kind = kind_of[node.nodetype]
+            tree.kinds.append(kind)
+            tree.linenos.append(getattr(node, "lineno", NO_LINENO))
+            tree.first_child.append(len(tree.children))
+            value = getattr(node, "value", NO_VALUE)
+            if isinstance(value, str):
+                # Identifiers repeat a lot, store each name once
+                value = sys.intern(value)
+            tree.values.append(value)
+            pending = []
+            for name, is_list in tree.fields[kind]:
+                value = getattr(node, name)
+                if is_list:
+                    tree.children.append(len(value))
+                    for child in value:
+                        pending.append((child, len(tree.children)))
+                        tree.children.append(NONE)
+                else:
+                    pending.append((value, len(tree.children)))
+                    tree.children.append(NONE)
+            stack.extend(reversed(pending))
+        return tree
+
+    def nodetype(self, number):
+        return self.nodetypes[self.kinds[number]]
+
+    def child_numbers(self, number):
+        '''Numbers of the children of a node (NONE for missing children), in
+        the same order as tree_print.get_children gives the nodes'''
+        result = []
+        entry = self.first_child[number]
+        for name, is_list in self.fields[self.kinds[number]]:
+            if is_list:
+                length = self.children[entry]
+                result.extend(self.children[entry + 1:entry + 1 + length])
+                entry += 1 + length
+            else:
+                result.append(self.children[entry])
+                entry += 1
+        return result
+
+    def node(self, number):
+        '''The node as an ASTnode, without its children'''
+        node = ASTnode(self.nodetype(number))
+        if self.linenos[number] != NO_LINENO:
+            node.lineno = self.linenos[number]
+        if self.values[number] is not NO_VALUE:
+            node.value = self.values[number]
+        return node
+
+    def to_tree(self, number=0):
+        '''The subtree of the given node (by default the whole tree) as
+        ASTnodes'''
+        nodes = {}
+        # Children are numbered after their parent, so going backwards the
+        # children of every node are made before the node itself
+        end = self.subtree_end(number)
+        for current in range(end - 1, number - 1, -1):
+            node = self.node(current)
+            entry = self.first_child[current]
+            for name, is_list in self.fields[self.kinds[current]]:
+                if is_list:
+                    length = self.children[entry]
+                    setattr(node, name, [nodes.pop(child, None) for child in
+                                         self.children[entry + 1:entry + 1 + length]])
+                    entry += 1 + length
+                else:
+                    setattr(node, name, nodes.pop(self.children[entry], None))
+                    entry += 1
+            nodes[current] = node
+        return nodes[number]
+
+    def subtree_end(self, number):
+        '''Number of the first node after the subtree of the given node'''
+        if number == 0:
+            return len(self.kinds)
+        end = number + 1
+        stack = [number]
+        while stack:
+            for child in self.child_numbers(stack.pop()):
+                if child != NONE:
+                    end = max(end, child + 1)
+                    stack.append(child)
+        return end
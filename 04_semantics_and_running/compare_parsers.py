@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+#
+# Equivalence check of the parsers: parses every .ph file of a corpus with
+# the PLY parser and with descent_parser.py and compares the trees (node
+# types, attributes and values, line numbers) and the syntax
+# error messages. Each file is parsed again with the errors collected, and
+# the lists of errors are compared too. Also prints how long each parser
+# took in total (without the second parse).
+#
+#   python compare_parsers.py [-l LEXER] FILE_OR_DIRECTORY...
+
+import argparse
+import contextlib
+import io
+import os
+import time
+import lexer
+import source_input
+import tree_generation
+import descent_parser
+from diagnostics import PhError, Diagnostics
+
+
+def corpus_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(".ph"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def tree_signature(tree):
+    '''Everything in the tree that the later phases can see, as a flat
+    list in preorder (without recursion, trees can be deep)'''
+    signature = []
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, list):
+            signature.append(("list", len(item)))
+            stack.extend(reversed(item))
+        elif isinstance(item, tree_generation.ASTnode):
+            attrs = tree_generation.node_attributes(item)
+            signature.append(tuple(attrs))
+            stack.extend(reversed(list(attrs.values())))
+        else:
+            signature.append(item)
+    return signature
+
+
+def parse(parser, data, lex, diagnostics=None):
+    '''Returns (tree signature or None, error message, seconds). With a
+    Diagnostics collector, errors are collected in it'''
+    out = io.StringIO()
+    signature = None
+    lex.diagnostics = tree_generation.diagnostics = diagnostics
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        try:
+            lex.lineno = 1
+            tree = parser.parse(data, lexer=lex, debug=False)
+        except PhError as error:
+            print(error)
+        except RecursionError:
+            # descent_parser on very deep nesting, the file is reported as a
+            # difference and the run goes on
+            print("RecursionError: nesting too deep for the parser")
+        else:
+            signature = tree_signature(tree) if tree is not None else None
+        finally:
+            lex.diagnostics = tree_generation.diagnostics = None
+    return signature, out.getvalue(), time.perf_counter() - start
+
+
+def collected_errors(parser, data, lex):
+    '''Returns the messages of the errors collected when parsing data, and
+    whether there was a tree'''
+    diagnostics = Diagnostics()
+    signature, messages, seconds = parse(parser, data, lex, diagnostics)
+    return [str(d) for d in diagnostics], signature is not None, messages
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-l', '--lexer', choices=lexer.LEXERS, default="ply",
+                            help='lexer implementation (default: ply)')
+    arg_parser.add_argument('paths', nargs='+', help='.ph files or directories')
+    ns = arg_parser.parse_args()
+    lex = lexer.select_lexer(ns.lexer)
+    parsers = (("ply", tree_generation.ply_parser),
+               ("descent", descent_parser.Parser()))
+    totals = {name: 0.0 for name, _ in parsers}
+    count = differences = 0
+    for path in corpus_files(ns.paths):
+        data = source_input.read_source(path)
+        results = []
+        for name, parser in parsers:
+            signature, messages, seconds = parse(parser, data, lex)
+            totals[name] += seconds
+            results.append((signature, messages, collected_errors(parser, data, lex)))
+        count += 1
+        if results[0] != results[1]:
+            differences += 1
+            print(f"{path}: parsers differ")
+            for (name, _), (signature, messages, collected) in zip(parsers, results):
+                print(f"  {name}: {'tree' if signature else 'no tree'}, "
+                      f"output {messages.strip()!r}")
+                print(f"    collected: {collected[0]!r}, "
+                      f"{'tree' if collected[1] else 'no tree'}"
+                      + (f", output {collected[2].strip()!r}" if collected[2] else ""))
+    print(f"{count} files, {differences} differences")
+    for name, seconds in totals.items():
+        print(f"  {name}: {seconds:.3f} s")
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+#
+# Hand-written recursive descent parser for the grammar in
+# tree_generation.py. Binary expressions are parsed with precedence
+# climbing (Pratt style) instead of the expression/simple_expr/term rule
+# chain. It builds the same ASTnode trees as the PLY parser (see
+# compare_parsers.py) and reports syntax errors at the same token with
+# tree_generation.p_error. When errors are collected, it recovers from them
+# the way PLY does with statement : error (see recover), so that both
+# parsers report the same errors.
+#
+# Each grammar rule is a method that starts at the current token and
+# leaves the token after the rule current. The grammar is LL(1) apart
+# from the binary operators, so one token of lookahead is enough.
+# Nesting deeper than Python's recursion limit (which the tree-walker
+# can't run either) raises RecursionError, the PLY parser has no such
+# limit.
+
+import tree_generation
+from tree_generation import ASTnode, create_node, syntax_error, StopParsing
+from diagnostics import ParseError
+
+# token type -> (operator nodetype, binding power), all left associative
+BINARY_OPERATORS = {
+    "EQ": ("=_op", 1), "LT": ("<_op", 1),
+    "PLUS": ("+_op", 2), "MINUS": ("-_op", 2),
+    "MULT": ("*_op", 3), "DIV": ("/_op", 3),
+}
+
+DEFINITION_STARTS = ("FUNCTION", "PROCEDURE", "VAR")
+STATEMENT_STARTS = ("IDENT", "PRINT", "PROC_IDENT", "DO", "RETURN")
+PROGRAM_STARTS = DEFINITION_STARTS + STATEMENT_STARTS
+
+# Tokens that can follow a statement (the lookaheads of statement : error
+# in PLY's tables), where parsing continues after a syntax error
+STATEMENT_FOLLOW = ("COMMA", "END", "UNTIL", "UNLESS", "DONE", None)
+
+# Tokens PLY shifts after a syntax error before it reports the next one
+ERROR_SHIFTS = 3
+
+
+class Parser:
+    '''Same parse() interface as the PLY parser'''
+
+    def parse(self, input=None, lexer=None, debug=False):
+        if input is not None:
+            lexer.input(input)
+        self.next_token = lexer.token
+        # Tokens to shift before errors are reported again, and the token
+        # the last error recovery stopped at
+        self.errorcount = 0
+        self.recovered_at = object()
+        self.tok = None
+        self.skip()
+        try:
+            return self.program()
+        except StopParsing:
+            return None
+
+    def skip(self):
+        self.tok = self.next_token()
+        self.type = self.tok.type if self.tok is not None else None
+
+    def advance(self):
+        '''Moves to the next token, returns the current one'''
+        tok = self.tok
+        if self.errorcount:
+            self.errorcount -= 1
+        self.skip()
+        return tok
+
+    def expect(self, type):
+        if self.type != type:
+            self.error()
+        return self.advance()
+
+    def expect_one_of(self, types):
+        '''Checks the current token without moving on'''
+        if self.type not in types:
+            self.error()
+
+    def error(self):
+        raise syntax_error(self.tok)
+
+    def report(self, error):
+        '''Collect error, or raise it if errors are not collected. Like
+        PLY, errors right after another one are not reported'''
+        if tree_generation.diagnostics is None:
+            raise error
+        if not self.errorcount:
+            tree_generation.diagnostics.report(error)
+        self.errorcount = ERROR_SHIFTS
+
+    def recover(self, error):
+        '''Like PLY's recovery with statement : error. The error is in the
+        innermost statement list that is being parsed (or in the rule it is
+        in), where PLY shifts the error token. Tokens are then skipped up to
+        one that can follow a statement, and the caller goes on after an
+        error statement in that list. Parsing stops at the end of input or
+        if the recovery is back at the token it stopped at last time'''
+        if self.tok is self.recovered_at:
+            raise StopParsing()
+        self.report(error)
+        if self.tok is None:
+            raise StopParsing()
+        self.errorcount -= 1
+        while self.type not in STATEMENT_FOLLOW:
+            self.errorcount = ERROR_SHIFTS
+            self.skip()
+        self.recovered_at = self.tok
+
+    def in_statement_list(self, rest):
+        '''Parses a statement_list and then rest(stmts), the rule the list
+        is in from the list to its end'''
+        try:
+            return rest(self.statement_list())
+        except ParseError as error:
+            return self.after_error(error, rest)
+
+    def after_error(self, error, rest):
+        '''Recovers from error in a statement list (or the rule it is in)
+        and parses the rest of the list and then rest(stmts)'''
+        while True:
+            self.recover(error)
+            try:
+                return rest(self.statement_list([None]))
+            except ParseError as next_error:
+                error = next_error
+
+    def program(self):
+        while self.type not in PROGRAM_STARTS:
+            # PLY drops tokens that can't start a program
+            self.report(syntax_error(self.tok))
+            if self.tok is None:
+                raise StopParsing()
+            self.skip()
+        node = ASTnode("program")
+        # Like p.lineno(0) in PLY without position tracking
+        node.lineno = 0
+        node.children_definitions = []
+
+        def rest(stmts):
+            node.children_statements = stmts
+            if self.tok is not None:
+                self.error()
+            return node
+        try:
+            while self.type in DEFINITION_STARTS:
+                if self.type == "VAR":
+                    node.children_definitions.append(self.variable_definition())
+                elif self.type == "FUNCTION":
+                    node.children_definitions.append(self.function_definition())
+                else:
+                    node.children_definitions.append(self.procedure_definition())
+            return rest(self.statement_list())
+        except ParseError as error:
+            # Errors in definitions too go to the program's statement list
+            return self.after_error(error, rest)
+
+    def variable_definition(self):
+        var = self.expect("VAR")
+        name = self.expect("IDENT")
+        self.expect("EQ")
+        node = ASTnode("variable_def")
+        node.child_name = create_node("id_name", name.value, name.lineno)
+        node.child_init_value = self.expression()
+        node.lineno = var.lineno
+        return node
+
+    def opt_var_defs(self):
+        var_defs = []
+        while self.type == "VAR":
+            var_defs.append(self.variable_definition())
+        return var_defs
+
+    def function_definition(self):
+        function = self.expect("FUNCTION")
+        name = self.expect("FUNC_IDENT")
+        self.expect("LCURLY")
+        formals = self.opt_formals()
+        self.expect("RCURLY")
+        self.expect("RETURN")
+        returntype = self.expect("IDENT")
+        var_defs = self.opt_var_defs()
+        self.expect("IS")
+        body = self.rvalue()
+        self.expect("END")
+        self.expect("FUNCTION")
+        node = ASTnode("function_def")
+        node.child_name = create_node("id_name", name.value, name.lineno)
+        node.child_returntype = create_node("id_type", returntype.value, returntype.lineno)
+        node.children_var_defs = var_defs
+        node.children_formal_args = formals
+        node.child_body = body
+        node.lineno = function.lineno
+        return node
+
+    def procedure_definition(self):
+        procedure = self.expect("PROCEDURE")
+        name = self.expect("PROC_IDENT")
+        self.expect("LCURLY")
+        formals = self.opt_formals()
+        self.expect("RCURLY")
+        returntype = None
+        if self.type == "RETURN":
+            self.advance()
+            tok = self.expect("IDENT")
+            returntype = create_node("id_type", tok.value, tok.lineno)
+        var_defs = self.opt_var_defs()
+        self.expect("IS")
+        stmts = self.in_statement_list(self.end_procedure)
+        node = ASTnode("procedure_def")
+        node.child_name = create_node("id_name", name.value, name.lineno)
+        node.child_returntype = returntype
+        node.children_var_defs = var_defs
+        node.children_formal_args = formals
+        node.children_stmts = stmts
+        node.lineno = procedure.lineno
+        return node
+
+    def end_procedure(self, stmts):
+        self.expect("END")
+        self.expect("PROCEDURE")
+        return stmts
+
+    def opt_formals(self):
+        if self.type != "IDENT":
+            return []
+        formals = [self.formal_arg()]
+        while self.type == "COMMA":
+            self.advance()
+            formals.append(self.formal_arg())
+        return formals
+
+    def formal_arg(self):
+        name = self.expect("IDENT")
+        self.expect("LSQUARE")
+        type = self.expect("IDENT")
+        self.expect("RSQUARE")
+        node = ASTnode("formal_arg")
+        node.child_name = create_node("id_name", name.value, name.lineno)
+        node.child_type = create_node("id_type", type.value, type.lineno)
+        node.lineno = name.lineno
+        return node
+
+    def statement_list(self, stmts=None):
+        '''A statement_list, or the rest of stmts'''
+        if stmts is None:
+            stmts = [self.statement()]
+        while self.type == "COMMA":
+            self.advance()
+            stmts.append(self.statement())
+        return stmts
+
+    def statement(self):
+        type = self.type
+        if type == "IDENT":
+            return self.assignment()
+        if type == "PRINT":
+            return self.print_statement()
+        if type == "PROC_IDENT":
+            return self.call("procedure_call")
+        if type == "DO":
+            return self.do_statement()
+        if type == "RETURN":
+            tok = self.advance()
+            node = ASTnode("return_stmt")
+            node.child_expr = self.expression()
+            node.lineno = tok.lineno
+            return node
+        self.error()
+
+    def assignment(self):
+        name = self.advance()
+        if self.type == "DOT":
+            self.advance()
+            attr = self.expect("IDENT")
+            lvalue = ASTnode("attr_assign")
+            lvalue.child_var = create_node("id_name", name.value, name.lineno)
+            lvalue.child_attr = create_node("attr", attr.value, attr.lineno)
+            lvalue.lineno = name.lineno
+        else:
+            lvalue = create_node("id_name", name.value, name.lineno)
+        eq = self.expect("EQ")
+        node = ASTnode("assignment")
+        node.child_lvalue = lvalue
+        node.child_rvalue = self.rvalue()
+        node.lineno = eq.lineno
+        return node
+
+    def rvalue(self):
+        if self.type != "DO":
+            return self.expression()
+        do = self.advance()
+        do_expr = self.expression()
+        self.expect("UNLESS")
+        unless = self.expression()
+        self.expect("OTHERWISE")
+        otherwise = self.expression()
+        self.expect("DONE")
+        node = ASTnode("unless_expr")
+        node.child_do = do_expr
+        node.child_unless = unless
+        node.child_otherwise = otherwise
+        node.lineno = do.lineno
+        return node
+
+    def print_statement(self):
+        tok = self.advance()
+        items = [self.printitem()]
+        while self.type == "AMPERSAND":
+            self.advance()
+            items.append(self.printitem())
+        node = ASTnode("print_statement")
+        node.children_printitems = items
+        node.lineno = tok.lineno
+        return node
+
+    def printitem(self):
+        if self.type != "STRING":
+            return self.expression()
+        tok = self.advance()
+        node = ASTnode("string_literal")
+        node.value = tok.value
+        node.lineno = tok.lineno
+        return node
+
+    def do_statement(self):
+        '''loop_statement or unless_statement, which both start with
+        DO statement_list'''
+        do = self.advance()
+        return self.in_statement_list(lambda stmts: self.after_do(do, stmts))
+
+    def after_do(self, do, stmts):
+        if self.type == "UNTIL":
+            self.advance()
+            node = ASTnode("loop_statement")
+            node.child_condition = self.expression()
+        else:
+            self.expect("UNLESS")
+            node = ASTnode("unless_stmt")
+            node.child_unless = self.expression()
+            node.children_otherwise = []
+            if self.type == "OTHERWISE":
+                self.advance()
+                node.children_otherwise = self.in_statement_list(self.end_unless)
+            else:
+                self.expect("DONE")
+        # PLY checks the token after the statement before the DO is done
+        # with, so a wrong one is an error in this statement list
+        self.expect_one_of(STATEMENT_FOLLOW)
+        node.children_stmts = stmts
+        node.lineno = do.lineno
+        return node
+
+    def end_unless(self, stmts):
+        self.expect("DONE")
+        return stmts
+
+    def expression(self, min_power=1):
+        left = self.factor()
+        while True:
+            operator = BINARY_OPERATORS.get(self.type)
+            if operator is None or operator[1] < min_power:
+                return left
+            tok = self.advance()
+            node = ASTnode(operator[0])
+            node.lineno = tok.lineno
+            # The right operand binds tighter, so equal operators associate
+            # to the left
+            right = self.expression(operator[1] + 1)
+            node.child_left_expr = left
+            node.child_right_expr = right
+            left = node
+
+    def factor(self):
+        if self.type == "PLUS":
+            self.advance()
+        elif self.type == "MINUS":
+            # p_factor3 in tree_generation.py gives no node for this
+            self.advance()
+            tree_generation.drop_from_index(self.atom())
+            return None
+        return self.atom()
+
+    def atom(self):
+        type = self.type
+        if type == "IDENT":
+            name = self.advance()
+            if self.type != "APOSTROPHE":
+                return create_node("id_name", name.value, name.lineno)
+            self.advance()
+            attr = self.expect("IDENT")
+            node = ASTnode("attr_read")
+            node.child_var = create_node("id_name", name.value, name.lineno)
+            node.child_attr = create_node("attr", attr.value, attr.lineno)
+            node.lineno = name.lineno
+            return node
+        if type == "INT_LITERAL":
+            tok = self.advance()
+            node = ASTnode("int_literal")
+            node.value = tok.value
+            node.lineno = tok.lineno
+            return node
+        if type == "LPAREN":
+            self.advance()
+            node = self.expression()
+            self.expect("RPAREN")
+            return node
+        if type == "FUNC_IDENT":
+            return self.call("function_call")
+        if type == "PROC_IDENT":
+            return self.call("procedure_call")
+        if type == "DATE_LITERAL":
+            tok = self.advance()
+            return create_node("date_literal", tok.value, tok.lineno)
+        self.error()
+
+    def call(self, nodetype):
+        name = self.advance()
+        self.expect("LPAREN")
+        args = []
+        if self.type != "RPAREN":
+            args.append(self.expression())
+            while self.type == "COMMA":
+                self.advance()
+                args.append(self.expression())
+        self.expect("RPAREN")
+        node = ASTnode(nodetype)
+        node.child_name = create_node("id_name", name.value, name.lineno)
+        node.children_args = args
+        node.lineno = name.lineno
+        return node
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+#
+# Errors in .ph programs. Each phase raises its own exception type with the
+# message and line number of the error. By default the first error stops
+# the phase, like the old print and exit did. When a Diagnostics collector
+# is given (to the lexer as lexer.diagnostics, to the parser as
+# tree_generation.diagnostics and to the semantic checks as
+# semdata.diagnostics), errors are collected instead and the phase
+# recovers and continues, so that one pass reports every error it can:
+#
+#   lexer      skips the illegal character
+#   parser     skips the rest of the statement (statement : error), and
+#              stops if that doesn't get it past the error
+#   semantics  continues with the next node
+#
+# Nothing here prints or exits, so many programs can be checked in one
+# process. The command line tools print the messages (str of a diagnostic
+# is the same message the tools printed before).
+
+
+class Diagnostic:
+    '''One error: phase ("lexer", "parser" or "semantics"), message and
+    line number (None if not known)'''
+
+    def __init__(self, phase, message, lineno=None):
+        self.phase = phase
+        self.message = message
+        self.lineno = lineno
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"Diagnostic({self.phase!r}, {self.message!r}, {self.lineno!r})"
+
+
+class PhError(Exception):
+    '''Base class of the errors in .ph programs'''
+    phase = None
+
+    def __init__(self, message, lineno=None):
+        super().__init__(message)
+        self.message = message
+        self.lineno = lineno
+
+    def diagnostic(self):
+        return Diagnostic(self.phase, self.message, self.lineno)
+
+
+class LexError(PhError):
+    phase = "lexer"
+
+
+class ParseError(PhError):
+    phase = "parser"
+
+
+class SemanticError(PhError):
+    phase = "semantics"
+
+
+class CompileErrors(PhError):
+    '''Raised with all collected diagnostics when a program has errors'''
+
+    def __init__(self, diagnostics):
+        super().__init__("\n".join(str(d) for d in diagnostics),
+                         diagnostics[0].lineno if diagnostics else None)
+        self.diagnostics = list(diagnostics)
+
+
+class Diagnostics:
+    '''Collector of errors, in the order they were found'''
+
+    def __init__(self):
+        self.items = []
+
+    def report(self, error):
+        self.items.append(error.diagnostic())
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def check(self):
+        '''Raise CompileErrors if any errors have been collected'''
+        if self.items:
+            raise CompileErrors(self.items)
+
+
+def report(diagnostics, error):
+    '''Collect error if there is a collector, else raise it'''
+    if diagnostics is None:
+        raise error
+    diagnostics.report(error)
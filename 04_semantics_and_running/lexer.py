@@ -1,4 +1,8 @@
-import sys, ply.lex, datetime
+import sys, os, ply.lex, datetime
+import tables
+import scanner
+from diagnostics import LexError, report
+import source_input
 
 STUDENTNAME = "Joonas Pelttari"
 STUDENTID = "H274830"
@@ -66,8 +70,9 @@ def t_DATE_LITERAL(t):
         t.value = datetime.date(
             int(t.value[0:4]), int(t.value[5:7]), int(t.value[8:10]))
     except ValueError:
-        print(f"line {t.lexer.lineno}: Invalid Date")
-        sys.exit(1)
+        report(t.lexer.diagnostics,
+               LexError(f"line {t.lexer.lineno}: Invalid Date", t.lexer.lineno))
+        t.value = None
     return t
 
 def t_INT_LITERAL(t):
@@ -75,8 +80,8 @@ def t_INT_LITERAL(t):
     t.value = t.value.replace("'", "")
     t.value = int(t.value)
     if abs(t.value) >= 1_000_000_000_000:
-        print(f"line {t.lexer.lineno}: INT_LITERAL too large")
-        sys.exit(1)
+        report(t.lexer.diagnostics,
+               LexError(f"line {t.lexer.lineno}: INT_LITERAL too large", t.lexer.lineno))
     return t
 
 def t_COMMENT(t):
@@ -85,18 +90,23 @@ def t_COMMENT(t):
     t.lexer.lineno += t.value.count("\n")
     pass
 
+# Identifiers are interned, so each name is one string object (the symbol
+# tables compare names with it)
 def t_IDENT(t):
     r'[a-z][a-zA-Z0-9_]{1,}'
+    t.value = sys.intern(t.value)
     if t.value in reserved:
         t.type = reserved[t.value]
     return t
 
 def t_FUNC_IDENT(t):
     r'[A-Z][a-z0-9_]{1,}'
+    t.value = sys.intern(t.value)
     return t
 
 def t_PROC_IDENT(t):
     r'[A-Z]{2}[A-Z0-9_]*'
+    t.value = sys.intern(t.value)
     return t
 
 t_ignore = " "
@@ -106,10 +116,30 @@ def t_newline(t):
     t.lexer.lineno += t.value.count("\n")
 
 def t_error(t):
-    raise Exception("Illegal character '{}' at line {}".format( 
-        t.value[0], t.lexer.lineno ) )
+    report(t.lexer.diagnostics, LexError("Illegal character '{}' at line {}".format(
+        t.value[0], t.lexer.lineno ), t.lexer.lineno))
+    t.lexer.skip(1)
+
+ply_lexer = tables.load_lexer(sys.modules[__name__])
+# Errors are raised, unless a diagnostics.Diagnostics collector is set here
+ply_lexer.diagnostics = None
+
+# lexer is either the PLY lexer above or the hand-written scanner
+# (scanner.py), which gives the same tokens and errors faster. The default
+# comes from the PH_LEXER environment variable.
+LEXERS = ("ply", "scanner")
+
+def select_lexer(name):
+    global lexer
+    if name == "ply":
+        lexer = ply_lexer
+    elif name == "scanner":
+        lexer = scanner.Scanner(reserved)
+    else:
+        raise ValueError(f"Unknown lexer: {name}")
+    return lexer
 
-lexer = ply.lex.lex()
+select_lexer(os.environ.get("PH_LEXER", "ply"))
 
 
 def handleArguments(args):
@@ -125,10 +155,12 @@ def handleArguments(args):
 
 if __name__ == "__main__":
     fileName = handleArguments(sys.argv)
-    with open(fileName, 'r', encoding='utf-8') as file:
-        data = file.read()
-    lexer.input(data)
-    token = lexer.token()
-    while token:
-        print(token)
+    source_input.input_file(lexer, fileName)
+    try:
         token = lexer.token()
+        while token:
+            print(token)
+            token = lexer.token()
+    except LexError as error:
+        print(error)
+        sys.exit(1)
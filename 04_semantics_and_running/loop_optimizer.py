@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+#
+# Loop optimizations for do ... until loops, run by optimizer.py:
+# - loop-invariant code motion: expressions of the loop body and condition
+#   that can't change during the loop (and can't fail) are computed once
+#   into a temporary variable before the loop
+# - counted loops: a loop with a counter "i = i + c" and condition "i = n"
+#   (n invariant) is annotated with node.counted, so that engines can
+#   compute the number of iterations at loop entry instead of evaluating
+#   the condition every time
+#
+# Temporaries are new variable_defs, global ones are appended to the
+# program definitions and ones inside procedures to the procedure's
+# children_var_defs (so they live in the call frame). Their names start
+# with '$' so they can't collide with program identifiers.
+
+from semantics_common import SymbolData, visit_tree
+from tree_generation import ASTnode, create_node
+from tree_print import get_children
+
+INT_TYPES = ("int", "int_literal", "+_op", "-_op", "*_op", "attr_read")
+DATE_TYPES = ("date_literal",)
+ARITHMETIC_OPS = ("+_op", "-_op", "*_op")
+COMPARISON_OPS = ("=_op", "<_op")
+DATE_ATTRS = ("day", "month", "year")
+
+
+class CountedLoop:
+    '''Counter information of a counted loop. counter is the symbol data of
+    the counter variable, step its (constant) increment, limit the
+    invariant expression the counter is compared to and count_var a
+    temporary variable engines can keep the remaining iterations in.'''
+
+    def __init__(self, counter, step, limit, count_var):
+        self.counter = counter
+        self.step = step
+        self.limit = limit
+        self.count_var = count_var
+
+    def iterations(self, start, limit):
+        return count_iterations(start, limit, self.step)
+
+
+def count_iterations(start, limit, step):
+    '''Number of times the body of a counted loop runs when the counter
+    starts from start, or -1 if the loop doesn't end by counting (the
+    condition must then be evaluated normally)'''
+    if type(start) is not int or type(limit) is not int:
+        return -1
+    distance = limit - start
+    if distance % step != 0 or distance // step < 1:
+        return -1
+    return distance // step
+
+
+def symbol_type(symdata):
+    if symdata.symtype in INT_TYPES:
+        return "int"
+    if symdata.symtype in DATE_TYPES:
+        return "date"
+    return None
+
+
+# Node types that can change variables
+ASSIGNING_TYPES = ("assignment", "procedure_call")
+
+def find_assignments(node, assigned):
+    nodetype = node.nodetype
+    if nodetype == "assignment":
+        l_value = node.child_lvalue
+        if l_value.nodetype == "attr_assign":
+            l_value = l_value.child_var
+        assigned.add(l_value.symdata)
+    elif nodetype == "procedure_call":
+        assigned.add(node.child_name.symdata.defnode)
+
+
+class LoopOptimizer:
+    def __init__(self, tree, semdata, record):
+        self.tree = tree
+        self.semdata = semdata
+        self.record = record
+        self.temp_count = 0
+        self.global_vars = set(i.symdata for i in tree.children_definitions
+                               if i.nodetype == "variable_def")
+        self.procedure_effects = self.find_procedure_effects()
+
+    def find_procedure_effects(self):
+        '''procedure_def node -> set of global variables (symbol data) it
+        assigns, directly or through the procedures it calls'''
+        direct = dict()
+        for def_node in self.tree.children_definitions:
+            if def_node.nodetype == "procedure_def":
+                assigned = set()
+                visit_tree(def_node, find_assignments, None, assigned, ASSIGNING_TYPES)
+                direct[def_node] = assigned
+        effects = {def_node: set(i for i in assigned if i in self.global_vars)
+                   for def_node, assigned in direct.items()}
+        changed = True
+        while changed:
+            changed = False
+            for def_node, assigned in direct.items():
+                for called in assigned:
+                    if called in effects and not effects[called] <= effects[def_node]:
+                        effects[def_node] |= effects[called]
+                        changed = True
+        return effects
+
+    def assigned_in(self, loop):
+        '''Variables that can change while the loop runs'''
+        found = set()
+        visit_tree(loop, find_assignments, None, found, ASSIGNING_TYPES)
+        assigned = set()
+        for i in found:
+            if i in self.procedure_effects:
+                assigned |= self.procedure_effects[i]
+            else:
+                assigned.add(i)
+        return assigned
+
+    def optimize(self):
+        for def_node in self.tree.children_definitions:
+            if def_node.nodetype == "procedure_def":
+                self.optimize_stmts(def_node.children_stmts, def_node)
+        self.optimize_stmts(self.tree.children_statements, None)
+
+    def optimize_stmts(self, stmts, def_node):
+        # Outer loops are handled before the loops inside them, nested
+        # statement lists are collected to work instead of recursion
+        work = [stmts]
+        while work:
+            stmts = work.pop()
+            i = 0
+            while i < len(stmts):
+                node = stmts[i]
+                if node.nodetype == "loop_statement":
+                    hoisted = self.optimize_loop(node, def_node)
+                    stmts[i:i] = hoisted
+                    i += len(hoisted)
+                    work.append(node.children_stmts)
+                elif node.nodetype == "unless_stmt":
+                    work.append(node.children_stmts)
+                    work.append(node.children_otherwise)
+                i += 1
+
+    def new_temp(self, def_node, lineno, prefix):
+        self.temp_count += 1
+        name = f"${prefix}{self.temp_count}"
+        var_def = ASTnode("variable_def")
+        var_def.child_name = create_node("id_name", name, lineno)
+        var_def.child_init_value = create_node("int_literal", 0, lineno)
+        var_def.lineno = lineno
+        symdata = SymbolData("int_literal", var_def)
+        var_def.symdata = symdata
+        var_def.child_name.symdata = symdata
+        if def_node is None:
+            symdata.scope = self.semdata.symtbl
+            self.tree.children_definitions.append(var_def)
+        else:
+            symdata.scope = def_node.scope
+            def_node.children_var_defs.append(var_def)
+        symdata.scope[name] = symdata
+        return symdata
+
+    def read_temp(self, symdata, lineno):
+        node = create_node("id_name", symdata.defnode.child_name.value, lineno)
+        node.symdata = symdata
+        return node
+
+    def optimize_loop(self, loop, def_node):
+        '''Hoist invariant expressions of the loop and recognize a counter.
+        Returns the statements to be placed before the loop.'''
+        assigned = self.assigned_in(loop)
+        hoisted = []
+        # Expressions evaluated unconditionally on every iteration, as
+        # (container, key) pairs
+        places = []
+        for stmt in loop.children_stmts:
+            nodetype = stmt.nodetype
+            if nodetype == "assignment":
+                places.append((stmt, "child_rvalue"))
+            elif nodetype == "print_statement":
+                places += [(stmt.children_printitems, i)
+                           for i in range(len(stmt.children_printitems))]
+            elif nodetype == "procedure_call":
+                places += [(stmt.children_args, i)
+                           for i in range(len(stmt.children_args))]
+            elif nodetype == "return_stmt":
+                places.append((stmt, "child_expr"))
+        places.append((loop, "child_condition"))
+        for container, key in places:
+            for parent, parent_key, expr in self.find_invariants(container, key, assigned):
+                temp = self.new_temp(def_node, loop.lineno, "inv")
+                assignment = ASTnode("assignment")
+                assignment.child_lvalue = self.read_temp(temp, expr.lineno)
+                assignment.child_rvalue = expr
+                assignment.lineno = loop.lineno
+                hoisted.append(assignment)
+                replacement = self.read_temp(temp, expr.lineno)
+                if isinstance(parent, list):
+                    parent[parent_key] = replacement
+                else:
+                    setattr(parent, parent_key, replacement)
+                self.record(expr, f"hoisted invariant {expr.nodetype} out of loop")
+        self.find_counter(loop, assigned, def_node)
+        return hoisted
+
+    def find_invariants(self, container, key, assigned):
+        '''Returns (parent, key, node) of the largest invariant and safe
+        subexpressions of container[key] (or attribute key of container)'''
+        root = container[key] if isinstance(container, list) else getattr(container, key)
+        types = self.expression_types(root, assigned)
+        found = []
+        stack = [(container, key, root)]
+        while stack:
+            parent, parent_key, node = stack.pop()
+            if node is None:
+                continue
+            nodetype = node.nodetype
+            if types.get(id(node)) is not None and (
+                    nodetype in ARITHMETIC_OPS or nodetype in COMPARISON_OPS or
+                    nodetype == "attr_read"):
+                found.append((parent, parent_key, node))
+            elif nodetype in ARITHMETIC_OPS or nodetype in COMPARISON_OPS or nodetype == "/_op":
+                stack.append((node, "child_left_expr", node.child_left_expr))
+                stack.append((node, "child_right_expr", node.child_right_expr))
+            elif nodetype == "unless_expr":
+                # Only the condition is evaluated every time
+                stack.append((node, "child_unless", node.child_unless))
+            elif nodetype in ("function_call", "procedure_call"):
+                args = node.children_args
+                stack += [(args, i, args[i]) for i in range(len(args))]
+        return found
+
+    def expression_types(self, root, assigned):
+        '''Type ("int", "date" or "bool") of every invariant subexpression
+        that can't fail at run time, as a dict id(node) -> type'''
+        types = dict()
+        stack = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if node is None:
+                continue
+            nodetype = node.nodetype
+            if not children_done and (nodetype in ARITHMETIC_OPS or
+                                      nodetype in COMPARISON_OPS):
+                stack.append((node, True))
+                stack.append((node.child_left_expr, False))
+                stack.append((node.child_right_expr, False))
+                continue
+            if not children_done and nodetype in ("/_op", "unless_expr",
+                                                  "function_call", "procedure_call"):
+                # Not invariant themselves, but their parts may be
+                stack += [(child, False) for child in get_children(node)]
+                continue
+            result = None
+            if nodetype == "int_literal":
+                result = "int"
+            elif nodetype == "date_literal":
+                result = "date"
+            elif nodetype == "id_name":
+                if node.symdata not in assigned:
+                    result = symbol_type(node.symdata)
+            elif nodetype == "attr_read":
+                symdata = node.child_var.symdata
+                if (symdata not in assigned and symbol_type(symdata) == "date" and
+                        node.child_attr.value in DATE_ATTRS):
+                    result = "int"
+            elif nodetype in ARITHMETIC_OPS:
+                if (types.get(id(node.child_left_expr)) == "int" and
+                        types.get(id(node.child_right_expr)) == "int"):
+                    result = "int"
+            elif nodetype in COMPARISON_OPS:
+                left = types.get(id(node.child_left_expr))
+                if left in ("int", "date") and left == types.get(id(node.child_right_expr)):
+                    result = "bool"
+            if result is not None:
+                types[id(node)] = result
+        return types
+
+    def find_counter(self, loop, assigned, def_node):
+        condition = loop.child_condition
+        if condition is None or condition.nodetype != "=_op":
+            return
+        left = condition.child_left_expr
+        right = condition.child_right_expr
+        for counter, limit in ((left, right), (right, left)):
+            if counter is None or limit is None or counter.nodetype != "id_name":
+                continue
+            if symbol_type(counter.symdata) != "int":
+                continue
+            if limit.nodetype == "id_name":
+                if limit.symdata in assigned or symbol_type(limit.symdata) != "int":
+                    continue
+            elif limit.nodetype != "int_literal":
+                continue
+            step = self.find_increment(loop, counter.symdata)
+            if step is None:
+                continue
+            count_var = self.new_temp(def_node, loop.lineno, "count")
+            loop.counted = CountedLoop(counter.symdata, step, limit, count_var)
+            self.record(loop, f"counted loop over {counter.value} with step {step}")
+            return
+
+    def find_increment(self, loop, symdata):
+        '''Returns the step if the loop body contains exactly one top-level
+        "counter = counter + step" and the counter is not changed elsewhere
+        in the loop'''
+        increments = []
+        for stmt in loop.children_stmts:
+            if (stmt.nodetype == "assignment" and
+                    stmt.child_lvalue.nodetype == "id_name" and
+                    stmt.child_lvalue.symdata is symdata):
+                increments.append(stmt)
+        if len(increments) != 1:
+            return None
+        # Any other assignment (nested, attr_assign, by a procedure) disables
+        assignments = []
+        def count_assignments(node, semdata):
+            if node.nodetype == "assignment":
+                l_value = node.child_lvalue
+                if l_value.nodetype == "attr_assign":
+                    l_value = l_value.child_var
+                if l_value.symdata is symdata:
+                    assignments.append(node)
+            elif node.nodetype == "procedure_call":
+                effects = self.procedure_effects.get(node.child_name.symdata.defnode, ())
+                if symdata in effects:
+                    assignments.append(node)
+        visit_tree(loop, count_assignments, nodetypes=ASSIGNING_TYPES)
+        if len(assignments) != 1:
+            return None
+        rvalue = increments[0].child_rvalue
+        if rvalue.nodetype not in ("+_op", "-_op"):
+            return None
+        left = rvalue.child_left_expr
+        right = rvalue.child_right_expr
+        if left is None or right is None:
+            return None
+        if (left.nodetype == "id_name" and left.symdata is symdata and
+                right.nodetype == "int_literal"):
+            step = right.value
+        elif (rvalue.nodetype == "+_op" and right.nodetype == "id_name" and
+                right.symdata is symdata and left.nodetype == "int_literal"):
+            step = left.value
+        else:
+            return None
+        if rvalue.nodetype == "-_op":
+            step = -step
+        if step == 0:
+            return None
+        return step
@@ -3,32 +3,270 @@
 
 from datetime import datetime
 import sys
+import threading
+import contextlib
 import symtbl_semantics_check
 import tree_print
 import tree_generation
 import lexer
+import closure_engine
+import bytecode_vm
+import pycodegen
+import tiering
+import tables
+import optimizer
+import source_input
+from runstate import RunState
+from resolve import resolve_slots
+from memoize import MemoTable, MISSING, print_memo_stats
 from semantics_common import SymbolData, SemData
+from diagnostics import Diagnostics, PhError
 
 
-def run_program(tree, semdata):
-    # Initialize all int_literals to zero
-    for symdata in semdata.symtbl.values():
-        if symdata.symtype == "int_literal":
-            symdata.value = 0
-    eval_node(tree, semdata)
+ENGINES = ("tree", "closure", "vm", "python", "tiered")
+MEMO_ENGINES = ("closure", "vm", "python", "tiered")
 
+ENGINE_HELP = ("execution engine (default: vm for deeply nested programs and "
+               "programs with recursive functions or procedures, tree "
+               "otherwise). Only vm runs very deep expressions and call chains "
+               "(e.g. 100k deep), the other engines stop at Python's recursion "
+               "limit")
 
-def eval_node(node, semdata):
+# Syntax trees deeper than this are run with the vm engine when no engine
+# is given (see choose_engine)
+DEEP_TREE = 200
+
+# engine = "tree" runs the reference tree-walker (eval_node),
+# "closure" compiles the tree into closures first (closure_engine.py),
+# "vm" compiles it to bytecode for the stack VM (bytecode_vm.py) and
+# "python" to a Python code object (pycodegen.py). "tiered" starts with the
+# tree-walker and compiles hot functions and loops to closures on the fly
+# (tiering.py), its thresholds are given in tier_options. Only the vm engine is
+# independent of Python's recursion limit, use it for deep expressions and
+# deep recursion in the program (main.py does, see choose_engine).
+# With memoize, results of pure functions are cached (memoize.py). By default
+# the engines of MEMO_ENGINES do it, the reference tree-walker doesn't.
+class Program:
+    '''A checked program compiled for one engine. Compiling is done once,
+    after that the program isn't modified: every run() gets a new RunState,
+    so the same Program can be run many times and from many threads at
+    the same time.'''
+
+    def __init__(self, engine, code, global_init=(), memo=None):
+        self.engine = engine
+        self.code = code
+        self.global_init = tuple(global_init)
+        self.memo = memo
+
+    @classmethod
+    def compile(cls, tree, semdata, engine="tree", memoize=None, **tier_options):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown execution engine: {engine}")
+        if memoize is None:
+            memoize = engine in MEMO_ENGINES
+        resolve_slots(tree, semdata)
+        semdata.memo = MemoTable(tree) if memoize else None
+        if engine == "tree":
+            code = tree
+        elif engine == "closure":
+            code = closure_engine.compile_program(tree, semdata)
+        elif engine == "vm":
+            code = bytecode_vm.compile_program(tree, semdata)
+        elif engine == "python":
+            code = pycodegen.compile_program(tree, semdata)
+        else:
+            code = tiering.TieredCode(tree, semdata, eval_body, **tier_options)
+        return cls(engine, code, semdata.global_init, semdata.memo)
+
+    def run(self, output=None):
+        '''Run the program once, returns the RunState of the run. Printed
+        text goes to the output sink (output.py), by default stdout.'''
+        state = RunState(self.global_init, self.memo, output)
+        try:
+            if self.engine == "tree":
+                eval_node(self.code, state)
+            elif self.engine == "closure":
+                self.code(state)
+            elif self.engine == "vm":
+                bytecode_vm.run_code(self.code, state)
+            elif self.engine == "python":
+                pycodegen.run_code(self.code, state)
+            else:
+                state.tiers = self.code
+                eval_node(self.code.tree, state)
+        finally:
+            state.output.flush()
+        return state
+
+
+def run_program(tree, semdata, engine="tree", memoize=None, output=None):
+    return Program.compile(tree, semdata, engine, memoize).run(output)
+
+
+def choose_engine(tree):
+    '''The engine main.py runs a checked program with when none is given:
+    vm if the program can nest or recurse deeper than the other engines
+    can go with Python's recursion limit (a syntax tree deeper than
+    DEEP_TREE or a function or procedure that can call itself), otherwise
+    tree'''
+    # definition node -> definition nodes it calls
+    calls = dict()
+    stack = [(tree, 0, None)]
+    while stack:
+        node, depth, definition = stack.pop()
+        if depth > DEEP_TREE:
+            return "vm"
+        nodetype = node.nodetype
+        if nodetype == "function_def" or nodetype == "procedure_def":
+            definition = node
+            calls[node] = set()
+        elif (nodetype == "function_call" or nodetype == "procedure_call") and definition:
+            calls[definition].add(node.child_name.symdata.defnode)
+        stack.extend([(child, depth + 1, definition)
+                      for child in tree_print.get_children(node) if child])
+    # Depth-first search for a cycle of calls. done[definition] is False
+    # while the definition is on the path, True after that.
+    done = dict()
+    for start in calls:
+        if start in done:
+            continue
+        done[start] = False
+        path = [(start, iter(calls[start]))]
+        while path:
+            definition, callees = path[-1]
+            callee = next(callees, None)
+            if callee is None:
+                done[definition] = True
+                path.pop()
+            elif callee not in done:
+                done[callee] = False
+                path.append((callee, iter(calls[callee])))
+            elif done[callee] is False:
+                return "vm"
+    return "tree"
+
+
+# The PLY parser and lexer keep their state in the module level objects,
+# so parsing is serialized. Running the resulting Programs is not.
+parse_lock = threading.Lock()
+
+@contextlib.contextmanager
+def collect_errors(diagnostics):
+    '''Lexer and parser errors go to diagnostics (if not None) inside the
+    with block'''
+    lexer.lexer.diagnostics = diagnostics
+    tree_generation.diagnostics = diagnostics
+    try:
+        yield
+    finally:
+        lexer.lexer.diagnostics = None
+        tree_generation.diagnostics = None
+
+def compile_source(data, engine="tree", optimize=False, memoize=None,
+                   cache_dir=None, diagnostics=None):
+    '''Parse, check and compile a program from source code. With the
+    python engine and a cache_dir, compiled code is stored in and loaded
+    from the directory.
+
+    The first error in the program is raised as a diagnostics.PhError.
+    With a Diagnostics collector, every error found by the lexer and
+    parser, or else by the semantic checks, is collected and CompileErrors
+    raised with all of them.'''
+    if memoize is None:
+        memoize = engine in MEMO_ENGINES
+    key = None
+    if engine == "python" and cache_dir is not None:
+        key = pycodegen.cache_key(data, (optimize, memoize))
+        cached = pycodegen.load_cached(cache_dir, key)
+        if cached is not None:
+            code, memo_names = cached
+            memo = MemoTable.from_names(memo_names) if memoize else None
+            return Program(engine, code, memo=memo)
+    with parse_lock, collect_errors(diagnostics):
+        lexer.lexer.lineno = 1
+        ast_tree = tree_generation.parser.parse(data, lexer=lexer.lexer, debug=False)
+    if diagnostics is not None:
+        diagnostics.check()
+    semdata = SemData(diagnostics)
+    symtbl_semantics_check.semantic_checks(ast_tree, semdata)
+    if diagnostics is not None:
+        diagnostics.check()
+    if optimize:
+        optimizer.optimize(ast_tree, semdata)
+    program = Program.compile(ast_tree, semdata, engine, memoize)
+    if key is not None:
+        pycodegen.store_cached(cache_dir, key, program.code,
+                               program.memo.names if program.memo else ())
+    return program
+
+
+# Variables are either in a global slot or formal args/locals in a slot of
+# the current call frame (see resolve.py)
+def load_var(symdata, state):
+    if symdata.is_local:
+        return state.callstack.frame.slots[symdata.slot]
+    return state.globals[symdata.slot]
+
+def store_var(symdata, value, state):
+    if symdata.is_local:
+        state.callstack.frame.slots[symdata.slot] = value
+    else:
+        state.globals[symdata.slot] = value
+
+# Execute statements until all are done or a return_stmt has been executed
+def eval_stmts(stmts, state):
+    frame = state.callstack.frame
+    for i in stmts:
+        eval_node(i, state)
+        if frame.returning:
+            return
+
+def call_subroutine(node, state):
+    def_node = node.child_name.symdata.defnode
+    # Arguments are evaluated in the caller's frame
+    args = [eval_node(arg, state) for arg in node.children_args]
+    pure = state.memo.get(def_node) if state.memo else None
+    if pure is not None:
+        key = pure.make_key(args, state.globals)
+        cache = state.caches[pure.index]
+        result = cache.get(key)
+        if result is MISSING:
+            result = call_with_frame(def_node, args, state)
+            cache.put(key, result)
+        return result
+    return call_with_frame(def_node, args, state)
+
+def call_with_frame(def_node, args, state):
+    callstack = state.callstack
+    frame = callstack.push(def_node.framesize)
+    frame.slots[:len(args)] = args
+    if state.tiers is not None:
+        state.tiers.run_body(def_node, state)
+    else:
+        eval_body(def_node, state)
+    return callstack.pop()
+
+# Run a function or procedure body in the current (already pushed) frame
+def eval_body(def_node, state):
+    frame = state.callstack.frame
+    for var_def in def_node.children_var_defs:
+        eval_node(var_def, state)
+    if def_node.nodetype == "function_def":
+        frame.retval = eval_node(def_node.child_body, state)
+    else:
+        eval_stmts(def_node.children_stmts, state)
+
+
+def eval_node(node, state):
     nodetype = node.nodetype
     if nodetype == "program":
         for i in node.children_definitions:
-            eval_node(i, semdata)
-        for i in node.children_statements:
-            eval_node(i, semdata)
+            eval_node(i, state)
+        eval_stmts(node.children_statements, state)
     
     elif nodetype == "variable_def":
-        value = eval_node(node.child_init_value, semdata)
-        node.symdata.value = value
+        value = eval_node(node.child_init_value, state)
+        store_var(node.symdata, value, state)
     elif nodetype == "int_literal":
         return node.value
     elif nodetype == "date_literal":
@@ -36,11 +274,11 @@ def eval_node(node, semdata):
     elif nodetype == "string_literal":
         return node.value
     elif nodetype == "id_name":
-        return node.symdata.value
+        return load_var(node.symdata, state)
     
     elif nodetype.endswith("_op"):
-        left_value = eval_node(node.child_left_expr, semdata)
-        right_value = eval_node(node.child_right_expr, semdata)
+        left_value = eval_node(node.child_left_expr, state)
+        right_value = eval_node(node.child_right_expr, state)
         oper = nodetype[0]
         if oper == "*":
             return left_value * right_value
@@ -54,104 +292,172 @@ def eval_node(node, semdata):
             return left_value == right_value
         if oper == "<":
             return left_value < right_value
-        print(f"Error, unknown operator type: {oper}")
+        state.print_error(f"Error, unknown operator type: {oper}")
 
     elif nodetype == "attr_read":
-        date = eval_node(node.child_var, semdata)
-        attr = eval_node(node.child_attr, semdata)
+        date = eval_node(node.child_var, state)
+        attr = eval_node(node.child_attr, state)
         if attr == "day":
             return date.day
         if attr == "month":
             return date.month
         if attr == "year":
             return date.year
-        print(f"Error, unknown date attr type: {attr}")
+        state.print_error(f"Error, unknown date attr type: {attr}")
     elif nodetype == "attr_assign":
-        date = eval_node(node.child_var, semdata)
-        attr = eval_node(node.child_attr, semdata)
+        date = eval_node(node.child_var, state)
+        attr = eval_node(node.child_attr, state)
         return date, attr
     elif nodetype == "attr":
         return node.value
 
     elif nodetype == "assignment":
         l_value = node.child_lvalue
-        r_value = eval_node(node.child_rvalue, semdata)
+        r_value = eval_node(node.child_rvalue, state)
         nodetype = l_value.nodetype
         if nodetype == "id_name":
-            l_value.symdata.value = r_value
+            store_var(l_value.symdata, r_value, state)
         elif nodetype == "attr_assign":
-            date, attr = eval_node(l_value, semdata)
+            date, attr = eval_node(l_value, state)
+            symdata = l_value.child_var.symdata
             if attr == "day":
-                l_value.child_var.symdata.value = date.replace(day=r_value)
+                store_var(symdata, date.replace(day=r_value), state)
             elif attr == "month":
-                l_value.child_var.symdata.value = date.replace(month=r_value)
+                store_var(symdata, date.replace(month=r_value), state)
             elif attr == "year":
-                l_value.child_var.symdata.value = date.replace(year=r_value)
+                store_var(symdata, date.replace(year=r_value), state)
             else:
-                print(f"Error, unknown date attr type: {attr}")
+                state.print_error(f"Error, unknown date attr type: {attr}")
         else:
-            print(f"Error, unknown assingment type: {nodetype}")
+            state.print_error(f"Error, unknown assingment type: {nodetype}")
 
     elif nodetype == "print_statement":
-        for printitem in node.children_printitems:
-            print(eval_node(printitem, semdata), end=" ")
-        print()
+        state.output.print_values(
+            [eval_node(printitem, state) for printitem in node.children_printitems])
     elif nodetype == "loop_statement":
+        frame = state.callstack.frame
+        tiers = state.tiers
+        counted = getattr(node, "counted", None)
+        if counted is not None:
+            # Counted loop (see loop_optimizer.py), no condition evaluation
+            count = counted.iterations(load_var(counted.counter, state),
+                                       eval_node(counted.limit, state))
+            if count >= 0:
+                for i in range(1, count + 1):
+                    eval_stmts(node.children_stmts, state)
+                    if frame.returning:
+                        break
+                    if tiers is not None and i < count:
+                        # The compiled loop counts from the current counter
+                        compiled = tiers.hot_loop(node, state)
+                        if compiled is not None:
+                            compiled(state)
+                            break
+                return None
         while True:
-            for i in node.children_stmts:
-                eval_node(i, semdata)
-            if eval_node(node.child_condition, semdata):
+            eval_stmts(node.children_stmts, state)
+            if frame.returning or eval_node(node.child_condition, state):
                 break
+            if tiers is not None:
+                compiled = tiers.hot_loop(node, state)
+                if compiled is not None:
+                    compiled(state)
+                    break
     elif nodetype == "unless_stmt":
-        if not eval_node(node.child_unless, semdata):
-            for i in node.children_stmts:
-                eval_node(i, semdata)
+        if not eval_node(node.child_unless, state):
+            eval_stmts(node.children_stmts, state)
         else:
-            for i in node.children_otherwise:
-                eval_node(i, semdata)
+            eval_stmts(node.children_otherwise, state)
     
     elif nodetype == "unless_expr":
-        if not eval_node(node.child_unless, semdata):
-            return eval_node(node.child_do, semdata)
-        return eval_node(node.child_otherwise, semdata)
+        if not eval_node(node.child_unless, state):
+            return eval_node(node.child_do, state)
+        return eval_node(node.child_otherwise, state)
 
-    elif nodetype == "function_def":
+    elif nodetype == "function_def" or nodetype == "procedure_def":
         pass
-    elif nodetype == "function_call":
-        func_name = node.child_name.value
-        func_node = semdata.symtbl[func_name].defnode
-        # Initialize formal args to the value given to them in function call
-        for idx, formal_arg in enumerate(func_node.children_formal_args):
-            calling_value = eval_node(node.children_args[idx], semdata)
-            formal_arg.symdata.value = calling_value
-        # Execute body
-        return eval_node(func_node.child_body, semdata)
+    elif nodetype == "function_call" or nodetype == "procedure_call":
+        return call_subroutine(node, state)
+    elif nodetype == "return_stmt":
+        frame = state.callstack.frame
+        frame.retval = eval_node(node.child_expr, state)
+        frame.returning = True
 
     else:
-        print("Error, unknown node of type " + nodetype)
+        state.print_error("Error, unknown node of type " + nodetype)
         return None
 
 
-parser = tree_generation.parser
-
 if __name__ == "__main__":
     import argparse
-    import codecs
     arg_parser = argparse.ArgumentParser()
     group = arg_parser.add_mutually_exclusive_group()
     group.add_argument('--who', action='store_true', help='who wrote this')
     arg_parser.add_argument('-f', '--file', help='filename to process')
+    arg_parser.add_argument('-e', '--engine', choices=ENGINES, help=ENGINE_HELP)
+    arg_parser.add_argument('-l', '--lexer', choices=lexer.LEXERS,
+                            help='lexer implementation (default: ply)')
+    arg_parser.add_argument('-p', '--parser', choices=tree_generation.PARSERS,
+                            help='parser implementation (default: ply)')
+    arg_parser.add_argument('--mmap', action='store_true',
+                            help='read the file through a memory map')
+    arg_parser.add_argument('-O', '--optimize', action='store_true',
+                            help='run the AST optimizer before execution')
+    arg_parser.add_argument('--opt-report', action='store_true',
+                            help='print what the optimizer changed')
+    memo_group = arg_parser.add_mutually_exclusive_group()
+    memo_group.add_argument('--memo', dest='memoize', action='store_true', default=None,
+                            help='cache results of pure functions (default with '
+                                 'engines other than tree)')
+    memo_group.add_argument('--no-memo', dest='memoize', action='store_false',
+                            help='do not cache results of pure functions')
+    arg_parser.add_argument('--memo-stats', action='store_true',
+                            help='print function cache statistics after run')
+    arg_parser.add_argument('--tier-stats', action='store_true',
+                            help='print what the tiered engine compiled')
+    arg_parser.add_argument('--startup-stats', action='store_true',
+                            help='print lexer and parser loading times')
     ns = arg_parser.parse_args()
     if ns.who == True:
         print('H274830 Joonas Pelttari')
+    if ns.lexer:
+        lexer.select_lexer(ns.lexer)
+    if ns.parser:
+        tree_generation.select_parser(ns.parser)
+    if ns.startup_stats:
+        tables.print_startup_stats(lexer, tree_generation, title="Startup:")
     if ns.file is None:
         arg_parser.print_help()
     else:
-        data = codecs.open(ns.file, encoding='utf-8').read()
-        ast_tree = parser.parse(data, lexer=lexer.lexer, debug=False)
-        semdata = SemData()
-        symtbl_semantics_check.semantic_checks(ast_tree, semdata)
+        diagnostics = Diagnostics()
+        try:
+            with collect_errors(diagnostics):
+                ast_tree = source_input.parse_file(
+                    tree_generation.parser, lexer.lexer, ns.file, use_mmap=ns.mmap)
+            diagnostics.check()
+            semdata = SemData(diagnostics)
+            symtbl_semantics_check.semantic_checks(ast_tree, semdata)
+            diagnostics.check()
+        except PhError as error:
+            print(error)
+            sys.exit(1)
         tree_print.treeprint(ast_tree)
-        run_program(ast_tree, semdata)
+        if ns.optimize:
+            changes = optimizer.optimize(ast_tree, semdata)
+            if ns.opt_report:
+                print(f"Optimizer made {len(changes)} changes:")
+                for change in changes:
+                    print("  " + change)
+        engine = ns.engine or choose_engine(ast_tree)
+        try:
+            state = run_program(ast_tree, semdata, engine, memoize=ns.memoize)
+        except RecursionError:
+            print(f"Error, the program nests or recurses too deep for the {engine} "
+                  f"engine, run it with -e vm")
+            sys.exit(1)
+        if ns.memo_stats and state.memo:
+            print_memo_stats(state.memo, state.caches, title="Function cache:")
+        if ns.tier_stats and state.tiers:
+            tiering.print_tier_stats(state.tiers, title="Tiered execution:")
         # Uncomment to print symbol table:
         #symtbl_semantics_check.print_symbol_table(semdata, title="Symbols:")
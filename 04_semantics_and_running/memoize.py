@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+#
+# Automatic memoization of pure functions. Function bodies are expressions
+# and simple_semantics_check doesn't allow procedure calls in them, so a
+# function can only depend on its arguments and the global variables it
+# (or the functions it calls) reads. Those globals are found here, and the
+# result of a call is cached keyed on the argument values plus the current
+# values of the globals, each with its type (2, 2.0 and True are equal in
+# Python but print differently). The analysis (MemoTable) is part of the compiled
+# program and never changes, the caches belong to one run (RunState).
+
+from collections import OrderedDict
+from semantics_common import visit_tree
+
+# Date attributes the engines can read. Reading anything else prints an
+# error, which makes the function impure.
+DATE_ATTRS = ("day", "month", "year")
+
+DEFAULT_CACHE_SIZE = 4096
+
+# Returned by LRUCache.get when the key is not in the cache
+MISSING = object()
+
+
+class LRUCache:
+    '''Size-bounded cache that evicts the least recently used entry'''
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.data.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        data = self.data
+        data[key] = value
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+
+
+def typed_key(values):
+    return tuple([(type(value), value) for value in values])
+
+
+class PureFunction:
+    def __init__(self, def_node, globals_read, index):
+        self.def_node = def_node
+        # Slots of the global variables the function depends on
+        self.globals_read = tuple(sorted(i.slot for i in globals_read))
+        # Index of the function's cache in the list from MemoTable.new_caches
+        self.index = index
+
+    def make_key(self, args, global_values):
+        if not self.globals_read:
+            return typed_key(args)
+        return typed_key(args), typed_key([global_values[i] for i in self.globals_read])
+
+
+class MemoTable:
+    def __init__(self, tree, maxsize=DEFAULT_CACHE_SIZE):
+        # function_def node -> PureFunction, only for provably pure functions
+        self.functions = dict()
+        self.maxsize = maxsize
+        # Function names by cache index
+        self.names = []
+        for def_node, globals_read in find_pure_functions(tree).items():
+            self.functions[def_node] = PureFunction(
+                def_node, globals_read, len(self.functions))
+            self.names.append(def_node.child_name.value)
+
+    @classmethod
+    def from_names(cls, names, maxsize=DEFAULT_CACHE_SIZE):
+        '''Table of a program loaded from the code cache (pycodegen.py),
+        only the names of the cached functions are known'''
+        memo = cls.__new__(cls)
+        memo.functions = dict()
+        memo.maxsize = maxsize
+        memo.names = list(names)
+        return memo
+
+    def get(self, def_node):
+        return self.functions.get(def_node)
+
+    def new_caches(self):
+        '''Empty caches for one run, indexed by PureFunction.index'''
+        return [LRUCache(self.maxsize) for i in self.names]
+
+    def stats(self, caches):
+        '''Returns a list of (function name, hits, misses, cached entries)'''
+        return [(name, cache.hits, cache.misses, len(cache.data))
+                for name, cache in zip(self.names, caches)]
+
+
+def print_memo_stats(memo, caches, title):
+    print(title)
+    for name, hits, misses, size in memo.stats(caches):
+        print(f"  {name}: {hits} hits, {misses} misses, {size} cached")
+
+
+class FunctionInfo:
+    def __init__(self):
+        self.globals_read = set()
+        self.calls = set()
+        self.pure = True
+
+
+def collect_function_info(node, info):
+    nodetype = node.nodetype
+    if nodetype == "id_name":
+        symdata = getattr(node, "symdata", None)
+        if (symdata is not None and not symdata.is_local and
+                symdata.defnode.nodetype == "variable_def"):
+            info.globals_read.add(symdata)
+    elif nodetype == "function_call":
+        info.calls.add(node.child_name.symdata.defnode)
+    elif nodetype == "procedure_call":
+        info.pure = False
+    elif nodetype == "attr_read" and node.child_attr.value not in DATE_ATTRS:
+        info.pure = False
+
+
+def find_pure_functions(tree):
+    '''Returns a dict: function_def node -> set of global variables
+    (symbol data) it reads directly or through the functions it calls.
+    Needs the slots from resolve.resolve_slots.'''
+    infos = dict()
+    for def_node in tree.children_definitions:
+        if def_node.nodetype == "function_def":
+            info = FunctionInfo()
+            for var_def in def_node.children_var_defs:
+                visit_tree(var_def.child_init_value, collect_function_info, None, info)
+            visit_tree(def_node.child_body, collect_function_info, None, info)
+            infos[def_node] = info
+    # Propagate through calls until nothing changes (calls can be recursive)
+    changed = True
+    while changed:
+        changed = False
+        for info in infos.values():
+            for called in info.calls:
+                called_info = infos[called]
+                if not called_info.pure and info.pure:
+                    info.pure = False
+                    changed = True
+                if not called_info.globals_read <= info.globals_read:
+                    info.globals_read |= called_info.globals_read
+                    changed = True
+    return {def_node: info.globals_read
+            for def_node, info in infos.items() if info.pure}
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+#
+# AST optimizer run between the semantic checks and execution:
+# - folds +, -, * operators with int literal operands
+# - propagates variable_def initializers of variables that are never
+#   reassigned (int and date literals) to the reads after the definition
+# - reads day/month/year of constant dates
+# - collapses unless expressions/statements with a constant condition and
+#   do-until loops whose condition is constant true (the body runs once)
+# - hoists loop invariants and recognizes counted loops (loop_optimizer.py)
+# The tree is rewritten in place, every change is recorded in
+# Optimizer.changes. Traversals use explicit stacks so deep trees are fine.
+
+from semantics_common import visit_tree
+from tree_generation import create_node
+from loop_optimizer import LoopOptimizer
+
+LITERALS = ("int_literal", "date_literal")
+
+FOLDABLE_OPS = {
+    "+_op": lambda left, right: left + right,
+    "-_op": lambda left, right: left - right,
+    "*_op": lambda left, right: left * right,
+}
+
+# Comparisons can't be folded into a node (there are no boolean literals),
+# but constant conditions are evaluated with them
+COMPARISON_OPS = {
+    "=_op": lambda left, right: left == right,
+    "<_op": lambda left, right: left < right,
+}
+
+DATE_ATTRS = ("day", "month", "year")
+
+# Attributes of expression nodes that contain subexpressions
+EXPR_CHILDREN = {
+    "+_op": ("child_left_expr", "child_right_expr"),
+    "-_op": ("child_left_expr", "child_right_expr"),
+    "*_op": ("child_left_expr", "child_right_expr"),
+    "/_op": ("child_left_expr", "child_right_expr"),
+    "=_op": ("child_left_expr", "child_right_expr"),
+    "<_op": ("child_left_expr", "child_right_expr"),
+    "unless_expr": ("child_unless", "child_do", "child_otherwise"),
+}
+
+
+def find_assigned(node, assigned):
+    if node.nodetype == "assignment":
+        l_value = node.child_lvalue
+        if l_value.nodetype == "attr_assign":
+            l_value = l_value.child_var
+        assigned.add(l_value.symdata)
+
+
+class Optimizer:
+    def __init__(self, semdata):
+        self.semdata = semdata
+        # symbol data -> literal node of constant variables
+        self.constants = dict()
+        self.assigned = set()
+        # Descriptions of what was changed, in the order of the changes
+        self.changes = []
+
+    def record(self, node, description):
+        self.changes.append(f"Line {getattr(node, 'lineno', '?')}: {description}")
+
+    def optimize(self, tree):
+        visit_tree(tree, find_assigned, None, self.assigned, ("assignment",))
+        # Constants are only visible after their definition
+        for node in tree.children_definitions:
+            if node.nodetype == "variable_def":
+                self.optimize_variable_def(node)
+            else:
+                for var_def in node.children_var_defs:
+                    self.optimize_variable_def(var_def)
+                if node.nodetype == "function_def":
+                    node.child_body = self.fold_expr(node.child_body)
+                else:
+                    self.optimize_stmts(node.children_stmts)
+        self.optimize_stmts(tree.children_statements)
+        LoopOptimizer(tree, self.semdata, self.record).optimize()
+        return self.changes
+
+    def optimize_variable_def(self, node):
+        node.child_init_value = self.fold_expr(node.child_init_value)
+        init = node.child_init_value
+        if init.nodetype in LITERALS and node.symdata not in self.assigned:
+            self.constants[node.symdata] = init
+
+    def constant_value(self, node):
+        '''Returns (True, value) if node is a constant expression'''
+        if node is None:
+            return False, None
+        if node.nodetype in LITERALS:
+            return True, node.value
+        if node.nodetype in COMPARISON_OPS:
+            left_ok, left = self.constant_value(node.child_left_expr)
+            right_ok, right = self.constant_value(node.child_right_expr)
+            if left_ok and right_ok and type(left) == type(right):
+                return True, COMPARISON_OPS[node.nodetype](left, right)
+        return False, None
+
+    def fold_node(self, node):
+        '''Returns a replacement for an expression node whose subexpressions
+        are already folded (or the node itself)'''
+        nodetype = node.nodetype
+        if nodetype == "id_name":
+            literal = self.constants.get(getattr(node, "symdata", None))
+            if literal is not None:
+                self.record(node, f"propagated constant {node.value}")
+                return create_node(literal.nodetype, literal.value, node.lineno)
+
+        elif nodetype in FOLDABLE_OPS:
+            left = node.child_left_expr
+            right = node.child_right_expr
+            if (left is not None and right is not None and
+                    left.nodetype == "int_literal" and
+                    right.nodetype == "int_literal"):
+                value = FOLDABLE_OPS[nodetype](left.value, right.value)
+                self.record(node, f"folded {nodetype} to {value}")
+                return create_node("int_literal", value, node.lineno)
+
+        elif nodetype == "attr_read":
+            literal = self.constants.get(node.child_var.symdata)
+            attr = node.child_attr.value
+            if (literal is not None and literal.nodetype == "date_literal" and
+                    attr in DATE_ATTRS):
+                value = getattr(literal.value, attr)
+                self.record(node, f"read {attr} of constant date as {value}")
+                return create_node("int_literal", value, node.lineno)
+
+        elif nodetype == "unless_expr":
+            is_const, condition = self.constant_value(node.child_unless)
+            if is_const:
+                self.record(node, "collapsed unless expression with constant condition")
+                return node.child_otherwise if condition else node.child_do
+        return node
+
+    def fold_expr(self, root):
+        '''Fold an expression tree bottom-up, returns the new root'''
+        # Post-order traversal with an explicit stack. Items are
+        # (node, container, key, children_done), the folded node is stored
+        # back to container[key] (a list) or attribute key of container.
+        result = [root]
+        stack = [(root, result, 0, False)]
+        while stack:
+            node, container, key, children_done = stack.pop()
+            if node is None:
+                continue
+            if not children_done:
+                stack.append((node, container, key, True))
+                for attr in EXPR_CHILDREN.get(node.nodetype, ()):
+                    stack.append((getattr(node, attr), node, attr, False))
+                if node.nodetype in ("function_call", "procedure_call"):
+                    args = node.children_args
+                    for i in range(len(args)):
+                        stack.append((args[i], args, i, False))
+                continue
+            new_node = self.fold_node(node)
+            if new_node is not node:
+                if isinstance(container, list):
+                    container[key] = new_node
+                else:
+                    setattr(container, key, new_node)
+        return result[0]
+
+    def optimize_stmts(self, stmts):
+        '''Optimize a statement list in place'''
+        # Statement lists still to be optimized (nested ones are added while
+        # going through), instead of recursion
+        work = [stmts]
+        while work:
+            stmts = work.pop()
+            i = 0
+            while i < len(stmts):
+                replacement = self.optimize_stmt(stmts[i], work)
+                if replacement is None:
+                    i += 1
+                else:
+                    # Splice the statements in and optimize them next
+                    stmts[i:i + 1] = replacement
+
+    def optimize_stmt(self, node, work):
+        '''Optimize one statement. Returns a list of statements to replace
+        it with, or None if it stays.'''
+        nodetype = node.nodetype
+        if nodetype == "assignment":
+            node.child_rvalue = self.fold_expr(node.child_rvalue)
+        elif nodetype == "print_statement":
+            node.children_printitems[:] = [
+                self.fold_expr(i) for i in node.children_printitems]
+        elif nodetype == "return_stmt":
+            node.child_expr = self.fold_expr(node.child_expr)
+        elif nodetype == "procedure_call":
+            self.fold_expr(node)
+
+        elif nodetype == "unless_stmt":
+            node.child_unless = self.fold_expr(node.child_unless)
+            is_const, condition = self.constant_value(node.child_unless)
+            if is_const:
+                self.record(node, "collapsed unless statement with constant condition")
+                return node.children_otherwise if condition else node.children_stmts
+            work.append(node.children_stmts)
+            work.append(node.children_otherwise)
+
+        elif nodetype == "loop_statement":
+            node.child_condition = self.fold_expr(node.child_condition)
+            is_const, condition = self.constant_value(node.child_condition)
+            if is_const and condition:
+                self.record(node, "loop with constant true condition runs once")
+                return node.children_stmts
+            work.append(node.children_stmts)
+        return None
+
+
+def optimize(tree, semdata):
+    '''Optimize a semantically checked tree in place, returns the list of
+    changes made. Temporary variables are added to the symbol table (the
+    global scope or the scope of the function or procedure).'''
+    return Optimizer(semdata).optimize(tree)
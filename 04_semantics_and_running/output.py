@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+#
+# Output sinks for print_statement. The engines format a whole print
+# statement into one string (the items separated by spaces, followed by
+# " \n" like the original print per item did) and give it to the sink of
+# the run. Sinks collect the text and write it out in bigger pieces when
+# flush_threshold characters have been buffered, and when the run ends.
+# Error messages printed at run time go through the same sink so that they
+# stay in order with the program's own output.
+
+import abc
+import sys
+
+DEFAULT_FLUSH_THRESHOLD = 8192
+
+
+def format_print(values):
+    return " ".join([str(i) for i in values]) + " \n"
+
+
+class OutputSink(abc.ABC):
+    '''Base class of buffered sinks, subclasses implement emit(text)'''
+
+    def __init__(self, flush_threshold=DEFAULT_FLUSH_THRESHOLD):
+        # 0 writes everything out immediately
+        self.flush_threshold = flush_threshold
+        self.buffer = []
+        self.size = 0
+
+    def print_values(self, values):
+        '''Output of one print statement'''
+        self.write(format_print(values))
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.size += len(text)
+        if self.size >= self.flush_threshold:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            text = "".join(self.buffer)
+            self.buffer.clear()
+            self.size = 0
+            self.emit(text)
+
+    @abc.abstractmethod
+    def emit(self, text):
+        '''Write out text (one or more whole print statements)'''
+
+
+class FileSink(OutputSink):
+    '''Writes to a text file object. Without a file, writes to whatever
+    sys.stdout is at the time of the write.'''
+
+    def __init__(self, file=None, flush_threshold=DEFAULT_FLUSH_THRESHOLD):
+        super().__init__(flush_threshold)
+        self.file = file
+
+    def emit(self, text):
+        file = self.file if self.file is not None else sys.stdout
+        file.write(text)
+        file.flush()
+
+
+class BytesSink(OutputSink):
+    '''Writes encoded text to a binary stream (e.g. sys.stdout.buffer, a
+    socket file or io.BytesIO)'''
+
+    def __init__(self, stream, encoding="utf-8",
+                 flush_threshold=DEFAULT_FLUSH_THRESHOLD):
+        super().__init__(flush_threshold)
+        self.stream = stream
+        self.encoding = encoding
+
+    def emit(self, text):
+        self.stream.write(text.encode(self.encoding))
+        if hasattr(self.stream, "flush"):
+            self.stream.flush()
+
+
+class StringSink(OutputSink):
+    '''Keeps the output in memory, getvalue() returns all of it'''
+
+    def __init__(self):
+        super().__init__(flush_threshold=DEFAULT_FLUSH_THRESHOLD)
+        self.chunks = []
+
+    def emit(self, text):
+        self.chunks.append(text)
+
+    def getvalue(self):
+        self.flush()
+        return "".join(self.chunks)
+
+
+class ListSink(OutputSink):
+    '''Captures every print statement as one list item (the items joined
+    with spaces, without the trailing space and newline). Error messages
+    are added as their own items.'''
+
+    def __init__(self):
+        super().__init__(flush_threshold=0)
+        self.lines = []
+
+    def print_values(self, values):
+        self.lines.append(" ".join([str(i) for i in values]))
+
+    def write(self, text):
+        self.emit(text)
+
+    def emit(self, text):
+        self.lines.extend(text.splitlines())
+
+    def flush(self):
+        pass
@@ -0,0 +1,375 @@
+# Generated by tables.py from lexer.py and tree_generation.py,
+# do not edit. Run tables.py again when the grammar changes.
+_tabversion = '3.10'
+_lexer_stamp = ((4143, 1792342860787783028, ), )
+_lexer_hash = '8c409fe8d6b1a983f22ea1501b759f251c7e898dcab9e640afd137dca0b09bc9'
+_lextokens = set(['AMPERSAND', 'APOSTROPHE', 'COMMA', 'COMMENT', 'DATE_LITERAL', 'DIV', 'DO', 'DONE', 'DOT', 'END', 'EQ', 'FUNCTION', 'FUNC_IDENT', 'IDENT', 'INT_LITERAL', 'IS', 'LCURLY', 'LPAREN', 'LSQUARE', 'LT', 'MINUS', 'MULT', 'OTHERWISE', 'PLUS', 'PRINT', 'PROCEDURE', 'PROC_IDENT', 'RCURLY', 'RETURN', 'RPAREN', 'RSQUARE', 'STRING', 'UNLESS', 'UNTIL', 'VAR'])
+_lexreflags = 64
+_lexliterals = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere = {'INITIAL': [('(?P<t_STRING>"([^"]*)")|(?P<t_DATE_LITERAL>\\d{4}-\\d{2}-\\d{2})|(?P<t_INT_LITERAL>-?\\d{1,3}(\\\'\\d{3})*)|(?P<t_COMMENT>\\(%[^%]*%\\))|(?P<t_IDENT>[a-z][a-zA-Z0-9_]{1,})|(?P<t_FUNC_IDENT>[A-Z][a-z0-9_]{1,})|(?P<t_PROC_IDENT>[A-Z]{2}[A-Z0-9_]*)|(?P<t_newline>\\n+)|(?P<t_AMPERSAND>\\&)|(?P<t_APOSTROPHE>\\\')|(?P<t_DOT>\\.)|(?P<t_EQ>\\=)|(?P<t_LCURLY>\\{)|(?P<t_LPAREN>\\()|(?P<t_LSQUARE>\\[)|(?P<t_LT>\\<)|(?P<t_MULT>\\*)|(?P<t_PLUS>\\+)|(?P<t_RCURLY>\\})|(?P<t_RPAREN>\\))|(?P<t_RSQUARE>\\])|(?P<t_COMMA>,)|(?P<t_DIV>/)|(?P<t_MINUS>-)', [None, ('t_STRING', 'STRING', ), None, ('t_DATE_LITERAL', 'DATE_LITERAL', ), ('t_INT_LITERAL', 'INT_LITERAL', ), None, ('t_COMMENT', 'COMMENT', ), ('t_IDENT', 'IDENT', ), ('t_FUNC_IDENT', 'FUNC_IDENT', ), ('t_PROC_IDENT', 'PROC_IDENT', ), ('t_newline', 'newline', ), (None, 'AMPERSAND', ), (None, 'APOSTROPHE', ), (None, 'DOT', ), (None, 'EQ', ), (None, 'LCURLY', ), (None, 'LPAREN', ), (None, 'LSQUARE', ), (None, 'LT', ), (None, 'MULT', ), (None, 'PLUS', ), (None, 'RCURLY', ), (None, 'RPAREN', ), (None, 'RSQUARE', ), (None, 'COMMA', ), (None, 'DIV', ), (None, 'MINUS', )], )]}
+_lexstateignore = {'INITIAL': ' '}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
+_source_stamp = ((4143, 1792342860787783028, ), (20914, 1792343313177569694, ), )
+_source_hash = '9525c5761ccb4cbb9583d6edf652ce01dcb73eec768d828bfb32df7df4202ad4'
+_lr_method = 'LALR'
+_lr_signature = ''
+_lr_action = {
+    0: {'DO': -2, 'FUNCTION': -2, 'IDENT': -2, 'PRINT': -2, 'PROCEDURE': -2, 'PROC_IDENT': -2, 'RETURN': -2, 'VAR': -2, 'error': -2},
+    1: {'$end': 0},
+    10: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    100: {'$end': -71, 'AMPERSAND': -71, 'COMMA': -71, 'DIV': -71, 'DO': -71, 'DONE': -71, 'END': -71, 'EQ': -71, 'FUNCTION': -71, 'IDENT': -71, 'IS': -71, 'LT': -71, 'MINUS': -71, 'MULT': -71, 'OTHERWISE': -71, 'PLUS': -71, 'PRINT': -71, 'PROCEDURE': -71, 'PROC_IDENT': -71, 'RETURN': -71, 'RPAREN': -71, 'UNLESS': -71, 'UNTIL': -71, 'VAR': -71, 'error': -71},
+    101: {'RETURN': 110},
+    102: {'IDENT': 111},
+    103: {'IDENT': 88},
+    104: {'IS': -2, 'RETURN': 114, 'VAR': -2},
+    105: {'COMMA': -25, 'EQ': 53, 'LT': 54, 'RPAREN': -25},
+    106: {'DONE': 116},
+    107: {'DO': 22, 'IDENT': 18, 'PRINT': 23, 'PROC_IDENT': 20, 'RETURN': 10, 'error': 16},
+    108: {'DONE': -48},
+    109: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    11: {'$end': -39, 'COMMA': -39, 'DONE': -39, 'END': -39, 'UNLESS': -39, 'UNTIL': -39},
+    110: {'IDENT': 119},
+    111: {'RSQUARE': 120},
+    112: {'COMMA': -19, 'RCURLY': -19},
+    113: {'IS': -2, 'VAR': 21},
+    114: {'IDENT': 125},
+    115: {'IS': -18, 'VAR': -18},
+    116: {'$end': -46, 'COMMA': -46, 'DONE': -46, 'END': -46, 'UNLESS': -46, 'UNTIL': -46},
+    117: {'COMMA': 25, 'DONE': -47},
+    118: {'EQ': 53, 'LT': 54, 'OTHERWISE': 126},
+    119: {'IS': -2, 'VAR': 21},
+    12: {'$end': -40, 'COMMA': -40, 'DONE': -40, 'END': -40, 'UNLESS': -40, 'UNTIL': -40},
+    120: {'COMMA': -23, 'RCURLY': -23},
+    121: {'IS': 128},
+    122: {'IS': -11, 'VAR': 21},
+    123: {'IS': -12},
+    124: {'IS': -14, 'VAR': -14},
+    125: {'IS': -17, 'VAR': -17},
+    126: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    127: {'IS': 131},
+    128: {'DO': 22, 'IDENT': 18, 'PRINT': 23, 'PROC_IDENT': 20, 'RETURN': 10, 'error': 16},
+    129: {'IS': -13, 'VAR': -13},
+    13: {'$end': -41, 'COMMA': -41, 'DONE': -41, 'END': -41, 'UNLESS': -41, 'UNTIL': -41},
+    130: {'DONE': 133, 'EQ': 53, 'LT': 54},
+    131: {'DATE_LITERAL': 38, 'DO': 80, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    132: {'COMMA': 25, 'END': 135},
+    133: {'$end': -73, 'COMMA': -73, 'DONE': -73, 'END': -73, 'UNLESS': -73, 'UNTIL': -73},
+    134: {'END': 136},
+    135: {'PROCEDURE': 137},
+    136: {'FUNCTION': 138},
+    137: {'DO': -16, 'FUNCTION': -16, 'IDENT': -16, 'PRINT': -16, 'PROCEDURE': -16, 'PROC_IDENT': -16, 'RETURN': -16, 'VAR': -16, 'error': -16},
+    138: {'DO': -15, 'FUNCTION': -15, 'IDENT': -15, 'PRINT': -15, 'PROCEDURE': -15, 'PROC_IDENT': -15, 'RETURN': -15, 'VAR': -15, 'error': -15},
+    14: {'$end': -42, 'COMMA': -42, 'DONE': -42, 'END': -42, 'UNLESS': -42, 'UNTIL': -42},
+    15: {'$end': -43, 'COMMA': -43, 'DONE': -43, 'END': -43, 'UNLESS': -43, 'UNTIL': -43},
+    16: {'$end': -44, 'COMMA': -44, 'DONE': -44, 'END': -44, 'UNLESS': -44, 'UNTIL': -44},
+    17: {'FUNC_IDENT': 40},
+    18: {'DOT': 41, 'EQ': -29},
+    19: {'PROC_IDENT': 42},
+    2: {'DO': 22, 'FUNCTION': 17, 'IDENT': 18, 'PRINT': 23, 'PROCEDURE': 19, 'PROC_IDENT': 20, 'RETURN': 10, 'VAR': 21, 'error': 16},
+    20: {'LPAREN': 43},
+    21: {'IDENT': 44},
+    22: {'DO': 22, 'IDENT': 18, 'PRINT': 23, 'PROC_IDENT': 20, 'RETURN': 10, 'error': 16},
+    23: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20, 'STRING': 49},
+    24: {'EQ': 50},
+    25: {'DO': 22, 'IDENT': 18, 'PRINT': 23, 'PROC_IDENT': 20, 'RETURN': 10, 'error': 16},
+    26: {'$end': -38, 'COMMA': -38, 'DONE': -38, 'END': -38, 'EQ': 53, 'LT': 54, 'UNLESS': -38, 'UNTIL': -38},
+    27: {'$end': -49, 'AMPERSAND': -49, 'COMMA': -49, 'DO': -49, 'DONE': -49, 'END': -49, 'EQ': -49, 'FUNCTION': -49, 'IDENT': -49, 'IS': -49, 'LT': -49, 'MINUS': 57, 'OTHERWISE': -49, 'PLUS': 56, 'PRINT': -49, 'PROCEDURE': -49, 'PROC_IDENT': -49, 'RETURN': -49, 'RPAREN': -49, 'UNLESS': -49, 'UNTIL': -49, 'VAR': -49, 'error': -49},
+    28: {'$end': -53, 'AMPERSAND': -53, 'COMMA': -53, 'DIV': 60, 'DO': -53, 'DONE': -53, 'END': -53, 'EQ': -53, 'FUNCTION': -53, 'IDENT': -53, 'IS': -53, 'LT': -53, 'MINUS': -53, 'MULT': 59, 'OTHERWISE': -53, 'PLUS': -53, 'PRINT': -53, 'PROCEDURE': -53, 'PROC_IDENT': -53, 'RETURN': -53, 'RPAREN': -53, 'UNLESS': -53, 'UNTIL': -53, 'VAR': -53, 'error': -53},
+    29: {'$end': -59, 'AMPERSAND': -59, 'COMMA': -59, 'DIV': -59, 'DO': -59, 'DONE': -59, 'END': -59, 'EQ': -59, 'FUNCTION': -59, 'IDENT': -59, 'IS': -59, 'LT': -59, 'MINUS': -59, 'MULT': -59, 'OTHERWISE': -59, 'PLUS': -59, 'PRINT': -59, 'PROCEDURE': -59, 'PROC_IDENT': -59, 'RETURN': -59, 'RPAREN': -59, 'UNLESS': -59, 'UNTIL': -59, 'VAR': -59, 'error': -59},
+    3: {'DO': -8, 'FUNCTION': -8, 'IDENT': -8, 'PRINT': -8, 'PROCEDURE': -8, 'PROC_IDENT': -8, 'RETURN': -8, 'VAR': -8, 'error': -8},
+    30: {'$end': -61, 'AMPERSAND': -61, 'COMMA': -61, 'DIV': -61, 'DO': -61, 'DONE': -61, 'END': -61, 'EQ': -61, 'FUNCTION': -61, 'IDENT': -61, 'IS': -61, 'LT': -61, 'MINUS': -61, 'MULT': -61, 'OTHERWISE': -61, 'PLUS': -61, 'PRINT': -61, 'PROCEDURE': -61, 'PROC_IDENT': -61, 'RETURN': -61, 'RPAREN': -61, 'UNLESS': -61, 'UNTIL': -61, 'VAR': -61, 'error': -61},
+    31: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'PROC_IDENT': 20},
+    32: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'PROC_IDENT': 20},
+    33: {'$end': -66, 'AMPERSAND': -66, 'APOSTROPHE': 63, 'COMMA': -66, 'DIV': -66, 'DO': -66, 'DONE': -66, 'END': -66, 'EQ': -66, 'FUNCTION': -66, 'IDENT': -66, 'IS': -66, 'LT': -66, 'MINUS': -66, 'MULT': -66, 'OTHERWISE': -66, 'PLUS': -66, 'PRINT': -66, 'PROCEDURE': -66, 'PROC_IDENT': -66, 'RETURN': -66, 'RPAREN': -66, 'UNLESS': -66, 'UNTIL': -66, 'VAR': -66, 'error': -66},
+    34: {'$end': -65, 'AMPERSAND': -65, 'COMMA': -65, 'DIV': -65, 'DO': -65, 'DONE': -65, 'END': -65, 'EQ': -65, 'FUNCTION': -65, 'IDENT': -65, 'IS': -65, 'LT': -65, 'MINUS': -65, 'MULT': -65, 'OTHERWISE': -65, 'PLUS': -65, 'PRINT': -65, 'PROCEDURE': -65, 'PROC_IDENT': -65, 'RETURN': -65, 'RPAREN': -65, 'UNLESS': -65, 'UNTIL': -65, 'VAR': -65, 'error': -65},
+    35: {'$end': -67, 'AMPERSAND': -67, 'COMMA': -67, 'DIV': -67, 'DO': -67, 'DONE': -67, 'END': -67, 'EQ': -67, 'FUNCTION': -67, 'IDENT': -67, 'IS': -67, 'LT': -67, 'MINUS': -67, 'MULT': -67, 'OTHERWISE': -67, 'PLUS': -67, 'PRINT': -67, 'PROCEDURE': -67, 'PROC_IDENT': -67, 'RETURN': -67, 'RPAREN': -67, 'UNLESS': -67, 'UNTIL': -67, 'VAR': -67, 'error': -67},
+    36: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    37: {'$end': -69, 'AMPERSAND': -69, 'COMMA': -69, 'DIV': -69, 'DO': -69, 'DONE': -69, 'END': -69, 'EQ': -69, 'FUNCTION': -69, 'IDENT': -69, 'IS': -69, 'LT': -69, 'MINUS': -69, 'MULT': -69, 'OTHERWISE': -69, 'PLUS': -69, 'PRINT': -69, 'PROCEDURE': -69, 'PROC_IDENT': -69, 'RETURN': -69, 'RPAREN': -69, 'UNLESS': -69, 'UNTIL': -69, 'VAR': -69, 'error': -69},
+    38: {'$end': -70, 'AMPERSAND': -70, 'COMMA': -70, 'DIV': -70, 'DO': -70, 'DONE': -70, 'END': -70, 'EQ': -70, 'FUNCTION': -70, 'IDENT': -70, 'IS': -70, 'LT': -70, 'MINUS': -70, 'MULT': -70, 'OTHERWISE': -70, 'PLUS': -70, 'PRINT': -70, 'PROCEDURE': -70, 'PROC_IDENT': -70, 'RETURN': -70, 'RPAREN': -70, 'UNLESS': -70, 'UNTIL': -70, 'VAR': -70, 'error': -70},
+    39: {'LPAREN': 65},
+    4: {'$end': -1, 'COMMA': 25},
+    40: {'LCURLY': 66},
+    41: {'IDENT': 67},
+    42: {'LCURLY': 68},
+    43: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20, 'RPAREN': -2},
+    44: {'EQ': 73},
+    45: {'COMMA': 25, 'UNLESS': 75, 'UNTIL': 74},
+    46: {'$end': -33, 'AMPERSAND': 76, 'COMMA': -33, 'DONE': -33, 'END': -33, 'UNLESS': -33, 'UNTIL': -33},
+    47: {'$end': -34, 'AMPERSAND': -34, 'COMMA': -34, 'DONE': -34, 'END': -34, 'UNLESS': -34, 'UNTIL': -34},
+    48: {'$end': -36, 'AMPERSAND': -36, 'COMMA': -36, 'DONE': -36, 'END': -36, 'EQ': 53, 'LT': 54, 'UNLESS': -36, 'UNTIL': -36},
+    49: {'$end': -37, 'AMPERSAND': -37, 'COMMA': -37, 'DONE': -37, 'END': -37, 'UNLESS': -37, 'UNTIL': -37},
+    5: {'DO': -9, 'FUNCTION': -9, 'IDENT': -9, 'PRINT': -9, 'PROCEDURE': -9, 'PROC_IDENT': -9, 'RETURN': -9, 'VAR': -9, 'error': -9},
+    50: {'DATE_LITERAL': 38, 'DO': 80, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    51: {'$end': -4, 'COMMA': -4, 'DONE': -4, 'END': -4, 'UNLESS': -4, 'UNTIL': -4},
+    52: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    53: {'DATE_LITERAL': -51, 'FUNC_IDENT': -51, 'IDENT': -51, 'INT_LITERAL': -51, 'LPAREN': -51, 'MINUS': -51, 'PLUS': -51, 'PROC_IDENT': -51},
+    54: {'DATE_LITERAL': -52, 'FUNC_IDENT': -52, 'IDENT': -52, 'INT_LITERAL': -52, 'LPAREN': -52, 'MINUS': -52, 'PLUS': -52, 'PROC_IDENT': -52},
+    55: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    56: {'DATE_LITERAL': -55, 'FUNC_IDENT': -55, 'IDENT': -55, 'INT_LITERAL': -55, 'LPAREN': -55, 'MINUS': -55, 'PLUS': -55, 'PROC_IDENT': -55},
+    57: {'DATE_LITERAL': -56, 'FUNC_IDENT': -56, 'IDENT': -56, 'INT_LITERAL': -56, 'LPAREN': -56, 'MINUS': -56, 'PLUS': -56, 'PROC_IDENT': -56},
+    58: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    59: {'DATE_LITERAL': -57, 'FUNC_IDENT': -57, 'IDENT': -57, 'INT_LITERAL': -57, 'LPAREN': -57, 'MINUS': -57, 'PLUS': -57, 'PROC_IDENT': -57},
+    6: {'$end': -3, 'COMMA': -3, 'DONE': -3, 'END': -3, 'UNLESS': -3, 'UNTIL': -3},
+    60: {'DATE_LITERAL': -58, 'FUNC_IDENT': -58, 'IDENT': -58, 'INT_LITERAL': -58, 'LPAREN': -58, 'MINUS': -58, 'PLUS': -58, 'PROC_IDENT': -58},
+    61: {'$end': -62, 'AMPERSAND': -62, 'COMMA': -62, 'DIV': -62, 'DO': -62, 'DONE': -62, 'END': -62, 'EQ': -62, 'FUNCTION': -62, 'IDENT': -62, 'IS': -62, 'LT': -62, 'MINUS': -62, 'MULT': -62, 'OTHERWISE': -62, 'PLUS': -62, 'PRINT': -62, 'PROCEDURE': -62, 'PROC_IDENT': -62, 'RETURN': -62, 'RPAREN': -62, 'UNLESS': -62, 'UNTIL': -62, 'VAR': -62, 'error': -62},
+    62: {'$end': -63, 'AMPERSAND': -63, 'COMMA': -63, 'DIV': -63, 'DO': -63, 'DONE': -63, 'END': -63, 'EQ': -63, 'FUNCTION': -63, 'IDENT': -63, 'IS': -63, 'LT': -63, 'MINUS': -63, 'MULT': -63, 'OTHERWISE': -63, 'PLUS': -63, 'PRINT': -63, 'PROCEDURE': -63, 'PROC_IDENT': -63, 'RETURN': -63, 'RPAREN': -63, 'UNLESS': -63, 'UNTIL': -63, 'VAR': -63, 'error': -63},
+    63: {'IDENT': 84},
+    64: {'EQ': 53, 'LT': 54, 'RPAREN': 85},
+    65: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20, 'RPAREN': -2},
+    66: {'IDENT': 88, 'RCURLY': -2},
+    67: {'EQ': -30},
+    68: {'IDENT': 88, 'RCURLY': -2},
+    69: {'RPAREN': 93},
+    7: {'DO': -5, 'FUNCTION': -5, 'IDENT': -5, 'PRINT': -5, 'PROCEDURE': -5, 'PROC_IDENT': -5, 'RETURN': -5, 'VAR': -5, 'error': -5},
+    70: {'COMMA': 94, 'RPAREN': -26},
+    71: {'RPAREN': -27},
+    72: {'COMMA': -24, 'EQ': 53, 'LT': 54, 'RPAREN': -24},
+    73: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    74: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    75: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    76: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20, 'STRING': 49},
+    77: {'$end': -28, 'COMMA': -28, 'DONE': -28, 'END': -28, 'UNLESS': -28, 'UNTIL': -28},
+    78: {'$end': -31, 'COMMA': -31, 'DONE': -31, 'END': -31, 'EQ': 53, 'LT': 54, 'UNLESS': -31, 'UNTIL': -31},
+    79: {'$end': -32, 'COMMA': -32, 'DONE': -32, 'END': -32, 'UNLESS': -32, 'UNTIL': -32},
+    8: {'DO': -6, 'FUNCTION': -6, 'IDENT': -6, 'PRINT': -6, 'PROCEDURE': -6, 'PROC_IDENT': -6, 'RETURN': -6, 'VAR': -6, 'error': -6},
+    80: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    81: {'$end': -50, 'AMPERSAND': -50, 'COMMA': -50, 'DO': -50, 'DONE': -50, 'END': -50, 'EQ': -50, 'FUNCTION': -50, 'IDENT': -50, 'IS': -50, 'LT': -50, 'MINUS': 57, 'OTHERWISE': -50, 'PLUS': 56, 'PRINT': -50, 'PROCEDURE': -50, 'PROC_IDENT': -50, 'RETURN': -50, 'RPAREN': -50, 'UNLESS': -50, 'UNTIL': -50, 'VAR': -50, 'error': -50},
+    82: {'$end': -54, 'AMPERSAND': -54, 'COMMA': -54, 'DIV': 60, 'DO': -54, 'DONE': -54, 'END': -54, 'EQ': -54, 'FUNCTION': -54, 'IDENT': -54, 'IS': -54, 'LT': -54, 'MINUS': -54, 'MULT': 59, 'OTHERWISE': -54, 'PLUS': -54, 'PRINT': -54, 'PROCEDURE': -54, 'PROC_IDENT': -54, 'RETURN': -54, 'RPAREN': -54, 'UNLESS': -54, 'UNTIL': -54, 'VAR': -54, 'error': -54},
+    83: {'$end': -60, 'AMPERSAND': -60, 'COMMA': -60, 'DIV': -60, 'DO': -60, 'DONE': -60, 'END': -60, 'EQ': -60, 'FUNCTION': -60, 'IDENT': -60, 'IS': -60, 'LT': -60, 'MINUS': -60, 'MULT': -60, 'OTHERWISE': -60, 'PLUS': -60, 'PRINT': -60, 'PROCEDURE': -60, 'PROC_IDENT': -60, 'RETURN': -60, 'RPAREN': -60, 'UNLESS': -60, 'UNTIL': -60, 'VAR': -60, 'error': -60},
+    84: {'$end': -64, 'AMPERSAND': -64, 'COMMA': -64, 'DIV': -64, 'DO': -64, 'DONE': -64, 'END': -64, 'EQ': -64, 'FUNCTION': -64, 'IDENT': -64, 'IS': -64, 'LT': -64, 'MINUS': -64, 'MULT': -64, 'OTHERWISE': -64, 'PLUS': -64, 'PRINT': -64, 'PROCEDURE': -64, 'PROC_IDENT': -64, 'RETURN': -64, 'RPAREN': -64, 'UNLESS': -64, 'UNTIL': -64, 'VAR': -64, 'error': -64},
+    85: {'$end': -68, 'AMPERSAND': -68, 'COMMA': -68, 'DIV': -68, 'DO': -68, 'DONE': -68, 'END': -68, 'EQ': -68, 'FUNCTION': -68, 'IDENT': -68, 'IS': -68, 'LT': -68, 'MINUS': -68, 'MULT': -68, 'OTHERWISE': -68, 'PLUS': -68, 'PRINT': -68, 'PROCEDURE': -68, 'PROC_IDENT': -68, 'RETURN': -68, 'RPAREN': -68, 'UNLESS': -68, 'UNTIL': -68, 'VAR': -68, 'error': -68},
+    86: {'RPAREN': 100},
+    87: {'RCURLY': 101},
+    88: {'LSQUARE': 102},
+    89: {'COMMA': 103, 'RCURLY': -21},
+    9: {'DO': -7, 'FUNCTION': -7, 'IDENT': -7, 'PRINT': -7, 'PROCEDURE': -7, 'PROC_IDENT': -7, 'RETURN': -7, 'VAR': -7, 'error': -7},
+    90: {'RCURLY': -22},
+    91: {'COMMA': -20, 'RCURLY': -20},
+    92: {'RCURLY': 104},
+    93: {'$end': -72, 'AMPERSAND': -72, 'COMMA': -72, 'DIV': -72, 'DO': -72, 'DONE': -72, 'END': -72, 'EQ': -72, 'FUNCTION': -72, 'IDENT': -72, 'IS': -72, 'LT': -72, 'MINUS': -72, 'MULT': -72, 'OTHERWISE': -72, 'PLUS': -72, 'PRINT': -72, 'PROCEDURE': -72, 'PROC_IDENT': -72, 'RETURN': -72, 'RPAREN': -72, 'UNLESS': -72, 'UNTIL': -72, 'VAR': -72, 'error': -72},
+    94: {'DATE_LITERAL': 38, 'FUNC_IDENT': 39, 'IDENT': 33, 'INT_LITERAL': 34, 'LPAREN': 36, 'MINUS': 32, 'PLUS': 31, 'PROC_IDENT': 20},
+    95: {'DO': -10, 'EQ': 53, 'FUNCTION': -10, 'IDENT': -10, 'IS': -10, 'LT': 54, 'PRINT': -10, 'PROCEDURE': -10, 'PROC_IDENT': -10, 'RETURN': -10, 'VAR': -10, 'error': -10},
+    96: {'$end': -45, 'COMMA': -45, 'DONE': -45, 'END': -45, 'EQ': 53, 'LT': 54, 'UNLESS': -45, 'UNTIL': -45},
+    97: {'DONE': -2, 'EQ': 53, 'LT': 54, 'OTHERWISE': 107},
+    98: {'$end': -35, 'AMPERSAND': -35, 'COMMA': -35, 'DONE': -35, 'END': -35, 'UNLESS': -35, 'UNTIL': -35},
+    99: {'EQ': 53, 'LT': 54, 'UNLESS': 109},
+}
+_lr_goto = {
+    0: {'empty': 3, 'opt_definitions': 2, 'program': 1},
+    1: {},
+    10: {'atom': 30, 'expression': 26, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    100: {},
+    101: {},
+    102: {},
+    103: {'formal_arg': 112},
+    104: {'empty': 115, 'opt_return_type': 113},
+    105: {'relation_op': 52},
+    106: {},
+    107: {'assignment': 13, 'loop_statement': 11, 'lvalue': 24, 'print_statement': 12, 'procedure_call': 14, 'statement': 6, 'statement_list': 117, 'unless_statement': 15},
+    108: {},
+    109: {'atom': 30, 'expression': 118, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    11: {},
+    110: {},
+    111: {},
+    112: {},
+    113: {'empty': 123, 'opt_var_defs': 121, 'var_def_list': 122, 'variable_definition': 124},
+    114: {},
+    115: {},
+    116: {},
+    117: {},
+    118: {'relation_op': 52},
+    119: {'empty': 123, 'opt_var_defs': 127, 'var_def_list': 122, 'variable_definition': 124},
+    12: {},
+    120: {},
+    121: {},
+    122: {'variable_definition': 129},
+    123: {},
+    124: {},
+    125: {},
+    126: {'atom': 30, 'expression': 130, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    127: {},
+    128: {'assignment': 13, 'loop_statement': 11, 'lvalue': 24, 'print_statement': 12, 'procedure_call': 14, 'statement': 6, 'statement_list': 132, 'unless_statement': 15},
+    129: {},
+    13: {},
+    130: {'relation_op': 52},
+    131: {'atom': 30, 'expression': 78, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'rvalue': 134, 'simple_expr': 27, 'term': 28, 'unless_expression': 79},
+    132: {},
+    133: {},
+    134: {},
+    135: {},
+    136: {},
+    137: {},
+    138: {},
+    14: {},
+    15: {},
+    16: {},
+    17: {},
+    18: {},
+    19: {},
+    2: {'assignment': 13, 'definitions': 5, 'function_definition': 7, 'loop_statement': 11, 'lvalue': 24, 'print_statement': 12, 'procedure_call': 14, 'procedure_definition': 8, 'statement': 6, 'statement_list': 4, 'unless_statement': 15, 'variable_definition': 9},
+    20: {},
+    21: {},
+    22: {'assignment': 13, 'loop_statement': 11, 'lvalue': 24, 'print_statement': 12, 'procedure_call': 14, 'statement': 6, 'statement_list': 45, 'unless_statement': 15},
+    23: {'atom': 30, 'expression': 48, 'factor': 29, 'function_call': 35, 'printitem': 47, 'printlist': 46, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    24: {},
+    25: {'assignment': 13, 'loop_statement': 11, 'lvalue': 24, 'print_statement': 12, 'procedure_call': 14, 'statement': 51, 'unless_statement': 15},
+    26: {'relation_op': 52},
+    27: {'add_or_minus': 55},
+    28: {'mult_or_div': 58},
+    29: {},
+    3: {},
+    30: {},
+    31: {'atom': 61, 'function_call': 35, 'procedure_call': 37},
+    32: {'atom': 62, 'function_call': 35, 'procedure_call': 37},
+    33: {},
+    34: {},
+    35: {},
+    36: {'atom': 30, 'expression': 64, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    37: {},
+    38: {},
+    39: {},
+    4: {},
+    40: {},
+    41: {},
+    42: {},
+    43: {'args': 70, 'atom': 30, 'empty': 71, 'expression': 72, 'factor': 29, 'function_call': 35, 'opt_args': 69, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    44: {},
+    45: {},
+    46: {},
+    47: {},
+    48: {'relation_op': 52},
+    49: {},
+    5: {},
+    50: {'atom': 30, 'expression': 78, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'rvalue': 77, 'simple_expr': 27, 'term': 28, 'unless_expression': 79},
+    51: {},
+    52: {'atom': 30, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 81, 'term': 28},
+    53: {},
+    54: {},
+    55: {'atom': 30, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'term': 82},
+    56: {},
+    57: {},
+    58: {'atom': 30, 'factor': 83, 'function_call': 35, 'procedure_call': 37},
+    59: {},
+    6: {},
+    60: {},
+    61: {},
+    62: {},
+    63: {},
+    64: {'relation_op': 52},
+    65: {'args': 70, 'atom': 30, 'empty': 71, 'expression': 72, 'factor': 29, 'function_call': 35, 'opt_args': 86, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    66: {'empty': 90, 'formal_arg': 91, 'formals': 89, 'opt_formals': 87},
+    67: {},
+    68: {'empty': 90, 'formal_arg': 91, 'formals': 89, 'opt_formals': 92},
+    69: {},
+    7: {},
+    70: {},
+    71: {},
+    72: {'relation_op': 52},
+    73: {'atom': 30, 'expression': 95, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    74: {'atom': 30, 'expression': 96, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    75: {'atom': 30, 'expression': 97, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    76: {'atom': 30, 'expression': 48, 'factor': 29, 'function_call': 35, 'printitem': 98, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    77: {},
+    78: {'relation_op': 52},
+    79: {},
+    8: {},
+    80: {'atom': 30, 'expression': 99, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    81: {'add_or_minus': 55},
+    82: {'mult_or_div': 58},
+    83: {},
+    84: {},
+    85: {},
+    86: {},
+    87: {},
+    88: {},
+    89: {},
+    9: {},
+    90: {},
+    91: {},
+    92: {},
+    93: {},
+    94: {'atom': 30, 'expression': 105, 'factor': 29, 'function_call': 35, 'procedure_call': 37, 'simple_expr': 27, 'term': 28},
+    95: {'relation_op': 52},
+    96: {'relation_op': 52},
+    97: {'empty': 108, 'opt_otherwise': 106, 'relation_op': 52},
+    98: {},
+    99: {'relation_op': 52},
+}
+_lr_productions = [
+    ("S' -> program", "S'", 1, None, '', 0, ),
+    ('program -> opt_definitions statement_list', 'program', 2, 'p_program', 'tree_generation.py', 214, ),
+    ('empty -> <empty>', 'empty', 0, 'p_empty', 'tree_generation.py', 221, ),
+    ('statement_list -> statement', 'statement_list', 1, 'p_statement_list1', 'tree_generation.py', 225, ),
+    ('statement_list -> statement_list COMMA statement', 'statement_list', 3, 'p_statement_list2', 'tree_generation.py', 229, ),
+    ('definitions -> function_definition', 'definitions', 1, 'p_definitions1', 'tree_generation.py', 234, ),
+    ('definitions -> procedure_definition', 'definitions', 1, 'p_definitions2', 'tree_generation.py', 238, ),
+    ('definitions -> variable_definition', 'definitions', 1, 'p_definitions3', 'tree_generation.py', 242, ),
+    ('opt_definitions -> empty', 'opt_definitions', 1, 'p_opt_definitions1', 'tree_generation.py', 246, ),
+    ('opt_definitions -> opt_definitions definitions', 'opt_definitions', 2, 'p_opt_definitions2', 'tree_generation.py', 250, ),
+    ('variable_definition -> VAR IDENT EQ expression', 'variable_definition', 4, 'p_variable_definition', 'tree_generation.py', 255, ),
+    ('opt_var_defs -> var_def_list', 'opt_var_defs', 1, 'p_opt_var_defs1', 'tree_generation.py', 262, ),
+    ('opt_var_defs -> empty', 'opt_var_defs', 1, 'p_opt_var_defs2', 'tree_generation.py', 266, ),
+    ('var_def_list -> var_def_list variable_definition', 'var_def_list', 2, 'p_var_def_list1', 'tree_generation.py', 270, ),
+    ('var_def_list -> variable_definition', 'var_def_list', 1, 'p_var_def_list2', 'tree_generation.py', 275, ),
+    ('function_definition -> FUNCTION FUNC_IDENT LCURLY opt_formals RCURLY RETURN IDENT opt_var_defs IS rvalue END FUNCTION', 'function_definition', 12, 'p_function_definition', 'tree_generation.py', 279, ),
+    ('procedure_definition -> PROCEDURE PROC_IDENT LCURLY opt_formals RCURLY opt_return_type opt_var_defs IS statement_list END PROCEDURE', 'procedure_definition', 11, 'p_procedure_definition', 'tree_generation.py', 289, ),
+    ('opt_return_type -> RETURN IDENT', 'opt_return_type', 2, 'p_opt_return_type1', 'tree_generation.py', 299, ),
+    ('opt_return_type -> empty', 'opt_return_type', 1, 'p_opt_return_type2', 'tree_generation.py', 303, ),
+    ('formals -> formals COMMA formal_arg', 'formals', 3, 'p_formals1', 'tree_generation.py', 307, ),
+    ('formals -> formal_arg', 'formals', 1, 'p_formals2', 'tree_generation.py', 312, ),
+    ('opt_formals -> formals', 'opt_formals', 1, 'p_opt_formals1', 'tree_generation.py', 316, ),
+    ('opt_formals -> empty', 'opt_formals', 1, 'p_opt_formals2', 'tree_generation.py', 320, ),
+    ('formal_arg -> IDENT LSQUARE IDENT RSQUARE', 'formal_arg', 4, 'p_formal_arg', 'tree_generation.py', 324, ),
+    ('args -> expression', 'args', 1, 'p_args1', 'tree_generation.py', 331, ),
+    ('args -> args COMMA expression', 'args', 3, 'p_args2', 'tree_generation.py', 335, ),
+    ('opt_args -> args', 'opt_args', 1, 'p_opt_args1', 'tree_generation.py', 340, ),
+    ('opt_args -> empty', 'opt_args', 1, 'p_opt_args2', 'tree_generation.py', 344, ),
+    ('assignment -> lvalue EQ rvalue', 'assignment', 3, 'p_assignment', 'tree_generation.py', 348, ),
+    ('lvalue -> IDENT', 'lvalue', 1, 'p_lvalue1', 'tree_generation.py', 355, ),
+    ('lvalue -> IDENT DOT IDENT', 'lvalue', 3, 'p_lvalue2', 'tree_generation.py', 359, ),
+    ('rvalue -> expression', 'rvalue', 1, 'p_rvalue1', 'tree_generation.py', 366, ),
+    ('rvalue -> unless_expression', 'rvalue', 1, 'p_rvalue2', 'tree_generation.py', 370, ),
+    ('print_statement -> PRINT printlist', 'print_statement', 2, 'p_print_statement', 'tree_generation.py', 374, ),
+    ('printlist -> printitem', 'printlist', 1, 'p_printlist1', 'tree_generation.py', 380, ),
+    ('printlist -> printlist AMPERSAND printitem', 'printlist', 3, 'p_printlist2', 'tree_generation.py', 384, ),
+    ('printitem -> expression', 'printitem', 1, 'p_printitem1', 'tree_generation.py', 389, ),
+    ('printitem -> STRING', 'printitem', 1, 'p_printitem2', 'tree_generation.py', 393, ),
+    ('statement -> RETURN expression', 'statement', 2, 'p_statement1', 'tree_generation.py', 399, ),
+    ('statement -> loop_statement', 'statement', 1, 'p_statement2', 'tree_generation.py', 405, ),
+    ('statement -> print_statement', 'statement', 1, 'p_statement3', 'tree_generation.py', 409, ),
+    ('statement -> assignment', 'statement', 1, 'p_statement4', 'tree_generation.py', 413, ),
+    ('statement -> procedure_call', 'statement', 1, 'p_statement5', 'tree_generation.py', 417, ),
+    ('statement -> unless_statement', 'statement', 1, 'p_statement6', 'tree_generation.py', 421, ),
+    ('statement -> error', 'statement', 1, 'p_statement_error', 'tree_generation.py', 428, ),
+    ('loop_statement -> DO statement_list UNTIL expression', 'loop_statement', 4, 'p_loop_statement', 'tree_generation.py', 447, ),
+    ('unless_statement -> DO statement_list UNLESS expression opt_otherwise DONE', 'unless_statement', 6, 'p_unless_statement', 'tree_generation.py', 455, ),
+    ('opt_otherwise -> OTHERWISE statement_list', 'opt_otherwise', 2, 'p_opt_otherwise1', 'tree_generation.py', 464, ),
+    ('opt_otherwise -> empty', 'opt_otherwise', 1, 'p_opt_otherwise2', 'tree_generation.py', 468, ),
+    ('expression -> simple_expr', 'expression', 1, 'p_expression1', 'tree_generation.py', 472, ),
+    ('expression -> expression relation_op simple_expr', 'expression', 3, 'p_expression2', 'tree_generation.py', 476, ),
+    ('relation_op -> EQ', 'relation_op', 1, 'p_relation_op1', 'tree_generation.py', 482, ),
+    ('relation_op -> LT', 'relation_op', 1, 'p_relation_op2', 'tree_generation.py', 487, ),
+    ('simple_expr -> term', 'simple_expr', 1, 'p_simple_expr1', 'tree_generation.py', 492, ),
+    ('simple_expr -> simple_expr add_or_minus term', 'simple_expr', 3, 'p_simple_expr2', 'tree_generation.py', 496, ),
+    ('add_or_minus -> PLUS', 'add_or_minus', 1, 'p_add_or_minus1', 'tree_generation.py', 502, ),
+    ('add_or_minus -> MINUS', 'add_or_minus', 1, 'p_add_or_minus2', 'tree_generation.py', 507, ),
+    ('mult_or_div -> MULT', 'mult_or_div', 1, 'p_mult_or_div1', 'tree_generation.py', 512, ),
+    ('mult_or_div -> DIV', 'mult_or_div', 1, 'p_mult_or_div2', 'tree_generation.py', 517, ),
+    ('term -> factor', 'term', 1, 'p_term1', 'tree_generation.py', 522, ),
+    ('term -> term mult_or_div factor', 'term', 3, 'p_term2', 'tree_generation.py', 526, ),
+    ('factor -> atom', 'factor', 1, 'p_factor1', 'tree_generation.py', 532, ),
+    ('factor -> PLUS atom', 'factor', 2, 'p_factor2', 'tree_generation.py', 536, ),
+    ('factor -> MINUS atom', 'factor', 2, 'p_factor3', 'tree_generation.py', 541, ),
+    ('atom -> IDENT APOSTROPHE IDENT', 'atom', 3, 'p_atom1', 'tree_generation.py', 545, ),
+    ('atom -> INT_LITERAL', 'atom', 1, 'p_atom2', 'tree_generation.py', 552, ),
+    ('atom -> IDENT', 'atom', 1, 'p_atom3', 'tree_generation.py', 558, ),
+    ('atom -> function_call', 'atom', 1, 'p_atom4', 'tree_generation.py', 562, ),
+    ('atom -> LPAREN expression RPAREN', 'atom', 3, 'p_atom5', 'tree_generation.py', 566, ),
+    ('atom -> procedure_call', 'atom', 1, 'p_atom6', 'tree_generation.py', 570, ),
+    ('atom -> DATE_LITERAL', 'atom', 1, 'p_atom7', 'tree_generation.py', 574, ),
+    ('function_call -> FUNC_IDENT LPAREN opt_args RPAREN', 'function_call', 4, 'p_function_call', 'tree_generation.py', 578, ),
+    ('procedure_call -> PROC_IDENT LPAREN opt_args RPAREN', 'procedure_call', 4, 'p_procedure_call', 'tree_generation.py', 585, ),
+    ('unless_expression -> DO expression UNLESS expression OTHERWISE expression DONE', 'unless_expression', 7, 'p_unless_expression', 'tree_generation.py', 592, ),
+]
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+#
+# Python code generation engine. The checked syntax tree is translated into
+# a Python ast.Module and compiled to a CPython code object, so programs
+# run as Python bytecode. The module defines one function, run(st), which
+# takes the RunState of the run:
+# - global variables are local variables of run(), procedures that assign
+#   them declare them nonlocal
+# - function_defs and procedure_defs become functions nested in run(),
+#   formal args are parameters and local variables are Python locals;
+#   pure functions get a wrapper that looks results up in the run's cache
+# - loop_statements become while loops (counted loops a for loop over a
+#   range), unless statements and expressions if/else
+# Generated statements carry the line numbers of the .ph source. Like the
+# closure engine this is limited by Python's recursion limit, and very
+# deeply nested programs by the limits of the Python compiler.
+#
+# Code objects can be cached on disk, keyed by a hash of the source, the
+# compile options and the compiler version (see compile_source in main.py).
+
+import ast
+import datetime
+import hashlib
+import importlib.util
+import itertools
+import marshal
+import os
+from loop_optimizer import count_iterations
+from memoize import MISSING, typed_key
+from semantics_common import visit_tree
+
+# Change whenever the generated code changes, old cache entries are then
+# not used anymore
+COMPILER_VERSION = 2
+
+CACHE_SUFFIX = ".phc"
+
+BINARY_OPS = {
+    "*_op": ast.Mult,
+    "/_op": ast.Div,
+    "+_op": ast.Add,
+    "-_op": ast.Sub,
+}
+
+COMPARISON_OPS = {
+    "=_op": ast.Eq,
+    "<_op": ast.Lt,
+}
+
+DATE_ATTRS = ("day", "month", "year")
+
+# Names the generated code uses from the module namespace
+RUNTIME = {
+    "_date": datetime.date,
+    "_count_iterations": count_iterations,
+    "_forever": itertools.count,
+    "_MISSING": MISSING,
+    "_typed_key": typed_key,
+}
+
+
+def name(identifier, store=False):
+    return ast.Name(id=identifier, ctx=ast.Store() if store else ast.Load())
+
+def call(func, *args):
+    return ast.Call(func=func if isinstance(func, ast.AST) else name(func),
+                    args=list(args), keywords=[])
+
+def assign(identifier, value):
+    return ast.Assign(targets=[name(identifier, store=True)], value=value)
+
+def constant(value):
+    return ast.Constant(value=value)
+
+
+# Python name of a variable or formal arg. The prefixes keep them apart
+# from Python keywords and the names of the generated code.
+def var_name(symdata):
+    identifier = symdata.defnode.child_name.value.replace("$", "_t")
+    return ("l_" if symdata.is_local else "g_") + identifier
+
+def def_name(def_node):
+    return "f_" + def_node.child_name.value
+
+
+def find_assigned_globals(node, assigned):
+    if node.nodetype == "assignment":
+        l_value = node.child_lvalue
+        if l_value.nodetype == "attr_assign":
+            l_value = l_value.child_var
+        if not l_value.symdata.is_local:
+            assigned.add(var_name(l_value.symdata))
+
+def find_var_names(node, names):
+    symdata = getattr(node, "symdata", None)
+    if node.nodetype == "id_name" and symdata is not None:
+        if symdata.defnode.nodetype in ("variable_def", "formal_arg"):
+            names.add(var_name(symdata))
+
+
+class CodeGenerator:
+    def __init__(self, semdata):
+        self.memo = getattr(semdata, "memo", None)
+        # Date literals are created once per run into variables d_<n>
+        self.dates = []
+        self.loop_count = 0
+        # global slot -> Python name
+        self.global_names = dict()
+
+    def generate(self, tree):
+        '''Returns the ast.Module of the program'''
+        defs = [i for i in tree.children_definitions if i.nodetype != "variable_def"]
+        var_defs = [i for i in tree.children_definitions if i.nodetype == "variable_def"]
+        body = []
+        # Globals exist before any definition runs (like the global slots)
+        for var_def in var_defs:
+            self.global_names[var_def.symdata.slot] = var_name(var_def.symdata)
+            init = 0 if var_def.symdata.symtype == "int_literal" else None
+            body.append(assign(var_name(var_def.symdata), constant(init)))
+        # The run's caches of pure functions are c_<index>
+        if self.memo:
+            for i in range(len(self.memo.names)):
+                body.append(assign(f"c_{i}", ast.Subscript(
+                    value=ast.Attribute(value=name("st"), attr="caches",
+                                        ctx=ast.Load()),
+                    slice=constant(i), ctx=ast.Load())))
+        body.append(assign("_print", ast.Attribute(value=ast.Attribute(
+            value=name("st"), attr="output", ctx=ast.Load()),
+            attr="print_values", ctx=ast.Load())))
+        body.append(assign("_error", ast.Attribute(
+            value=name("st"), attr="print_error", ctx=ast.Load())))
+        for def_node in defs:
+            body.extend(self.subroutine(def_node))
+        body.extend(self.stmts(var_defs))
+        body.extend(self.stmts(tree.children_statements))
+        # Date constants first, now that they are all known
+        body[:0] = [assign(f"d_{i}", call("_date", constant(date.year),
+                                          constant(date.month), constant(date.day)))
+                    for i, date in enumerate(self.dates)]
+        run = ast.FunctionDef(name="run", args=self.arguments(["st"]), body=body,
+                              decorator_list=[], returns=None)
+        return ast.fix_missing_locations(ast.Module(body=[run], type_ignores=[]))
+
+    def arguments(self, names):
+        return ast.arguments(
+            posonlyargs=[], args=[ast.arg(arg=i) for i in names], vararg=None,
+            kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+
+    def function(self, func_name, params, body, lineno):
+        node = ast.FunctionDef(
+            name=func_name, args=self.arguments(params), body=body or [ast.Pass()],
+            decorator_list=[], returns=None)
+        if lineno:
+            node.lineno = node.end_lineno = lineno
+        return node
+
+    def subroutine(self, def_node):
+        '''Python function(s) of a function_def or procedure_def'''
+        params = [var_name(i.symdata) for i in def_node.children_formal_args]
+        body = []
+        if def_node.nodetype == "procedure_def":
+            assigned = set()
+            for stmt in def_node.children_stmts:
+                visit_tree(stmt, find_assigned_globals, None, assigned, ("assignment",))
+            if assigned:
+                body.append(ast.Nonlocal(names=sorted(assigned)))
+        body.extend(self.local_inits(def_node))
+        if def_node.nodetype == "function_def":
+            body.append(ast.Return(value=self.expr(def_node.child_body)))
+        else:
+            body.extend(self.stmts(def_node.children_stmts))
+        func_name = def_name(def_node)
+        lineno = getattr(def_node, "lineno", None)
+        pure = self.memo.get(def_node) if self.memo else None
+        if pure is None:
+            return [self.function(func_name, params, body, lineno)]
+        # Calls go to a wrapper that uses the run's cache, the function
+        # itself is renamed to u_<name>. Keys are built the way
+        # PureFunction.make_key builds them.
+        uncached_name = "u_" + def_node.child_name.value
+        args = call("_typed_key", ast.Tuple(elts=[name(i) for i in params], ctx=ast.Load()))
+        key = args
+        if pure.globals_read:
+            key = ast.Tuple(elts=[args, call("_typed_key", ast.Tuple(
+                elts=[name(self.global_names[i]) for i in pure.globals_read],
+                ctx=ast.Load()))], ctx=ast.Load())
+        cache = f"c_{pure.index}"
+        wrapper_body = [
+            assign("key", key),
+            assign("result", call(ast.Attribute(value=name(cache), attr="get",
+                                                ctx=ast.Load()), name("key"))),
+            ast.If(test=ast.Compare(left=name("result"), ops=[ast.Is()],
+                                    comparators=[name("_MISSING")]),
+                   body=[assign("result", call(uncached_name,
+                                               *[name(i) for i in params])),
+                         ast.Expr(value=call(ast.Attribute(
+                             value=name(cache), attr="put", ctx=ast.Load()),
+                             name("key"), name("result")))],
+                   orelse=[]),
+            ast.Return(value=name("result")),
+        ]
+        return [self.function(uncached_name, params, body, lineno),
+                self.function(func_name, params, wrapper_body, lineno)]
+
+    def local_inits(self, def_node):
+        stmts = []
+        # A local read by an earlier local's initializer starts as None
+        defined = set(var_name(i.symdata) for i in def_node.children_formal_args)
+        later = set(var_name(i.symdata) for i in def_node.children_var_defs)
+        for var_def in def_node.children_var_defs:
+            used = set()
+            visit_tree(var_def.child_init_value, find_var_names, None, used, ("id_name",))
+            for i in sorted((used & later) - defined):
+                stmts.insert(0, assign(i, constant(None)))
+                defined.add(i)
+            stmts.extend(self.stmt(var_def))
+            defined.add(var_name(var_def.symdata))
+        return stmts
+
+    def stmts(self, nodes):
+        result = []
+        for i in nodes:
+            result.extend(self.stmt(i))
+        return result
+
+    def block(self, nodes):
+        return self.stmts(nodes) or [ast.Pass()]
+
+    def stmt(self, node):
+        '''Python statements of a statement node'''
+        result = self.make_stmt(node)
+        if not isinstance(result, list):
+            result = [result]
+        lineno = getattr(node, "lineno", None)
+        if lineno:
+            for i in result:
+                i.lineno = i.end_lineno = lineno
+        return result
+
+    def make_stmt(self, node):
+        nodetype = node.nodetype
+        if nodetype == "variable_def":
+            return assign(var_name(node.symdata), self.expr(node.child_init_value))
+
+        elif nodetype == "assignment":
+            l_value = node.child_lvalue
+            r_value = self.expr(node.child_rvalue)
+            if l_value.nodetype == "id_name":
+                return assign(var_name(l_value.symdata), r_value)
+            if l_value.nodetype == "attr_assign":
+                target = var_name(l_value.child_var.symdata)
+                attr = l_value.child_attr.value
+                if attr in DATE_ATTRS:
+                    # The new value is evaluated before the date is read
+                    replace = ast.Attribute(value=name(target), attr="replace",
+                                            ctx=ast.Load())
+                    return [assign("_value", r_value),
+                            assign(target, ast.Call(func=replace, args=[], keywords=[
+                                ast.keyword(arg=attr, value=name("_value"))]))]
+                return [ast.Expr(value=r_value),
+                        self.error(f"Error, unknown date attr type: {attr}")]
+            return [ast.Expr(value=r_value),
+                    self.error(f"Error, unknown assingment type: {l_value.nodetype}")]
+
+        elif nodetype == "print_statement":
+            items = ast.Tuple(elts=[self.expr(i) for i in node.children_printitems],
+                              ctx=ast.Load())
+            return ast.Expr(value=call("_print", items))
+
+        elif nodetype == "loop_statement":
+            return self.loop(node)
+
+        elif nodetype == "unless_stmt":
+            return ast.If(test=self.expr(node.child_unless),
+                          body=self.block(node.children_otherwise),
+                          orelse=self.stmts(node.children_stmts))
+
+        elif nodetype == "procedure_call" or nodetype == "function_call":
+            return ast.Expr(value=self.expr(node))
+
+        elif nodetype == "return_stmt":
+            # In the main program this ends run()
+            return ast.Return(value=self.expr(node.child_expr))
+
+        return self.error("Error, unknown node of type " + nodetype)
+
+    def loop(self, node):
+        condition = self.expr(node.child_condition)
+        body = self.stmts(node.children_stmts)
+        counted = getattr(node, "counted", None)
+        if counted is None:
+            return ast.While(test=constant(True), orelse=[], body=body + [
+                ast.If(test=condition, body=[ast.Break()], orelse=[])])
+        # Counted loop (see loop_optimizer.py): the body runs count times,
+        # or until the condition is true if count is -1
+        count = f"n_{self.loop_count}"
+        self.loop_count += 1
+        start = name(var_name(counted.counter))
+        iterations = ast.IfExp(
+            test=ast.Compare(left=name(count), ops=[ast.GtE()],
+                             comparators=[constant(0)]),
+            body=call("range", name(count)), orelse=call("_forever"))
+        not_counted = ast.BoolOp(op=ast.And(), values=[
+            ast.Compare(left=name(count), ops=[ast.Lt()], comparators=[constant(0)]),
+            condition])
+        return [assign(count, call("_count_iterations", start,
+                                   self.expr(counted.limit), constant(counted.step))),
+                ast.For(target=name("_", store=True), iter=iterations, orelse=[],
+                        body=body + [ast.If(test=not_counted, body=[ast.Break()],
+                                            orelse=[])])]
+
+    def error(self, message):
+        return ast.Expr(value=call("_error", constant(message)))
+
+    def expr(self, node):
+        nodetype = node.nodetype
+        if nodetype == "int_literal" or nodetype == "string_literal":
+            return constant(node.value)
+        elif nodetype == "date_literal":
+            self.dates.append(node.value)
+            return name(f"d_{len(self.dates) - 1}")
+        elif nodetype == "id_name":
+            return name(var_name(node.symdata))
+
+        elif nodetype in BINARY_OPS:
+            return ast.BinOp(left=self.expr(node.child_left_expr),
+                             op=BINARY_OPS[nodetype](),
+                             right=self.expr(node.child_right_expr))
+        elif nodetype in COMPARISON_OPS:
+            return ast.Compare(left=self.expr(node.child_left_expr),
+                               ops=[COMPARISON_OPS[nodetype]()],
+                               comparators=[self.expr(node.child_right_expr)])
+
+        elif nodetype == "attr_read":
+            attr = node.child_attr.value
+            if attr in DATE_ATTRS:
+                return ast.Attribute(value=self.expr(node.child_var), attr=attr,
+                                     ctx=ast.Load())
+            return call("_error", constant(f"Error, unknown date attr type: {attr}"))
+
+        elif nodetype == "unless_expr":
+            return ast.IfExp(test=self.expr(node.child_unless),
+                             body=self.expr(node.child_otherwise),
+                             orelse=self.expr(node.child_do))
+
+        elif nodetype == "function_call" or nodetype == "procedure_call":
+            def_node = node.child_name.symdata.defnode
+            return call(def_name(def_node),
+                        *[self.expr(arg) for arg in node.children_args])
+
+        return call("_error", constant("Error, unknown node of type " + nodetype))
+
+
+def compile_program(tree, semdata, filename="<ph>"):
+    '''Generate and compile the program, returns a code object. Needs the
+    slots from resolve.resolve_slots and semdata.memo.'''
+    module = CodeGenerator(semdata).generate(tree)
+    return compile(module, filename, "exec")
+
+
+# Running executes the module (which only defines run) and calls run
+def run_code(code, state):
+    namespace = dict(RUNTIME)
+    exec(code, namespace)
+    namespace["run"](state)
+
+
+def cache_key(source, options):
+    '''Key of a compiled program in the code cache. options are the compile
+    options that change the generated code (e.g. optimize, memoize).'''
+    digest = hashlib.sha256()
+    digest.update(f"{COMPILER_VERSION}:{importlib.util.MAGIC_NUMBER.hex()}:"
+                  f"{options!r}\0".encode("utf-8"))
+    digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_cached(cache_dir, key):
+    '''Returns (code object, memoized function names) or None'''
+    try:
+        with open(os.path.join(cache_dir, key + CACHE_SUFFIX), "rb") as file:
+            version, code, memo_names = marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != COMPILER_VERSION:
+        return None
+    return code, memo_names
+
+
+def store_cached(cache_dir, key, code, memo_names):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + CACHE_SUFFIX)
+    # Write to a temporary file first, readers never see a partial entry
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        marshal.dump((COMPILER_VERSION, code, tuple(memo_names)), file)
+    os.replace(temp_path, path)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+#
+# Resolution of variables to integer slots. Global variables (variable_defs
+# of the program, including temporaries added by the optimizer) get a slot
+# in the global slot list, formal args and local variables of functions and
+# procedures get a slot in the call frame (see callstack.py). Runtime values
+# are stored only in those lists, never in the symbol data.
+
+from semantics_common import visit_tree
+
+
+def resolve_frame(node, semdata):
+    nodetype = node.nodetype
+    if nodetype == "function_def" or nodetype == "procedure_def":
+        slot = 0
+        for formal_arg in node.children_formal_args:
+            formal_arg.symdata.slot = slot
+            formal_arg.symdata.is_local = True
+            slot += 1
+        for var_def in node.children_var_defs:
+            var_def.symdata.slot = slot
+            var_def.symdata.is_local = True
+            slot += 1
+        node.framesize = slot
+
+
+def resolve_slots(tree, semdata):
+    '''Give every variable and formal arg a slot (symdata.slot, with
+    symdata.is_local telling if it's in the call frame or global) and every
+    function/procedure definition its frame size (node.framesize). The
+    initial values of the global slots are stored in semdata.global_init:
+    ints start from zero like before their definition is run.'''
+    global_init = []
+    for node in tree.children_definitions:
+        if node.nodetype == "variable_def":
+            symdata = node.symdata
+            symdata.slot = len(global_init)
+            symdata.is_local = False
+            global_init.append(0 if symdata.symtype == "int_literal" else None)
+    semdata.global_init = global_init
+    visit_tree(tree, resolve_frame, nodetypes=("function_def", "procedure_def"))
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+#
+# Per-run state of a program. A compiled program (main.Program) is never
+# changed after compilation, everything a run modifies lives in a RunState:
+# the global variables, the call stack with its frame pool, the caches of
+# pure functions and the output sink (output.py). Runs with separate RunStates can execute the same
+# program concurrently, e.g. from many threads.
+
+from callstack import CallStack
+from output import FileSink
+
+
+class RunState:
+    def __init__(self, global_init=(), memo=None, output=None):
+        self.callstack = CallStack(global_init)
+        self.globals = self.callstack.globals
+        # MemoTable of the program (or None) and this run's caches for it
+        self.memo = memo
+        self.caches = memo.new_caches() if memo else []
+        # Default is buffered output to sys.stdout
+        self.output = output if output is not None else FileSink()
+        # TieredCode of a tiered run (tiering.py) and its call and loop
+        # iteration counts per node
+        self.tiers = None
+        self.profile = dict()
+
+    def print_error(self, message):
+        self.output.write(message + "\n")
+
+    def memo_stats(self):
+        '''Returns a list of (function name, hits, misses, cached entries)'''
+        return self.memo.stats(self.caches) if self.memo else []
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+#
+# Hand-written scanner for the same tokens as the PLY lexer in lexer.py.
+# PLY matches a master regex and then calls a t_ function for most tokens
+# and creates a LexToken for each. Here one regex finds the next token and
+# the loop handles it inline: keywords are looked up in the reserved dict,
+# thousand separators are stripped, dates are parsed and comments and
+# newlines counted without any callbacks. Identifiers are interned, like
+# in lexer.py. Tokens are small __slots__
+# objects produced by a generator.
+#
+# The rules are tried in the same order as PLY tries them (function rules
+# in definition order, then one character tokens), so the token stream and
+# the errors are the same: e.g. "-5" is an INT_LITERAL, "1000" is two
+# INT_LITERALs and a one letter identifier is an illegal character.
+#
+# The input can also come in chunks (input_chunks, used by source_input.py
+# for files), scanned as they are read with line numbers and positions
+# counted over the whole input.
+#
+# Errors are raised as LexErrors, or collected if diagnostics is set (see
+# diagnostics.py).
+
+import re
+import sys
+import datetime
+from diagnostics import LexError, report
+
+# Group numbers of the alternatives below
+SPACES, NEWLINES, STRING, DATE, INT, COMMENT, IDENT, FUNC_IDENT, PROC_IDENT, SINGLE = range(1, 11)
+
+TOKEN_RE = re.compile(r'''
+    ([ ]+)
+  | (\n+)
+  | ("[^"]*")
+  | (\d{4}-\d{2}-\d{2})
+  | (-?\d{1,3}(?:'\d{3})*)
+  | (\(%[^%]*%\))
+  | ([a-z][a-zA-Z0-9_]+)
+  | ([A-Z][a-z0-9_]+)
+  | ([A-Z]{2}[A-Z0-9_]*)
+  | ([()\[\]{}'&,.=<+\-*/])
+''', re.VERBOSE)
+
+SINGLE_TOKENS = {
+    "(": "LPAREN", ")": "RPAREN", "[": "LSQUARE", "]": "RSQUARE",
+    "{": "LCURLY", "}": "RCURLY", "'": "APOSTROPHE", "&": "AMPERSAND",
+    ",": "COMMA", ".": "DOT", "=": "EQ", "<": "LT", "+": "PLUS",
+    "-": "MINUS", "*": "MULT", "/": "DIV",
+}
+
+
+class Token:
+    '''Same attributes as PLY's LexToken (the parser sets lexer on the
+    token of a syntax error)'''
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer")
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return f"LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})"
+
+
+class Scanner:
+    '''Drop-in replacement for the PLY lexer object: input(), token(),
+    lineno, clone() and iteration'''
+
+    def __init__(self, reserved):
+        self.reserved = reserved
+        self.lineno = 1
+        self.lexpos = 0
+        self.lexdata = ""
+        self.generator = iter(())
+        self.diagnostics = None
+
+    def clone(self):
+        scanner = Scanner(self.reserved)
+        scanner.lineno = self.lineno
+        scanner.diagnostics = self.diagnostics
+        return scanner
+
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        self.generator = self.tokens([data])
+
+    def input_chunks(self, chunks):
+        '''Scan text that comes in pieces (see source_input.py). Only the
+        unscanned rest of the current chunks is kept in memory.'''
+        self.lexdata = ""
+        self.lexpos = 0
+        self.generator = self.tokens(chunks)
+
+    def token(self):
+        return next(self.generator, None)
+
+    def __iter__(self):
+        return self.generator
+
+    def tokens(self, chunks):
+        '''Generator of the tokens of the text in chunks (an iterable of
+        strings). Like PLY, line numbers continue from the lineno the
+        scanner has when scanning starts.'''
+        reserved = self.reserved
+        intern = sys.intern
+        match = TOKEN_RE.match
+        lineno = self.lineno
+        chunks = iter(chunks)
+        # Unscanned text and the position of its start in the whole input
+        data = ""
+        base = 0
+        final = False
+        while not final:
+            chunk = next(chunks, None)
+            if chunk is None:
+                final = True
+                end = len(data)
+            else:
+                data += chunk
+                # Only tokens starting before the last newline are scanned
+                # before more text is read. Other tokens end at a newline
+                # and don't depend on what comes after it, strings and
+                # comments that continue in the next chunk are checked below.
+                end = data.rfind("\n") + 1
+            pos = 0
+            while pos < end:
+                m = match(data, pos)
+                if m is None:
+                    if data[pos] == '"' and not final:
+                        # String continues in the next chunk
+                        break
+                    self.lexpos = base + pos
+                    report(self.diagnostics, LexError(
+                        "Illegal character '{}' at line {}".format(data[pos], lineno),
+                        lineno))
+                    pos += 1
+                    continue
+                kind = m.lastindex
+                text = m.group(kind)
+                start = pos
+                pos = m.end()
+                if kind == SPACES:
+                    continue
+                if kind == NEWLINES:
+                    lineno += len(text)
+                    self.lineno = lineno
+                    continue
+                if kind == IDENT:
+                    text = intern(text)
+                    yield Token(reserved.get(text, "IDENT"), text, lineno, base + start)
+                elif kind == SINGLE:
+                    if text == "(" and not final and comment_continues(data, start):
+                        pos = start
+                        break
+                    yield Token(SINGLE_TOKENS[text], text, lineno, base + start)
+                elif kind == INT:
+                    value = int(text.replace("'", ""))
+                    if abs(value) >= 1_000_000_000_000:
+                        report(self.diagnostics, LexError(
+                            f"line {lineno}: INT_LITERAL too large", lineno))
+                    yield Token("INT_LITERAL", value, lineno, base + start)
+                elif kind == FUNC_IDENT:
+                    yield Token("FUNC_IDENT", intern(text), lineno, base + start)
+                elif kind == PROC_IDENT:
+                    yield Token("PROC_IDENT", intern(text), lineno, base + start)
+                elif kind == STRING:
+                    yield Token("STRING", text.replace('"', ''), lineno, base + start)
+                elif kind == DATE:
+                    try:
+                        value = datetime.date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+                    except ValueError:
+                        report(self.diagnostics, LexError(
+                            f"line {lineno}: Invalid Date", lineno))
+                        value = None
+                    yield Token("DATE_LITERAL", value, lineno, base + start)
+                else:
+                    # comments can span multiple lines
+                    lineno += text.count("\n")
+                    self.lineno = lineno
+            base += pos
+            data = data[pos:]
+            self.lexpos = base
+
+
+def comment_continues(data, start):
+    '''True if data[start:] starts a comment that could still end in text
+    not yet read. A comment ends at its first %, if that isn't followed by
+    ")" the ( is a LPAREN like in PLY.'''
+    if not data.startswith("(%", start):
+        return False
+    percent = data.find("%", start + 2)
+    return percent == -1 or percent + 1 == len(data)
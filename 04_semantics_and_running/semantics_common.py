@@ -3,63 +3,278 @@
 
 # Generic useful stuff for semantic analysis and interpretation/code generation
 
-import sys
-from tree_print import get_childvars
+from tree_print import get_children, node_schemas, descendant_types
+from diagnostics import SemanticError, report
 
 
 # A class for collecting data needed during semantic analysis etc.
-# By default contains the symbol table
+# By default contains the symbol table (the global scope, see Scope) and
+# the scope the traversal is in. If diagnostics is set to a
+# diagnostics.Diagnostics, errors are collected there instead of raised.
 
 class SemData:
-  def __init__(self):
-    self.symtbl = dict()
+  def __init__(self, diagnostics=None):
+    self.symtbl = Scope()
+    self.scope = self.symtbl
+    self.diagnostics = diagnostics
 
 # An element in the symbol table, by default containing symbols type
-# and reference to its definition in the syntax tree
+# and reference to its definition in the syntax tree. Variables also get a
+# slot, either in the global slot list or in the call frame (is_local),
+# see resolve.py.
 
 class SymbolData:
   def __init__(self, symtype, defnode):
     self.symtype = symtype
     self.defnode = defnode
+    self.slot = None
+    self.is_local = False
+    self.scope = None
+
+# A scope of the symbol table: a dict from names to SymbolData, and the
+# enclosing scope. The global scope has the global variables, functions
+# and procedures. Each function and procedure definition has a scope of its
+# own (node.scope) for its formal args and local variables, inside the
+# global scope, so the same names can be used in different definitions
+# and they hide global names. The lexers intern the names, so the dict
+# lookups mostly compare pointers.
+
+class Scope(dict):
+  def __init__(self, parent=None, defnode=None):
+    super().__init__()
+    self.parent = parent
+    self.defnode = defnode
+    # The global scope of the symbol table
+    self.root = self if parent is None else parent.root
+
+  def lookup(self, name):
+    '''SymbolData of name in this scope or the enclosing ones, None if not
+    defined'''
+    scope = self
+    while scope is not None:
+      symdata = scope.get(name)
+      if symdata is not None:
+        return symdata
+      scope = scope.parent
+    return None
+
+# What the initial value of a variable sees of its scope: everything but
+# the variable itself. The name of the variable is looked up in the
+# enclosing scopes, so a local variable can be initialized from a global
+# one of the same name.
+
+class InitialValueScope:
+  def __init__(self, scope, symdata):
+    self.scope = scope
+    self.symdata = symdata
+    self.root = scope.root
+
+  def lookup(self, name):
+    symdata = self.scope.get(name)
+    if symdata is not None and symdata is not self.symdata:
+      return symdata
+    if self.scope.parent is None:
+      return None
+    return self.scope.parent.lookup(name)
+
+# Raise (or collect) an error message returned by a visitor function
+def report_visit_error(node, err, semdata):
+  lineno = getattr(node, "lineno", None)
+  if lineno is not None:
+    err = "Line " + str(lineno) + ": " + err
+  report(getattr(semdata, "diagnostics", None), SemanticError(err, lineno))
+
+# Visitor functions can return these instead of None or an error message.
+# SKIP (from before_func) leaves the children of the node unvisited,
+# after_func is still called for the node. STOP ends the traversal.
+class VisitAction:
+  def __init__(self, name):
+    self.name = name
+
+  def __repr__(self):
+    return self.name
+
+SKIP = VisitAction("SKIP")
+STOP = VisitAction("STOP")
+
+# In the stack of the traversals, marks that the node below it is left
+LEAVE = VisitAction("LEAVE")
+
+# frozenset of node types -> {nodetype: can a node of that type be or
+# contain a node of one of the node types}
+subtree_filters = dict()
+
+def subtree_filter(nodetypes):
+  result = subtree_filters.get(nodetypes)
+  if result is None:
+    result = dict()
+    for nodetype in node_schemas:
+      below = descendant_types(nodetype)
+      result[nodetype] = (nodetype in nodetypes or below is None or
+                          not below.isdisjoint(nodetypes))
+    subtree_filters[nodetypes] = result
+  return result
 
 # The function is given the root of the tree 
-def visit_tree(node, before_func=None, after_func=None, semdata=None):
-  '''A generic visitor (which uses tree_print.get_childvars)
+def visit_tree(node, before_func=None, after_func=None, semdata=None, nodetypes=None):
+  '''A generic visitor (which uses tree_print.get_children)
   
      Parameters:
      node: root of the (sub)tree to be traversed
      before_func: When a node is found, this function is first called,
                 then all the childrens of the node are visited recursively, then
                 the second function (after_func) is called. NOTE: If function returns
-                anything except None, it's regarded as an error message, which is printed
-                out and execution is terminated. If node contains an attribute 'lineno',
-                that's included in the error message.
+                anything except None, SKIP or STOP, it's regarded as an error message,
+                which is raised as a SemanticError (or collected to
+                semdata.diagnostics, and the traversal continues). If node contains
+                an attribute 'lineno', that's included in the error message.
      after_func: When a node is found, the func_before function is first called,
                 then all the childrens of the node are visited recursively, then
                 this function is called. NOTE: If function returns
-                anything except None, it's regarded as an error message, which is printed
-                out and execution is terminated. If node contains an attribute 'lineno',
-                that's included in the error message.
-     semdata: optional data that is passed to all functions'''
-
-  if before_func:
-    err = before_func(node, semdata)
-    if not err is None:
-      if hasattr(node, "lineno"):
-        err = "Line " + str(node.lineno) + ": " + err
-      print(err)
-      sys.exit()
-
-  children = get_childvars(node)
-
-  for name,child in children:
-    if child:
-      visit_tree(child, before_func, after_func, semdata)
-
-  if after_func:
-    err = after_func(node, semdata)
-    if not err is None:
-      if hasattr(node, "lineno"):
-        err = "Line " + str(node.lineno) + ": " + err
-      print(err)
-      sys.exit()
+                anything except None or STOP, it's regarded as an error message,
+                handled like the errors of before_func.
+     semdata: optional data that is passed to all functions
+     nodetypes: if given, the functions are only called for nodes of these
+                types, and subtrees that can't contain them (see
+                tree_generation.CHILD_TYPES) are not visited at all
+
+     Returns the node for which a function returned STOP, or None if the
+     whole tree was visited.
+
+     The traversal uses an explicit stack instead of Python recursion, so
+     tree depth is not limited by the recursion limit.'''
+
+  if nodetypes is not None:
+    nodetypes = frozenset(nodetypes)
+    visit = subtree_filter(nodetypes)
+  # A node is pushed a second time with LEAVE on top of it, below its
+  # children, so that after_func is called after them
+  stack = [node]
+  while stack:
+    node = stack.pop()
+    if node is LEAVE:
+      node = stack.pop()
+      err = after_func(node, semdata)
+      if err is STOP:
+        return node
+      if not err is None:
+        report_visit_error(node, err, semdata)
+      continue
+    if not node:
+      continue
+
+    if nodetypes is None or node.nodetype in nodetypes:
+      if before_func:
+        err = before_func(node, semdata)
+        if err is STOP:
+          return node
+        if err is SKIP:
+          if after_func:
+            stack.append(node)
+            stack.append(LEAVE)
+          continue
+        if not err is None:
+          report_visit_error(node, err, semdata)
+
+      if after_func:
+        stack.append(node)
+        stack.append(LEAVE)
+
+    if nodetypes is None:
+      stack.extend(reversed(get_children(node)))
+    else:
+      stack.extend([child for child in reversed(get_children(node))
+                    if child and visit.get(child.nodetype, True)])
+  return None
+
+
+# A check for visit_checks: visitor functions like for visit_tree, the node
+# types they handle (None for all types), the node types without which it
+# has nothing to find (by default the ones it handles) and the initial
+# values of the state flags it keeps
+class Check:
+  def __init__(self, before_func=None, after_func=None, nodetypes=None, needs=None, **flags):
+    self.before_func = before_func
+    self.after_func = after_func
+    self.nodetypes = None if nodetypes is None else frozenset(nodetypes)
+    self.needs = self.nodetypes if needs is None else frozenset(needs)
+    self.flags = flags
+
+# The data the functions of a check get during one visit_checks traversal.
+# The check's flags (and whatever else the functions store) are kept here,
+# separate from the other checks; everything else comes from semdata, so
+# the functions work with visit_tree and semdata too.
+class CheckContext:
+  def __init__(self, semdata, flags):
+    self.semdata = semdata
+    self.__dict__.update(flags)
+
+  def __getattr__(self, name):
+    return getattr(self.semdata, name)
+
+def visit_checks(node, checks, semdata=None, index=None):
+  '''Runs several checks (a list of Check) in one traversal of the tree.
+
+     For each node the before functions of the checks that handle its type
+     are called in list order, then the children are visited, then the
+     after functions are called. Errors are handled like in visit_tree, but
+     are found in tree order instead of check by check. Checks in one
+     traversal must not depend on each other's results (e.g. symbols must
+     be collected in an earlier traversal than the one that checks their
+     use). SKIP and STOP are not supported, as the checks share the
+     traversal. If every check gives its node types, subtrees that can't
+     contain them are not visited.
+
+     With the node index of the tree (tree_generation.NodeIndex), checks
+     that need node types the tree doesn't have are left out, and only
+     the node types the tree has decide which subtrees are visited.'''
+  if index is not None:
+    checks = [check for check in checks
+              if check.needs is None or any(index[nodetype] for nodetype in check.needs)]
+  contexts = [CheckContext(semdata, check.flags) for check in checks]
+  # nodetype -> (before functions, after functions) of the checks that
+  # handle it, each with its check's context
+  functions = dict()
+  def functions_for(nodetype):
+    handling = [(check, ctx) for check, ctx in zip(checks, contexts)
+                if check.nodetypes is None or nodetype in check.nodetypes]
+    result = ([(check.before_func, ctx) for check, ctx in handling if check.before_func],
+              [(check.after_func, ctx) for check, ctx in handling if check.after_func])
+    functions[nodetype] = result
+    return result
+
+  visit = None
+  if all(check.nodetypes is not None for check in checks):
+    nodetypes = frozenset().union(*(check.nodetypes for check in checks))
+    if index is not None:
+      nodetypes = frozenset(nodetype for nodetype in nodetypes if index[nodetype])
+    visit = subtree_filter(nodetypes)
+
+  stack = [node]
+  while stack:
+    node = stack.pop()
+    if node is LEAVE:
+      node = stack.pop()
+      for func, ctx in functions[node.nodetype][1]:
+        err = func(node, ctx)
+        if not err is None:
+          report_visit_error(node, err, semdata)
+      continue
+    if not node:
+      continue
+
+    befores, afters = functions.get(node.nodetype) or functions_for(node.nodetype)
+    for func, ctx in befores:
+      err = func(node, ctx)
+      if not err is None:
+        report_visit_error(node, err, semdata)
+
+    if afters:
+      stack.append(node)
+      stack.append(LEAVE)
+
+    if visit is None:
+      stack.extend(reversed(get_children(node)))
+    else:
+      stack.extend([child for child in reversed(get_children(node))
+                    if child and visit.get(child.nodetype, True)])
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 #
-from semantics_common import visit_tree, SymbolData, SemData
+from semantics_common import visit_checks, Check, SymbolData, SemData
 
 
 # Check that we are reading only allowed attrs from a date. e.g somedate'month
@@ -96,19 +96,23 @@ def check_return_stms_allowed_after(node, semdata):
         semdata.return_exists = False
         semdata.return_stmt_exists = False
 
-def semantic_checks(tree, semdata):
-    visit_tree(tree, check_date_attr_read, None, semdata)
-    visit_tree(tree, check_date_attr_assign, None, semdata)
-    visit_tree(tree, check_func_proc_returntypes, None, semdata)
-
-    semdata.inside_function_def = False
-    visit_tree(tree, check_no_nested_proc_call_before,
-               check_no_nested_proc_call_after, semdata)
-    
-    semdata.date_literal_found = False
-    visit_tree(tree, None, check_date_literal_usage_after, semdata)
+# The checks are independent of each other, so they can all be run in one
+# traversal (see semantics_common.visit_checks)
+CHECKS = [
+    Check(check_date_attr_read, nodetypes=("attr_read",)),
+    Check(check_date_attr_assign, nodetypes=("attr_assign",)),
+    Check(check_func_proc_returntypes, nodetypes=("function_def", "procedure_def")),
+    Check(check_no_nested_proc_call_before, check_no_nested_proc_call_after,
+          ("function_def", "procedure_call"), inside_function_def=False),
+    # Looks at every node left after a date literal
+    Check(None, check_date_literal_usage_after, needs=("date_literal",),
+          date_literal_found=False),
+    Check(check_return_stms_allowed_before, check_return_stms_allowed_after,
+          ("procedure_def", "return_stmt"),
+          inside_proc_def=False, return_exists=False, return_stmt_exists=False),
+]
 
-    semdata.inside_proc_def = False
-    semdata.return_exists = False
-    semdata.return_stmt_exists = False
-    visit_tree(tree, check_return_stms_allowed_before, check_return_stms_allowed_after, semdata)
+def semantic_checks(tree, semdata):
+    # With the node index the parser makes (tree.index), the traversal
+    # skips what the tree has no nodes for
+    visit_checks(tree, CHECKS, semdata, getattr(tree, "index", None))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+#
+# Reading source files in chunks. Instead of decoding the whole file into
+# one string, the file is read (or memory-mapped) and decoded chunk by
+# chunk, and a lexer that can take its input in pieces (scanner.Scanner)
+# tokenizes the chunks as they come. Peak memory is then about the chunk
+# size plus the longest line, comment or string in the file, not the size
+# of the file.
+#
+# The PLY lexer needs all of its input as one string, so for it the chunks
+# are just joined (the file is still decoded only once).
+
+import codecs
+import mmap
+import os
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False):
+    '''Generator of the decoded text of a UTF-8 file in pieces of about
+    chunk_size characters. Line endings are not translated (like
+    codecs.open).'''
+    if use_mmap:
+        yield from mmap_chunks(path, chunk_size)
+        return
+    with open(path, encoding="utf-8", newline="") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def mmap_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # The incremental decoder keeps characters split between chunks
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            # Decoded pages aren't needed again, so they are given back to
+            # keep them out of the resident set (when chunk_size allows it)
+            release = hasattr(mapped, "madvise") and hasattr(mmap, "MADV_DONTNEED") \
+                and chunk_size % mmap.PAGESIZE == 0
+            for offset in range(0, len(mapped), chunk_size):
+                chunk = mapped[offset:offset + chunk_size]
+                if release:
+                    mapped.madvise(mmap.MADV_DONTNEED, offset, len(chunk))
+                yield decoder.decode(chunk)
+            yield decoder.decode(b"", final=True)
+
+
+def read_source(path, use_mmap=False):
+    '''The whole file as one string'''
+    return "".join(read_chunks(path, use_mmap=use_mmap))
+
+
+def input_file(lexer, path, use_mmap=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''Give the file to lexer as input, streamed if the lexer supports it'''
+    if hasattr(lexer, "input_chunks"):
+        lexer.input_chunks(read_chunks(path, chunk_size, use_mmap))
+    else:
+        lexer.input(read_source(path, use_mmap))
+
+
+def parse_file(parser, lexer, path, use_mmap=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    input_file(lexer, path, use_mmap, chunk_size)
+    # Without input, the parser continues with what the lexer already has
+    return parser.parse(lexer=lexer, debug=False)
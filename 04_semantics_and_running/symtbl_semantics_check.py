@@ -1,20 +1,43 @@
 #!/usr/bin/env python3
 #
 
+import sys
 import simple_semantics_check
 import tree_print
 import tree_generation
 import lexer
-from semantics_common import visit_tree, SymbolData, SemData
+import source_input
+from semantics_common import visit_checks, Check, SymbolData, SemData, Scope
+from semantics_common import InitialValueScope
+from diagnostics import PhError
 
-def add_symbol_to_symtbl(node, symbol_name, symbol_type, semdata, error_msg):
-    if symbol_name in semdata.symtbl:
-        definition_node = semdata.symtbl[symbol_name].defnode
+SCOPE_TYPES = ("function_def", "procedure_def")
+
+def add_symbol_to_symtbl(node, symbol_name, symbol_type, scope, error_msg):
+    if symbol_name in scope:
+        definition_node = scope[symbol_name].defnode
         return f"Error, redefined {error_msg} {symbol_name} (earlier definition on line {str(definition_node.lineno)})"
     symdata = SymbolData(symbol_type, node)
-    semdata.symtbl[symbol_name] = symdata
+    symdata.scope = scope
+    scope[symbol_name] = symdata
     node.symdata = symdata  # Add a link to the symbol data to AST node for execution
 
+# The checks keep the scope they are in in semdata.scope: the scope of a
+# function or procedure definition (node.scope, made by add_symbols) inside
+# it and the global scope (semdata.symtbl) elsewhere. In the initial value
+# of a variable, it is what the initial value sees of the scope.
+def enter_scope(node, semdata):
+    if node.nodetype in SCOPE_TYPES:
+        semdata.scope = node.scope
+    elif node.nodetype == "variable_def" and getattr(node, "symdata", None) is not None:
+        semdata.scope = InitialValueScope(semdata.scope, node.symdata)
+
+def leave_scope(node, semdata):
+    if node.nodetype in SCOPE_TYPES:
+        semdata.scope = semdata.symtbl
+    elif node.nodetype == "variable_def" and isinstance(semdata.scope, InitialValueScope):
+        semdata.scope = semdata.scope.scope
+
 # Collect symbols to the symbol table. Returns None | error message
 def add_symbols(node, semdata):
     result = None
@@ -24,57 +47,119 @@ def add_symbols(node, semdata):
             node,
             symbol_name=node.child_name.value,
             symbol_type=node.child_init_value.nodetype,
-            semdata=semdata,
+            scope=semdata.scope,
             error_msg="variable")
+        if result is None:
+            # The name is not looked up, the initial value doesn't see it
+            node.child_name.symdata = node.symdata
     elif nodetype == "procedure_def":
         result = add_symbol_to_symtbl(
             node,
             symbol_name=node.child_name.value,
             symbol_type=node.nodetype,
-            semdata=semdata,
+            scope=semdata.symtbl,
             error_msg="procedure")
     elif nodetype == "function_def":
         result = add_symbol_to_symtbl(
             node,
             symbol_name=node.child_name.value,
             symbol_type=node.nodetype,
-            semdata=semdata,
+            scope=semdata.symtbl,
             error_msg="function")
     elif nodetype == "formal_arg":
         result = add_symbol_to_symtbl(
             node,
             symbol_name=node.child_name.value,
             symbol_type=node.child_type.value,
-            semdata=semdata,
+            scope=semdata.scope,
             error_msg="formal arg")
 
+    # Formal args and local variables go to the definition's own scope
+    # (also when the name of the definition is an error)
+    if nodetype in SCOPE_TYPES:
+        node.scope = Scope(semdata.symtbl, node)
+        semdata.scope = node.scope
     return result
 
+# The symbol data of the name of an id_name node, looked up in scope and
+# cached in node.symdata. None if the name is not defined. A link left by
+# an earlier check of the tree (with another symbol table) is not used.
+def resolve(node, scope):
+    symdata = getattr(node, "symdata", None)
+    if symdata is not None and symdata.scope is not None and symdata.scope.root is scope.root:
+        return symdata
+    symdata = scope.lookup(node.value)
+    if symdata is not None:
+        node.symdata = symdata
+    return symdata
+
 # Check symbol use, add link to symbol data
 def check_symbols(node, semdata):
     nodetype = node.nodetype
+    enter_scope(node, semdata)
     if nodetype == 'id_name' and not semdata.formal_arg:
-        name = node.value
-        if name not in semdata.symtbl:
-            return f"Error, undefined symbol {name} on line {str(node.lineno)}"
-        node.symdata = semdata.symtbl[name]
+        if resolve(node, semdata.scope) is None:
+            if (isinstance(semdata.scope, InitialValueScope) and
+                    semdata.scope.scope.get(node.value) is semdata.scope.symdata):
+                return f"Error, variable {node.value} used in its own initial value on line {str(node.lineno)}"
+            return f"Error, undefined symbol {node.value} on line {str(node.lineno)}"
     if nodetype == "formal_arg":
         semdata.formal_arg = True    
 
 def check_symbols_after(node, semdata):
+    leave_scope(node, semdata)
     if node.nodetype == "formal_arg":
         semdata.formal_arg = False
 
 
+# Find out the type of an expression used as an argument, in the same
+# terms as check_parameters_and_calling compares them with formal arg types.
+# None if the expression uses an undefined symbol or a variable whose
+# initial value depends on itself. Names are looked up in scope (the scope
+# the expression is in), seen has the variables whose initial value is
+# being followed.
+def expression_type(node, scope, seen=()):
+    nodetype = node.nodetype
+    if nodetype == "id_name":
+        symdata = resolve(node, scope)
+        if symdata is None or symdata in seen:
+            return None
+        defnode = symdata.defnode
+        if defnode.nodetype == "formal_arg":
+            return defnode.child_type.value
+        # The initial value sees the scope of the variable without it
+        return expression_type(defnode.child_init_value,
+                               InitialValueScope(symdata.scope, symdata),
+                               seen + (symdata,))
+    if nodetype in ("+_op", "-_op", "*_op", "/_op", "attr_read"):
+        return "int"
+    if nodetype in ("=_op", "<_op"):
+        return "bool"
+    if nodetype in ("function_call", "procedure_call"):
+        symdata = resolve(node.child_name, scope)
+        if symdata is None:
+            return None
+        returntype = symdata.defnode.child_returntype
+        if returntype is None:
+            return "nothing"
+        return returntype.value
+    if nodetype == "unless_expr":
+        return expression_type(node.child_do, scope, seen)
+    return nodetype
+
 # Check procedures and functions are used with correct parameters count
 # also check param types
 def check_parameters_and_calling(node, semdata):
     nodetype = node.nodetype
+    enter_scope(node, semdata)
     # Check param counts are correct
     if nodetype in ("procedure_call", "function_call"):
         call_params_count = len(node.children_args)
-        name = node.child_name.value
-        def_node = semdata.symtbl[name].defnode
+        symdata = resolve(node.child_name, semdata.scope)
+        if symdata is None:
+            # check_symbols reports undefined names
+            return None
+        def_node = symdata.defnode
         def_params_count = len(def_node.children_formal_args)
         if call_params_count != def_params_count:
             return (
@@ -82,10 +167,12 @@ def check_parameters_and_calling(node, semdata):
                 f"of parameters! {def_params_count} expected.")
         # Check param types are correct
         for i in range(0,call_params_count):
-            call_type = node.children_args[i].nodetype
+            call_type = expression_type(node.children_args[i], semdata.scope)
             def_type = def_node.children_formal_args[i].child_type.value
-            if call_type == "id_name": # Find the var type from symbol table
-                call_type = semdata.symtbl[node.children_args[i].value].defnode.child_init_value.nodetype
+            # Undefined names and not allowed param types are reported
+            # by the other checks
+            if call_type is None or def_type not in ("int", "date_literal"):
+                continue
             if not (call_type == def_type or
                 (call_type.startswith("int") and def_type == "int")):
                 return f"Error, calling with type {call_type}. Expected {def_type}"
@@ -95,52 +182,72 @@ def check_parameters_and_calling(node, semdata):
 
 def after_param_call_check(node, semdata):
     nodetype = node.nodetype
+    leave_scope(node, semdata)
     if nodetype.endswith("_statement"):
         semdata.inside_statement = False
 
-# Simple symbol table printer for debugging
+# Simple symbol table printer for debugging. The symbols of a function or
+# procedure follow its own entry.
 def print_symbol_table(semdata, title):
     print(title)
-    for name, data in semdata.symtbl.items():
+    print_scope(semdata.symtbl)
+
+def print_scope(scope):
+    for name, data in scope.items():
         print(name, ":")
         for attr, value in vars(data).items():
+            if attr == "scope":
+                continue
             printvalue = value
             if hasattr(value, "nodetype"):
                 printvalue = value.nodetype
                 if hasattr(value, "lineno"):
                     printvalue = printvalue + ", line " + str(value.lineno)
             print("  ", attr, "=", printvalue)
+        inner = getattr(data.defnode, "scope", None)
+        if inner is not None:
+            print_scope(inner)
+
+# Symbols have to be collected from the whole tree before their use can be
+# checked, so the checks take two traversals
+DEFINITION_TYPES = ("variable_def", "function_def", "procedure_def", "formal_arg")
+
+COLLECT_CHECKS = simple_semantics_check.CHECKS + [
+    Check(add_symbols, leave_scope, DEFINITION_TYPES)]
+
+USE_CHECKS = [
+    Check(check_symbols, check_symbols_after,
+          ("id_name", "formal_arg", "variable_def") + SCOPE_TYPES, formal_arg=False),
+    Check(check_parameters_and_calling, after_param_call_check,
+          ("procedure_call", "function_call", "loop_statement", "print_statement",
+           "variable_def") + SCOPE_TYPES,
+          inside_statement=False, inside_expression=False),
+]
 
 def semantic_checks(tree, semdata):
     '''run all semantic checks'''
-    # Run Phase 3 semantic checks
-    simple_semantics_check.semantic_checks(tree, semdata)
-
-    visit_tree(tree, add_symbols, None, semdata)
-
-    semdata.formal_arg = False # Track if node is inside formal_arg
-    visit_tree(tree, check_symbols, check_symbols_after, semdata)
-
-    semdata.inside_statement = False # Track if inside statement
-    semdata.inside_expression = False
-    visit_tree(tree, check_parameters_and_calling, after_param_call_check, semdata)
+    index = getattr(tree, "index", None)
+    visit_checks(tree, COLLECT_CHECKS, semdata, index)
+    visit_checks(tree, USE_CHECKS, semdata, index)
 
 
 parser = tree_generation.parser
 
 if __name__ == "__main__":
     import argparse
-    import codecs
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument('-f', '--file', help='filename to process')
     ns = arg_parser.parse_args()
     if ns.file is None:
         arg_parser.print_help()
     else:
-        data = codecs.open(ns.file, encoding='utf-8').read()
-        ast_tree = parser.parse(data, lexer=lexer.lexer, debug=False)
-        tree_print.treeprint(ast_tree)
-        semdata = SemData()
-        semantic_checks(ast_tree, semdata)
+        try:
+            ast_tree = source_input.parse_file(parser, lexer.lexer, ns.file)
+            tree_print.treeprint(ast_tree)
+            semdata = SemData()
+            semantic_checks(ast_tree, semdata)
+        except PhError as error:
+            print(error)
+            sys.exit(1)
         print_symbol_table(semdata, title="Symbol table:")
         print("Semantics ok:")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+#
+# Frozen lexer and parser tables. ply.lex.lex() and ply.yacc.yacc() inspect
+# the grammar module, validate it, build (or check) the LALR tables and by
+# default write parsetab.py and parser.out on every start. Instead, the
+# build step below generates the tables once into ph_tables.py, and at
+# start they are loaded from there without reflection or file writes:
+#
+#   python tables.py                 (grammar in tree_generation.py)
+#   python tables.py -p main         (grammar in main.py)
+#
+# ph_tables.py records the PLY table version, and for the lexer tables and
+# the parser tables the size and modification time of the source files they
+# were built from and a hash of their contents. At start only the sizes and
+# times are compared (one stat per file). If they differ (e.g. after a
+# checkout) the contents are hashed, and if a source has changed since, or
+# PLY is of another table version, the lexer or parser is built with PLY
+# as before (but without writing any files) until the build step is run
+# again.
+
+import hashlib
+import importlib
+import os
+import re
+import sys
+import time
+import ply.lex
+import ply.yacc
+
+FROZEN_MODULE = "ph_tables"
+
+# How the tables module, the lexer and the parser were loaded at startup:
+# component -> ("import", "frozen" or "ply", seconds)
+STARTUP = dict()
+
+
+def source_stamp(modules):
+    stamp = []
+    for module in modules:
+        stat = os.stat(module.__file__)
+        stamp.append((stat.st_size, stat.st_mtime_ns))
+    return tuple(stamp)
+
+
+def source_hash(modules):
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def tables_module():
+    '''The frozen tables module, None if there is none'''
+    if "tables" not in STARTUP:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(FROZEN_MODULE)
+        except ImportError:
+            pass
+        STARTUP["tables"] = ("import", time.perf_counter() - start)
+    return sys.modules.get(FROZEN_MODULE)
+
+
+def frozen_tables(modules, prefix):
+    '''The frozen tables module if its tables with the prefix (_lexer or
+    _source for the parser) are up to date with the modules'''
+    frozen = tables_module()
+    if frozen is None or getattr(frozen, "_tabversion", None) != ply.yacc.__tabversion__:
+        return None
+    if getattr(frozen, prefix + "_stamp", None) == source_stamp(modules):
+        return frozen
+    if getattr(frozen, prefix + "_hash", None) != source_hash(modules):
+        return None
+    return frozen
+
+
+def load_lexer(module):
+    '''Lexer for the token rules of module (the lexer module itself)'''
+    tables_module()
+    start = time.perf_counter()
+    frozen = frozen_tables([module], "_lexer")
+    if frozen is not None:
+        lexer = ply.lex.Lexer()
+        lexer.readtab(frozen, vars(module))
+        STARTUP["lexer"] = ("frozen", time.perf_counter() - start)
+        return lexer
+    lexer = ply.lex.lex(module=module)
+    STARTUP["lexer"] = ("ply", time.perf_counter() - start)
+    return lexer
+
+
+def load_parser(module, depends=()):
+    '''Parser for the grammar rules of module. depends are the other
+    modules the grammar comes from (the lexer module with the tokens).'''
+    tables_module()
+    start = time.perf_counter()
+    frozen = frozen_tables(list(depends) + [module], "_source")
+    if frozen is not None:
+        table = ply.yacc.LRTable()
+        table.read_table(frozen)
+        table.bind_callables(vars(module))
+        parser = ply.yacc.LRParser(table, module.p_error)
+        STARTUP["parser"] = ("frozen", time.perf_counter() - start)
+        return parser
+    parser = ply.yacc.yacc(module=module, debug=False, write_tables=False)
+    STARTUP["parser"] = ("ply", time.perf_counter() - start)
+    return parser
+
+
+def build_with_ply(lexer_module, parser_module):
+    '''Build the lexer and parser from the grammar like PLY does without
+    table files. Returns (lexer, parser, lexer seconds, parser seconds).'''
+    # The regular expressions are compiled again, like at a start
+    re.purge()
+    start = time.perf_counter()
+    lexer = ply.lex.lex(module=lexer_module)
+    middle = time.perf_counter()
+    parser = ply.yacc.yacc(module=parser_module, debug=False, write_tables=False,
+                           tabmodule="_no_table_module",
+                           errorlog=ply.yacc.NullLogger())
+    return lexer, parser, middle - start, time.perf_counter() - middle
+
+
+def print_startup_stats(lexer_module, parser_module, title):
+    _, _, lexer_build, parser_build = build_with_ply(lexer_module, parser_module)
+    print(title)
+    import_time = STARTUP.get("tables", ("?", 0.0))[1]
+    print(f"  {FROZEN_MODULE}: imported in {import_time * 1000:.2f} ms")
+    saved = -import_time
+    for component, build_time in (("lexer", lexer_build), ("parser", parser_build)):
+        how, load_time = STARTUP.get(component, ("?", 0.0))
+        print(f"  {component}: {how} tables loaded in {load_time * 1000:.2f} ms, "
+              f"building from grammar takes {build_time * 1000:.2f} ms "
+              f"(saved {(build_time - load_time) * 1000:.2f} ms)")
+        saved += build_time - load_time
+    print(f"  saved {saved * 1000:.2f} ms in total, the import included")
+
+
+def write_tables(path, lexer_module, parser_module):
+    '''Build step: generate the frozen tables module'''
+    lexer, parser, _, _ = build_with_ply(lexer_module, parser_module)
+    # Same data as PLY's lextab and parsetab modules, with the functions of
+    # the lexer by name
+    lexstatere = dict()
+    for state, entries in lexer.lexstatere.items():
+        lexstatere[state] = [
+            (text, ply.lex._funcs_to_names(funcs, names))
+            for (_, funcs), text, names in zip(
+                entries, lexer.lexstateretext[state], lexer.lexstaterenames[state])]
+    table = parser.action, parser.goto
+    productions = [(p.str, p.name, p.len, p.func, os.path.basename(p.file), p.line)
+                   for p in parser.productions]
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("# Generated by tables.py from "
+                   f"{lexer_module.__name__}.py and {parser_module.__name__}.py,\n"
+                   "# do not edit. Run tables.py again when the grammar changes.\n")
+        for name, value in (
+                ("_tabversion", ply.yacc.__tabversion__),
+                ("_lexer_stamp", source_stamp([lexer_module])),
+                ("_lexer_hash", source_hash([lexer_module])),
+                ("_lextokens", lexer.lextokens),
+                ("_lexreflags", int(lexer.lexreflags)),
+                ("_lexliterals", lexer.lexliterals),
+                ("_lexstateinfo", lexer.lexstateinfo),
+                ("_lexstatere", lexstatere),
+                ("_lexstateignore", lexer.lexstateignore),
+                ("_lexstateerrorf", {state: func.__name__
+                                     for state, func in lexer.lexstateerrorf.items()}),
+                ("_lexstateeoff", {state: func.__name__
+                                   for state, func in lexer.lexstateeoff.items()}),
+                ("_source_stamp", source_stamp([lexer_module, parser_module])),
+                ("_source_hash", source_hash([lexer_module, parser_module])),
+                ("_lr_method", "LALR"),
+                ("_lr_signature", ""),
+                ("_lr_action", table[0]),
+                ("_lr_goto", table[1]),
+                ("_lr_productions", productions)):
+            if isinstance(value, (dict, list)) and len(value) > 1:
+                # One entry per line
+                items = sorted(value.items(), key=lambda item: repr(item[0])) \
+                    if isinstance(value, dict) else value
+                file.write(f"{name} = {'{' if isinstance(value, dict) else '['}\n")
+                for item in items:
+                    if isinstance(value, dict):
+                        file.write(f"    {literal(item[0])}: {literal(item[1])},\n")
+                    else:
+                        file.write(f"    {literal(item)},\n")
+                file.write(f"{'}' if isinstance(value, dict) else ']'}\n")
+            else:
+                file.write(f"{name} = {literal(value)}\n")
+
+
+# repr with sets and dicts in sorted order, so that the generated module
+# doesn't change between builds
+def literal(value):
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: repr(item[0]))
+        return "{" + ", ".join(f"{literal(k)}: {literal(v)}" for k, v in items) + "}"
+    if isinstance(value, (set, frozenset)):
+        return "set([" + ", ".join(sorted(literal(i) for i in value)) + "])"
+    if isinstance(value, list):
+        return "[" + ", ".join(literal(i) for i in value) + "]"
+    if isinstance(value, tuple):
+        return "(" + "".join(literal(i) + ", " for i in value) + ")"
+    return repr(value)
+
+
+if __name__ == "__main__":
+    import argparse
+    arg_parser = argparse.ArgumentParser(
+        description="generate frozen lexer and parser tables")
+    arg_parser.add_argument('-l', '--lexer-module', default="lexer",
+                            help='module with the token rules (default: lexer)')
+    arg_parser.add_argument('-p', '--parser-module', default="tree_generation",
+                            help='module with the grammar (default: tree_generation)')
+    ns = arg_parser.parse_args()
+    lexer_module = importlib.import_module(ns.lexer_module)
+    parser_module = importlib.import_module(ns.parser_module)
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), FROZEN_MODULE + ".py")
+    write_tables(path, lexer_module, parser_module)
+    print(f"Wrote {path}")
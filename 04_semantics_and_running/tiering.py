@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+#
+# Tiered execution. The "tiered" engine starts every program in the
+# tree-walker (main.eval_node), which has no compile cost. Each run counts
+# calls per function_def/procedure_def and loop back-edges per
+# loop_statement, and once a count passes its threshold the function or
+# loop is compiled with the closure engine and the compiled version is used
+# from then on, also by later runs of the same Program.
+#
+# Both tiers use the same RunState (slots, frames, caches), so switching is
+# possible at any call and after any loop iteration. Compiled code calls
+# functions that are still interpreted through a trampoline in their
+# closure_engine cell, which keeps counting and runs the tree-walker.
+
+import threading
+import closure_engine
+
+DEFAULT_CALL_THRESHOLD = 50
+DEFAULT_LOOP_THRESHOLD = 500
+
+
+class TierUp:
+    '''One promotion to the compiled tier'''
+
+    def __init__(self, kind, name, lineno, count):
+        self.kind = kind
+        self.name = name
+        self.lineno = lineno
+        self.count = count
+
+
+class TieredCode:
+    def __init__(self, tree, semdata, interpret,
+                 call_threshold=DEFAULT_CALL_THRESHOLD,
+                 loop_threshold=DEFAULT_LOOP_THRESHOLD):
+        '''interpret(def_node, state) is the tree-walker for a function or
+        procedure body, run in an already pushed frame'''
+        self.tree = tree
+        self.call_threshold = call_threshold
+        self.loop_threshold = loop_threshold
+        self.ctx = closure_engine.CompileContext(semdata)
+        # function_def/procedure_def/loop_statement node -> compiled closure.
+        # Only added to (under the lock), readers don't need the lock.
+        self.compiled = dict()
+        self.lock = threading.Lock()
+        self.events = []
+        for def_node in tree.children_definitions:
+            if def_node.nodetype in ("function_def", "procedure_def"):
+                self.ctx.function_bodies[def_node] = [
+                    self.make_trampoline(def_node, interpret)]
+
+    def make_trampoline(self, def_node, interpret):
+        def run_interpreted(st):
+            compiled = self.hot_function(def_node, st)
+            if compiled is not None:
+                compiled(st)
+            else:
+                interpret(def_node, st)
+        return run_interpreted
+
+    def run_body(self, def_node, state):
+        '''Run a function or procedure body in the current frame, in
+        whichever tier it is'''
+        self.ctx.function_bodies[def_node][0](state)
+
+    def hot_function(self, def_node, state):
+        '''Count a call, returns the compiled body if the function is (or
+        just became) hot, else None'''
+        compiled = self.compiled.get(def_node)
+        if compiled is not None:
+            return compiled
+        count = state.profile.get(def_node, 0) + 1
+        state.profile[def_node] = count
+        if count < self.call_threshold:
+            return None
+        return self.promote(def_node, count)
+
+    def hot_loop(self, node, state):
+        '''Count a back-edge of a loop, returns the compiled loop if it is
+        hot, else None. The compiled loop starts with the loop body, so it
+        continues from where the tree-walker is.'''
+        compiled = self.compiled.get(node)
+        if compiled is not None:
+            return compiled
+        count = state.profile.get(node, 0) + 1
+        state.profile[node] = count
+        if count < self.loop_threshold:
+            return None
+        return self.promote(node, count)
+
+    def promote(self, node, count):
+        with self.lock:
+            compiled = self.compiled.get(node)
+            if compiled is not None:
+                return compiled
+            if node.nodetype == "loop_statement":
+                compiled = closure_engine.compile_node(node, self.ctx)
+                self.events.append(TierUp("loop", None, node.lineno, count))
+            else:
+                # Compiling the definition replaces the trampoline in its cell
+                closure_engine.compile_node(node, self.ctx)
+                compiled = self.ctx.function_bodies[node][0]
+                self.events.append(TierUp(
+                    node.nodetype[:-4], node.child_name.value, node.lineno, count))
+            self.compiled[node] = compiled
+            return compiled
+
+    def stats(self):
+        '''Returns (call threshold, loop threshold, list of TierUp events
+        in the order they happened)'''
+        return self.call_threshold, self.loop_threshold, list(self.events)
+
+
+def print_tier_stats(tiers, title):
+    call_threshold, loop_threshold, events = tiers.stats()
+    print(title)
+    print(f"  thresholds: {call_threshold} calls, {loop_threshold} loop iterations")
+    for event in events:
+        if event.kind == "loop":
+            print(f"  loop on line {event.lineno} compiled after {event.count} iterations")
+        else:
+            print(f"  {event.kind} {event.name} (line {event.lineno}) compiled after {event.count} calls")
@@ -1,17 +1,204 @@
 #!/usr/bin/env python3
 
+import sys
+import os
+import collections
 import ply.yacc
 import ply.lex
 import lexer
+import tables
+import source_input
 import tree_print
 import simple_semantics_check
 from semantics_common import SemData
+from diagnostics import ParseError, PhError, report
 
-# Class for syntax tree nodes
+# Class for syntax tree nodes. ASTnode(typestr) makes a node of the class
+# of that node type (NODE_CLASSES below), which keeps the attributes in
+# __slots__ instead of a __dict__ per node. Node types without a class of
+# their own get a DictNode, which can have any attributes.
 class ASTnode:
+    __slots__ = ()
+
+    def __new__(cls, typestr=None):
+        if cls is ASTnode:
+            cls = NODE_CLASSES.get(typestr, DictNode)
+        node = object.__new__(cls)
+        if index_nodes is not None:
+            index_nodes[typestr].append(node)
+        return node
+
+    def __init__(self, typestr):
+        pass
+
+class DictNode(ASTnode):
     def __init__(self, typestr):
         self.nodetype = typestr
 
+# nodetype -> list of the nodes created, while a parser made by
+# select_parser is parsing (see NodeIndex)
+index_nodes = None
+
+def drop_from_index(node):
+    '''Leave a subtree that was parsed but isn't used in the tree out of the
+    index being made. Its nodes must be the last ones created.'''
+    if index_nodes is None:
+        return
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node:
+            index_nodes[node.nodetype].pop()
+            stack.extend(tree_print.get_children(node))
+
+class NodeIndex:
+    '''The nodes of a parsed tree by node type, made while parsing (the
+    parsers of select_parser give it to the tree as tree.index).
+    index[nodetype] is a list of the nodes of that type in the order they
+    were created, which is the order in the source except that children are
+    created before their parents. Nodes that error recovery threw away are
+    in it too, and the optimizers don't update it, so it is for the phases
+    between parsing and optimizing.'''
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        # node -> parent node, found when first needed
+        self.parents = None
+
+    def __getitem__(self, nodetype):
+        return self.nodes.get(nodetype, ())
+
+    def parent(self, node):
+        '''Parent node of a node, None for the root'''
+        if self.parents is None:
+            parents = dict()
+            for nodes in self.nodes.values():
+                for parent in nodes:
+                    for child in tree_print.get_children(parent):
+                        if child:
+                            parents[child] = parent
+            self.parents = parents
+        return self.parents.get(node)
+
+    def definition(self, node):
+        '''The function_def or procedure_def node that node is in, None if
+        it's not in one'''
+        node = self.parent(node)
+        while node is not None and node.nodetype not in ("function_def", "procedure_def"):
+            node = self.parent(node)
+        return node
+
+# The child attributes of each node type, in the order the children are
+# visited and printed in. Traversals use these through
+# tree_print.get_children instead of looking at the attributes of every
+# node.
+CHILD_FIELDS = {
+    "program": ("children_definitions", "children_statements"),
+    "variable_def": ("child_name", "child_init_value"),
+    "function_def": ("child_name", "child_returntype", "children_var_defs",
+                     "children_formal_args", "child_body"),
+    "procedure_def": ("child_name", "child_returntype", "children_var_defs",
+                      "children_formal_args", "children_stmts"),
+    "formal_arg": ("child_name", "child_type"),
+    "assignment": ("child_lvalue", "child_rvalue"),
+    "attr_assign": ("child_var", "child_attr"),
+    "print_statement": ("children_printitems",),
+    "return_stmt": ("child_expr",),
+    "loop_statement": ("child_condition", "children_stmts"),
+    "unless_stmt": ("children_stmts", "child_unless", "children_otherwise"),
+    "unless_expr": ("child_do", "child_unless", "child_otherwise"),
+    "=_op": ("child_left_expr", "child_right_expr"),
+    "<_op": ("child_left_expr", "child_right_expr"),
+    "+_op": ("child_left_expr", "child_right_expr"),
+    "-_op": ("child_left_expr", "child_right_expr"),
+    "*_op": ("child_left_expr", "child_right_expr"),
+    "/_op": ("child_left_expr", "child_right_expr"),
+    "attr_read": ("child_var", "child_attr"),
+    "function_call": ("child_name", "children_args"),
+    "procedure_call": ("child_name", "children_args"),
+    "id_name": (),
+    "id_type": (),
+    "attr": (),
+    "int_literal": (),
+    "string_literal": (),
+    "date_literal": (),
+}
+
+# The node types the children of each node type can be. Traversals that
+# look for some node types only use these to skip subtrees that can't
+# contain them (see semantics_common.visit_tree).
+EXPRESSION_TYPES = ("=_op", "<_op", "+_op", "-_op", "*_op", "/_op", "attr_read",
+                    "id_name", "int_literal", "date_literal", "function_call",
+                    "procedure_call")
+STATEMENT_TYPES = ("assignment", "print_statement", "return_stmt", "loop_statement",
+                   "unless_stmt", "procedure_call")
+CHILD_TYPES = {
+    "program": ("variable_def", "function_def", "procedure_def") + STATEMENT_TYPES,
+    "variable_def": EXPRESSION_TYPES,
+    "function_def": ("id_type", "variable_def", "formal_arg", "unless_expr") +
+                    EXPRESSION_TYPES,
+    "procedure_def": ("id_name", "id_type", "variable_def", "formal_arg") +
+                     STATEMENT_TYPES,
+    "formal_arg": ("id_name", "id_type"),
+    "assignment": ("attr_assign", "unless_expr") + EXPRESSION_TYPES,
+    "attr_assign": ("id_name", "attr"),
+    "print_statement": ("string_literal",) + EXPRESSION_TYPES,
+    "return_stmt": EXPRESSION_TYPES,
+    "loop_statement": EXPRESSION_TYPES + STATEMENT_TYPES,
+    "unless_stmt": EXPRESSION_TYPES + STATEMENT_TYPES,
+    "unless_expr": EXPRESSION_TYPES,
+    "=_op": EXPRESSION_TYPES,
+    "<_op": EXPRESSION_TYPES,
+    "+_op": EXPRESSION_TYPES,
+    "-_op": EXPRESSION_TYPES,
+    "*_op": EXPRESSION_TYPES,
+    "/_op": EXPRESSION_TYPES,
+    "attr_read": ("id_name", "attr"),
+    "function_call": EXPRESSION_TYPES,
+    "procedure_call": EXPRESSION_TYPES,
+}
+
+# Other attributes nodes can have besides the children and lineno: value
+# of the terminals, the index of the program, and the ones added after
+# parsing (symdata by the semantic checks, framesize by resolve.py, counted
+# by loop_optimizer.py)
+NODE_ATTRIBUTES = {
+    "program": ("index",),
+    "variable_def": ("symdata",),
+    "function_def": ("symdata", "framesize", "scope"),
+    "procedure_def": ("symdata", "framesize", "scope"),
+    "formal_arg": ("symdata",),
+    "loop_statement": ("counted",),
+    "id_name": ("value", "symdata"),
+    "id_type": ("value",),
+    "attr": ("value",),
+    "int_literal": ("value",),
+    "string_literal": ("value",),
+    "date_literal": ("value",),
+}
+
+def make_node_class(nodetype, fields):
+    '''ASTnode subclass with slots for the attributes of nodetype'''
+    slots = fields + ("lineno",) + NODE_ATTRIBUTES.get(nodetype, ())
+    return type(nodetype + "_node", (ASTnode,),
+                {"__slots__": slots, "nodetype": nodetype})
+
+NODE_CLASSES = {}
+for nodetype, fields in CHILD_FIELDS.items():
+    NODE_CLASSES[nodetype] = make_node_class(nodetype, fields)
+    tree_print.register_children(nodetype, fields, CHILD_TYPES.get(nodetype, ()))
+
+def node_attributes(node):
+    '''The attributes set in a node as a dict, nodetype first (like vars()
+    of a DictNode)'''
+    if isinstance(node, DictNode):
+        return vars(node)
+    attributes = {"nodetype": node.nodetype}
+    for name in type(node).__slots__:
+        if hasattr(node, name):
+            attributes[name] = getattr(node, name)
+    return attributes
+
 tokens = lexer.tokens
 
 # Creates an ASTnode for terminal token. Used in multiple places for creating
@@ -39,9 +226,9 @@ def p_statement_list1(p):
     p[0] = [p[1]]
 
 def p_statement_list2(p):
-    '''statement_list : statement COMMA statement_list'''
-    p[0] = p[3]
-    p[0].insert(0, p[1])
+    '''statement_list : statement_list COMMA statement'''
+    p[0] = p[1]
+    p[0].append(p[3])
 
 def p_definitions1(p):
     '''definitions : function_definition'''
@@ -234,6 +421,28 @@ def p_statement6(p):
     '''statement : unless_statement'''
     p[0] = p[1]
 
+# Error recovery when errors are collected: the rest of a statement with a
+# syntax error is skipped and the statement is None in the tree (which is
+# not used further when there were errors)
+def p_statement_error(p):
+    '''statement : error'''
+    global error_token
+    # p[1] is the token that caused the error. If the same token causes
+    # another error statement, PLY's recovery is going round in a loop
+    # (the token doesn't fit after the error statement either, and p_error
+    # isn't called again), so parsing stops with the errors found so far.
+    if p[1] is error_token:
+        raise StopParsing()
+    error_token = p[1]
+    p[0] = None
+
+# Token of the last error statement, reset by PlyParser for each parse
+error_token = None
+
+class StopParsing(Exception):
+    '''Raised when error recovery can't get past a syntax error. The parse
+    then returns None, the errors are in diagnostics'''
+
 def p_loop_statement(p):
     '''loop_statement : DO statement_list UNTIL expression'''
     p[0] = ASTnode("loop_statement")
@@ -330,6 +539,7 @@ def p_factor2(p):
 # not sure about this
 def p_factor3(p):
     '''factor : MINUS atom'''
+    drop_from_index(p[2])
 
 def p_atom1(p):
     '''atom : IDENT APOSTROPHE IDENT'''
@@ -386,17 +596,74 @@ def p_unless_expression(p):
     p[0].child_otherwise = p[6]
     p[0].lineno = p.lineno(1)
 
-def p_error(p):
+# Errors are raised, unless a diagnostics.Diagnostics collector is set here
+diagnostics = None
+
+def syntax_error(p):
     if (p):
-        print( f"{p.lineno}:Syntax Error (token: '{p.value}')" )
+        return ParseError(f"{p.lineno}:Syntax Error (token: '{p.value}')", p.lineno)
+    return ParseError("Unexpected end of input")
+
+def p_error(p):
+    report(diagnostics, syntax_error(p))
+
+class PlyParser:
+    '''The PLY parser, with the error recovery state of one parse'''
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def parse(self, input=None, lexer=None, debug=False):
+        global error_token
+        error_token = None
+        try:
+            return self.parser.parse(input, lexer=lexer, debug=debug)
+        except StopParsing:
+            return None
+        finally:
+            error_token = None
+            # PLY keeps its stacks, which refer to the tree, until the next
+            # parse
+            self.parser.symstack = self.parser.statestack = None
+
+ply_parser = PlyParser(tables.load_parser(sys.modules[__name__], [lexer]))
+
+# The hand-written parser in descent_parser.py builds the same trees
+PARSERS = ("ply", "descent")
+
+class IndexingParser:
+    '''A parser that gives the trees it makes a NodeIndex (tree.index)'''
+
+    def __init__(self, parser):
+        self.parser = parser
+
+    def parse(self, input=None, lexer=None, debug=False):
+        global index_nodes
+        index_nodes = collections.defaultdict(list)
+        try:
+            tree = self.parser.parse(input, lexer=lexer, debug=debug)
+        finally:
+            nodes = index_nodes
+            index_nodes = None
+        if tree is not None:
+            tree.index = NodeIndex(nodes)
+        return tree
+
+def select_parser(name):
+    global parser
+    if name == "ply":
+        parser = IndexingParser(ply_parser)
+    elif name == "descent":
+        import descent_parser
+        parser = IndexingParser(descent_parser.Parser())
     else:
-        print("Unexpected end of input")
-    raise SystemExit
+        raise ValueError(f"Unknown parser: {name}")
+    return parser
 
-parser = ply.yacc.yacc()
+select_parser(os.environ.get("PH_PARSER", "ply"))
 
 if __name__ == '__main__':
-    import argparse, codecs
+    import argparse
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument('-t', '--treetype', help='type of output tree (unicode/ascii/dot)')
     group = arg_parser.add_mutually_exclusive_group()
@@ -411,8 +678,11 @@ if __name__ == '__main__':
     elif ns.file is None:
         arg_parser.print_help()
     else:
-        data = codecs.open( ns.file, encoding='utf-8' ).read()
-        ast_tree = parser.parse(data, lexer=lexer.lexer, debug=False)
-        tree_print.treeprint(ast_tree, outformat)
-        semdata = SemData()
-        simple_semantics_check.semantic_checks(ast_tree, semdata)
+        try:
+            ast_tree = source_input.parse_file(parser, lexer.lexer, ns.file)
+            tree_print.treeprint(ast_tree, outformat)
+            semdata = SemData()
+            simple_semantics_check.semantic_checks(ast_tree, semdata)
+        except PhError as error:
+            print(error)
+            sys.exit(1)
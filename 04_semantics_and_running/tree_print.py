@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 # ----------------------------------------------------------------------
 
+import operator
+
 # Values to control the module's working
 
 # How to recognize attributes in nodes by their names
@@ -29,6 +31,22 @@ def get_childvars(node, child_prefix=child_prefix_default,
   (in which case None is used as the second element, as there is no child).'''
 
   childvars = []
+  # Node types with declared children (see register_children) have their
+  # child attributes listed already, in the same order as in vars(node)
+  schema = node_schemas.get(getattr(node, nodetype_attr, None))
+  if schema is not None and child_prefix == child_prefix_default and \
+     children_prefix == children_prefix_default:
+    for name, label, is_list in schema.labels:
+      val = getattr(node, name)
+      if not is_list:
+        childvars.append((label, val))
+      elif val is None:
+        childvars.append((label+"[NONE stored instead of a list!!!]", None))
+      elif not val:
+        childvars.append((label+"[EMPTY]", None))
+      else:
+        childvars.extend([(label+"["+str(i)+"]", child) for (i, child) in enumerate(val)])
+    return childvars
   # Only search for attributes if we have an object
   if hasattr(node, "__dict__"):
     # Iterate though all attributes of the node object
@@ -56,6 +74,97 @@ def get_childvars(node, child_prefix=child_prefix_default,
   return childvars
 
 
+# Declared children of node types. Finding the children of every node
+# through vars() and the attribute name prefixes is slow for traversals
+# that don't need the labels, so the child attributes of each node type
+# can be declared once, and get_children then uses an accessor made for
+# the node type.
+
+class NodeSchema:
+  '''The child attributes of one node type'''
+
+  def __init__(self, fields, child_types=None, child_prefix=child_prefix_default,
+               children_prefix=children_prefix_default):
+    self.fields = tuple(fields)
+    # Node types the children can be, None if not known
+    self.child_types = None if child_types is None else frozenset(child_types)
+    self.descendant_types = None
+    # (attribute name, label, is a child list) for get_childvars
+    self.labels = []
+    for name in self.fields:
+      if name.startswith(children_prefix):
+        self.labels.append((name, name[len(children_prefix):], True))
+      elif name.startswith(child_prefix):
+        self.labels.append((name, name[len(child_prefix):], False))
+      else:
+        raise ValueError(f"{name} is not a child attribute")
+    self.children = self.make_accessor()
+
+  def make_accessor(self):
+    '''Function that returns the children of a node of this type (nodes
+    in child lists included in order, None for missing children)'''
+    if not self.fields:
+      return lambda node: ()
+    get = operator.attrgetter(*self.fields)
+    lists = [is_list for name, label, is_list in self.labels]
+    if len(self.fields) == 1:
+      if lists[0]:
+        return lambda node: get(node) or ()
+      return lambda node: (get(node),)
+    if not any(lists):
+      # attrgetter of several attributes returns them as a tuple
+      return get
+    def children(node):
+      result = []
+      for value, is_list in zip(get(node), lists):
+        if is_list:
+          if value:
+            result.extend(value)
+        else:
+          result.append(value)
+      return result
+    return children
+
+node_schemas = {}
+
+def register_children(nodetype, fields, child_types=None):
+  '''Declare the child attributes (child_... and children_... names, in the
+  order the children are visited) of nodes with the given nodetype, and
+  optionally the node types the children can be'''
+  node_schemas[nodetype] = NodeSchema(fields, child_types)
+
+def descendant_types(nodetype):
+  '''The node types that can be found below a node of nodetype (a
+  frozenset), or None if that is not known'''
+  schema = node_schemas.get(nodetype)
+  if schema is None or schema.child_types is None:
+    return None
+  if schema.descendant_types is None:
+    found = set()
+    pending = [nodetype]
+    while pending:
+      child_types = node_schemas[pending.pop()].child_types
+      for child_type in child_types:
+        if child_type in found:
+          continue
+        if child_type not in node_schemas or \
+           node_schemas[child_type].child_types is None:
+          return None
+        found.add(child_type)
+        pending.append(child_type)
+    schema.descendant_types = frozenset(found)
+  return schema.descendant_types
+
+def get_children(node):
+  '''The children of a tree node without labels: a sequence of child
+  nodes, where None marks a missing child. Uses the declared children of
+  the node type if there are any, otherwise get_childvars.'''
+  schema = node_schemas.get(getattr(node, nodetype_attr, None))
+  if schema is not None:
+    return schema.children(node)
+  return [child for label, child in get_childvars(node)]
+
+
 # Printing the syntax tree (AST)
 
 # Strings that ASCII and Unicode trees are made out of
@@ -104,13 +213,18 @@ def treeprint_indent(node, outtype="unicode", label="", first_indent="", indent=
   first_indent = what to print at the beginning of the first line (indentation)
   indent = what to print at the beginning of the rest of the lines (indentation)'''
 
-  # Add label (if any) to the first line after the indentation
-  if label:
-    first_indent += label + ": "
-  if not node:
-    # If node is None, just print NONE
-    print(first_indent + "NONE")
-  else:
+  # Subtrees still to be printed, uses an explicit stack instead of recursion
+  # so that the depth of the tree is not limited by Python's recursion limit
+  stack = [(node, label, first_indent, indent)]
+  while stack:
+    node, label, first_indent, indent = stack.pop()
+    # Add label (if any) to the first line after the indentation
+    if label:
+      first_indent += label + ": "
+    if not node:
+      # If node is None, just print NONE
+      print(first_indent + "NONE")
+      continue
     # If node has node type attribute, print that, otherwise try to print the whole
     # node take help in finding the error
     if hasattr(node, nodetype_attr):
@@ -131,28 +245,30 @@ def treeprint_indent(node, outtype="unicode", label="", first_indent="", indent=
     print()
     # Get all children of the node and iterate through them
     childvars = get_childvars(node)
+    children = []
     i = len(childvars)
     for name,value in childvars:
       i -= 1
       if i > 0:
         # Not the last child, use normal indentation
         if outtype == "unicode":
-          first_indent = child_indent_uni
+          child_first_indent = child_indent_uni
           rest_indent = normal_indent_uni
         else:
-          first_indent = child_indent_asc
+          child_first_indent = child_indent_asc
           rest_indent = normal_indent_asc
       else:
         # The last child, use indentation for that case
         if outtype == "unicode":
-          first_indent = last_child_indent_uni
+          child_first_indent = last_child_indent_uni
           rest_indent = last_normal_indent_uni
         else:
-          first_indent = last_child_indent_asc
+          child_first_indent = last_child_indent_asc
           rest_indent = last_normal_indent_asc
-      # Recursively print the child subtrees, adding indentation
-      treeprint_indent(value, outtype, name, indent+first_indent,
-                indent+rest_indent)
+      # The child subtrees are printed next, adding indentation
+      children.append((value, name, indent+child_first_indent,
+                       indent+rest_indent))
+    stack.extend(reversed(children))
 
 def treeprint_dot(node, nodenum, nodecount):
   '''Print a subtree in dot format.
@@ -160,12 +276,34 @@ def treeprint_dot(node, nodenum, nodecount):
   nodenum = number of the node (for dot id generation)
   nodecount = a list containing the maximum used id'''
 
-  nodeline = dotnodeid(nodenum)
-  if not node:
-    # None is output as an ellipse with label NONE
-    nodeline += ' [shape="ellipse", label="NONE"]'
-    print(nodeline)
-  else:
+  # Explicit stack of work instead of recursion. Items are
+  # ("node", node, nodenum): print the node and schedule its children,
+  # ("child", parentnum, name, child): number the child and print its subtree,
+  # ("edge", parentnum, childnum, name): output the connection after the subtree
+  stack = [("node", node, nodenum)]
+  while stack:
+    item = stack.pop()
+    if item[0] == "edge":
+      _, parentnum, childnum, name = item
+      # Output the named connection between parent and child
+      print(dotnodeid(parentnum)+"->"+dotnodeid(childnum)+ ' [label="'+name+'"]')
+      continue
+    if item[0] == "child":
+      _, parentnum, name, value = item
+      # Number the child by one more than current maximum (and update maximum)
+      nodecount[0] += 1
+      childnum = nodecount[0]
+      stack.append(("edge", parentnum, childnum, name))
+      stack.append(("node", value, childnum))
+      continue
+
+    _, node, nodenum = item
+    nodeline = dotnodeid(nodenum)
+    if not node:
+      # None is output as an ellipse with label NONE
+      nodeline += ' [shape="ellipse", label="NONE"]'
+      print(nodeline)
+      continue
     # Normal nodes use the default shape
     nodeline += ' [label="'
     # If node has node type attribute, print that, otherwise try to print the whole
@@ -191,16 +329,10 @@ def treeprint_dot(node, nodenum, nodecount):
       nodeline += "\n"+nextnodeline
     nodeline += '"]'
     print(nodeline)
-    # Get all children of the node and iterate through them
+    # Get all children of the node and schedule them in order
     childvars = get_childvars(node)
-    for name,value in childvars:
-      # Number the child by one more than current maximum (and update maximum)
-      nodecount[0] += 1
-      childnum = nodecount[0]
-      # Recursively print the child subtrees
-      treeprint_dot(value, childnum, nodecount)
-      # Output the named connection between parent and child
-      print(dotnodeid(nodenum)+"->"+dotnodeid(childnum)+ ' [label="'+name+'"]')
+    stack.extend(reversed([("child", nodenum, name, value)
+                           for name,value in childvars]))
 
 def treeprint(rootnode, outtype="unicode"):
   '''Prints out a tree, given its root.